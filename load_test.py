@@ -0,0 +1,162 @@
+import argparse
+import base64
+import http.client
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+
+SERVERS = {
+    'runserver': [
+        sys.executable, 'manage.py', 'runserver', '--noreload',
+        '127.0.0.1:{port}'
+    ],
+    'gunicorn': [
+        sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+        '--bind', '127.0.0.1:{port}', 'project.wsgi'
+    ],
+    'gunicorn-asgi': [
+        sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+        '--bind', '127.0.0.1:{port}', '--worker-class',
+        'uvicorn_worker.UvicornWorker', 'project.asgi:application'
+    ],
+}
+
+# Environment variables added for server, async views only under ASGI
+SERVER_ENV = {
+    'gunicorn-asgi': {'EXAM_ASYNC_VIEWS': '1'},
+}
+
+
+def start_server(name, port):
+    """Start server in src folder and wait until it accepts requests"""
+    command = [part.format(port=port) for part in SERVERS[name]]
+    process = subprocess.Popen(
+        command, cwd=SRC_DIR, env={**os.environ, **SERVER_ENV.get(name, {})},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port)
+            connection.request('HEAD', '/')
+            connection.getresponse()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f'{name} did not start on port {port}')
+
+
+def get_token(host, port, auth):
+    """Return authorization header with token obtained for credentials"""
+    # Password hashing would dominate measured time with Basic credentials
+    connection = http.client.HTTPConnection(host, port)
+    connection.request('POST', '/api/exam/token/', headers={
+        'Authorization': 'Basic ' + base64.b64encode(auth.encode()).decode()
+    })
+    response = connection.getresponse()
+    body = json.loads(response.read())
+    connection.close()
+    if response.status != 200:
+        raise RuntimeError(f'Token request failed: {body}')
+    return {'Authorization': f'Token {body["token"]}'}
+
+
+def run_load(url, auth, concurrency, duration):
+    """Send requests from many threads, return status counts and latencies"""
+    parts = urlsplit(url)
+    headers = get_token(parts.hostname, parts.port, auth)
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker():
+        connection = http.client.HTTPConnection(parts.hostname, parts.port)
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                connection.request('GET', parts.path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except OSError:
+                connection.close()
+                connection = http.client.HTTPConnection(
+                    parts.hostname, parts.port
+                )
+                status = 'error'
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+        connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses, latencies
+
+
+def percentile(values, percent):
+    """Return percentile of values, nearest rank"""
+    ordered = sorted(values)
+    index = max(0, math.ceil(percent / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def report(name, statuses, latencies, duration):
+    """Print throughput and latency percentiles of one server"""
+    if not latencies:
+        print(f'{name}: no requests completed')
+        return
+    print(f'{name}:')
+    print(f'  requests: {len(latencies)} {statuses}')
+    print(f'  throughput: {len(latencies) / duration:.1f} req/s')
+    print(f'  mean latency: {statistics.mean(latencies) * 1000:.1f} ms')
+    print('  p50/p95/p99: ' + ' / '.join(
+        f'{percentile(latencies, value) * 1000:.1f}'
+        for value in (50, 95, 99)
+    ) + ' ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare throughput of runserver and gunicorn. '
+                    'Database has to be migrated, with base fixture loaded.'
+    )
+    parser.add_argument('--path', default='/api/exam/exam-sheets/')
+    parser.add_argument('--auth', default='teacher1:testpassword',
+                        help='Basic credentials as login:password')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--servers', nargs='+', default=list(SERVERS),
+                        choices=list(SERVERS))
+    parser.add_argument('--port', type=int, default=8100)
+    args = parser.parse_args()
+
+    for number, name in enumerate(args.servers):
+        port = args.port + number
+        process = start_server(name, port)
+        try:
+            statuses, latencies = run_load(
+                f'http://127.0.0.1:{port}{args.path}',
+                args.auth, args.concurrency, args.duration
+            )
+        finally:
+            process.terminate()
+            process.wait()
+        report(name, statuses, latencies, args.duration)
+
+
+if __name__ == '__main__':
+    main()
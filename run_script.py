@@ -7,8 +7,13 @@ def docker_run_app(command):
 
 def main():
     os.system('docker-compose build')
-    docker_run_app('"python manage.py migrate"')
-    docker_run_app('"python manage.py loaddata basefixture.json"')
+    docker_run_app(
+        '"python manage.py wait_for_db && python manage.py migrate"'
+    )
+    docker_run_app(
+        '"python manage.py wait_for_db && '
+        'python manage.py loaddata basefixture.json"'
+    )
     os.system('docker-compose up')
     
 if __name__ == '__main__':
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ExamConfig(AppConfig):
     name = 'exam'
+
+    def ready(self):
+        """Connect signal handlers"""
+        import exam.signals  # noqa: F401
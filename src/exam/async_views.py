@@ -0,0 +1,79 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.views.decorators.csrf import csrf_exempt
+
+
+class AsyncReadMixin:
+    """Serve read-only actions of viewset with async handlers
+
+    Handler of action named in `async_actions` is method with 'a' prefix
+    (e.g. 'alist' for 'list'). Under ASGI request waiting for database or
+    slow client doesn't hold a thread. Other actions of the same URL are
+    run by sync view in thread.
+    """
+    async_actions = ()
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if (not getattr(settings, 'EXAM_ASYNC_VIEWS', False) or
+                not set(actions.values()) & set(cls.async_actions)):
+            return view
+
+        action_map = dict(actions)
+        if 'get' in action_map and 'head' not in action_map:
+            action_map['head'] = action_map['get']
+
+        async def async_view(request, *args, **kwargs):
+            action = action_map.get(request.method.lower())
+            if action not in cls.async_actions:
+                return await sync_to_async(view)(request, *args, **kwargs)
+            self = cls(**initkwargs)
+            self.action_map = action_map
+            for method, action in action_map.items():
+                setattr(self, method, getattr(self, action))
+            self.request = request
+            self.args = args
+            self.kwargs = kwargs
+            return await self.async_dispatch(request, *args, **kwargs)
+
+        async_view.cls = cls
+        async_view.initkwargs = initkwargs
+        async_view.actions = actions
+        return csrf_exempt(async_view)
+
+    async def async_dispatch(self, request, *args, **kwargs):
+        """Like dispatch, but awaits async handler of action"""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # Authentication and permissions may query database
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = getattr(self, f'a{self.action}')
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        return self.response
+
+    async def aget_object(self):
+        """Async version of get_object"""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = await queryset.aget(**filter_kwargs)
+        except (queryset.model.DoesNotExist, TypeError, ValueError,
+                ValidationError):
+            raise Http404
+        await sync_to_async(self.check_object_permissions)(self.request, obj)
+        return obj
@@ -0,0 +1,183 @@
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.utils.crypto import constant_time_compare
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, \
+                                        BasicAuthentication, \
+                                        get_authorization_header
+
+TOKEN_SALT = 'exam.authentication.token'
+
+
+class CredentialCache:
+    """Bounded LRU cache of verified credentials with time to live"""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(username, password):
+        """Return cache key that doesn't keep plain password in memory"""
+        digest = hmac.new(
+            settings.SECRET_KEY.encode(),
+            password.encode(),
+            hashlib.sha256
+        ).hexdigest()
+        return (username, digest)
+
+    def get(self, key, password_hash):
+        """Return True if key was verified against given password hash"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_hash, expires_at = entry
+                if (expires_at > time.monotonic() and
+                        constant_time_compare(stored_hash, password_hash)):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True
+                # Expired or password changed since verification
+                del self._entries[key]
+            self.misses += 1
+            return False
+
+    def set(self, key, password_hash):
+        """Remember successful verification of key"""
+        with self._lock:
+            self._entries[key] = (password_hash, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username):
+        """Drop every entry of given username"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == username]:
+                del self._entries[key]
+
+    def clear(self):
+        """Drop all entries and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
+
+
+credential_cache = CredentialCache(
+    maxsize=getattr(settings, 'EXAM_AUTH_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'EXAM_AUTH_CACHE_TTL', 300),
+)
+
+
+class CachedBasicAuthentication(BasicAuthentication):
+    """Basic authentication that skips password hashing for known logins"""
+    cache = credential_cache
+
+    def authenticate_credentials(self, userid, password, request=None):
+        """Authenticate from cache, fall back to password check on miss"""
+        user_model = get_user_model()
+        try:
+            user = user_model._default_manager.get_by_natural_key(userid)
+        except user_model.DoesNotExist:
+            user = None
+
+        key = self.cache.make_key(userid, password)
+        # Comparing stored hash drops entries after password change,
+        # even if it was made in another process
+        if (user is not None and user.is_active and
+                self.cache.get(key, user.password)):
+            return (user, None)
+
+        user, auth = super().authenticate_credentials(
+            userid, password, request
+        )
+        self.cache.set(key, user.password)
+        return (user, auth)
+
+
+def make_token(user):
+    """Return signed token and its expiry timestamp for given user"""
+    expires = int(time.time()) + getattr(settings, 'EXAM_TOKEN_TTL', 3600)
+    roles = [
+        role for role, granted in (
+            ('staff', user.is_staff),
+            ('superuser', user.is_superuser),
+        ) if granted
+    ]
+    payload = {'id': user.pk, 'roles': roles, 'exp': expires}
+    return signing.dumps(payload, salt=TOKEN_SALT), expires
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """Stateless authentication with tokens issued by make_token
+
+    Token is verified only by its signature, so request doesn't touch
+    database. User is built from token payload and has only id and roles.
+    """
+    keyword = 'Token'
+
+    def authenticate(self, request):
+        """Return user if request has valid token header"""
+        auth = get_authorization_header(request).split()
+
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) != 2:
+            msg = _('Invalid token header.')
+            raise exceptions.AuthenticationFailed(msg)
+
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            msg = _('Invalid token header.')
+            raise exceptions.AuthenticationFailed(msg)
+
+        return self.authenticate_credentials(token)
+
+    def authenticate_credentials(self, token):
+        """Return user described by valid and not expired token"""
+        try:
+            payload = signing.loads(token, salt=TOKEN_SALT)
+        except signing.BadSignature:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if payload['exp'] < time.time():
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+
+        user = get_user_model()(
+            pk=payload['id'],
+            is_active=True,
+            is_staff='staff' in payload['roles'],
+            is_superuser='superuser' in payload['roles'],
+        )
+        # Behave like instance loaded from database
+        user._state.adding = False
+        user._state.db = 'default'
+        return (user, token)
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,203 @@
+import atexit
+import logging
+import math
+import threading
+from collections import Counter, OrderedDict, namedtuple
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from exam.events import publish_task_events
+from exam.models import ExamTask
+from exam.signals import batched_sheet_changes
+
+logger = logging.getLogger(__name__)
+
+PendingAnswer = namedtuple('PendingAnswer', 'answer exam_sheet_id user_id')
+
+
+class AnswerWriteBehind:
+    """Queue of task answers written to database in batches
+
+    Repeated answers to the same task are merged, so only the latest one
+    is written. Worker thread flushes queue every interval, or earlier
+    when batch size is reached.
+    """
+
+    def __init__(self, max_pending=10000, batch_size=500, interval=1.0,
+                 autostart=True):
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.interval = interval
+        self.autostart = autostart
+        self._pending = OrderedDict()
+        # Users with answers not written yet, including ones being written
+        self._user_counts = Counter()
+        self._lock = threading.Lock()
+        # Held while answers taken from queue are written
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def submit(self, task_id, exam_sheet_id, user_id, answer):
+        """Queue answer, return False if queue is full"""
+        with self._lock:
+            previous = self._pending.get(task_id)
+            if previous is None and len(self._pending) >= self.max_pending:
+                return False
+            if previous is not None:
+                self._user_counts[previous.user_id] -= 1
+            self._pending[task_id] = PendingAnswer(
+                answer, exam_sheet_id, user_id
+            )
+            self._user_counts[user_id] += 1
+            size = len(self._pending)
+
+        if self.autostart:
+            self.start()
+        if size >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def has_pending(self, user_id):
+        """Return True if user has answers not written yet"""
+        return self._user_counts[user_id] > 0
+
+    def flush(self, user_id=None, task_ids=None):
+        """Write queued answers, only ones of given user or tasks if set"""
+        if not self._user_counts:
+            return
+        # Waits for answers being written by other thread
+        with self._write_lock:
+            with self._lock:
+                taken = OrderedDict(
+                    (task_id, pending)
+                    for task_id, pending in self._pending.items()
+                    if (user_id is None or pending.user_id == user_id) and
+                    (task_ids is None or task_id in task_ids)
+                )
+                for task_id in taken:
+                    del self._pending[task_id]
+            if taken:
+                self._write(taken)
+
+    def _write(self, taken):
+        now = timezone.now()
+        tasks = [
+            ExamTask(id=task_id, answer=pending.answer, updated_at=now)
+            for task_id, pending in taken.items()
+        ]
+        try:
+            with transaction.atomic(), batched_sheet_changes() as changed:
+                ExamTask.objects.bulk_update(
+                    tasks, ['answer', 'updated_at'],
+                    batch_size=self.batch_size
+                )
+                changed.update(
+                    pending.exam_sheet_id for pending in taken.values()
+                )
+                publish_task_events('answer_submitted', (
+                    (pending.exam_sheet_id, task_id)
+                    for task_id, pending in taken.items()
+                ))
+        except Exception:
+            logger.exception('Writing %d queued answers failed', len(taken))
+            with self._lock:
+                # Answers sent in the meantime are newer
+                for task_id, pending in taken.items():
+                    if task_id in self._pending:
+                        self._user_counts[pending.user_id] -= 1
+                    else:
+                        self._pending[task_id] = pending
+                self._remove_empty_counts()
+            return
+        with self._lock:
+            for pending in taken.values():
+                self._user_counts[pending.user_id] -= 1
+            self._remove_empty_counts()
+
+    def _remove_empty_counts(self):
+        for user_id in [
+                user_id for user_id, count in self._user_counts.items()
+                if count <= 0]:
+            del self._user_counts[user_id]
+
+    def start(self):
+        """Start worker thread if it's not running"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(
+                target=self._run, name='exam-answer-write-behind',
+                daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """Stop worker thread and write everything left in queue"""
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Flushing queued answers failed')
+            finally:
+                close_old_connections()
+
+
+answer_queue = AnswerWriteBehind(
+    max_pending=getattr(settings, 'EXAM_ANSWER_QUEUE_SIZE', 10000),
+    batch_size=getattr(settings, 'EXAM_ANSWER_FLUSH_BATCH', 500),
+    interval=getattr(settings, 'EXAM_ANSWER_FLUSH_INTERVAL', 1.0),
+)
+atexit.register(answer_queue.stop)
+
+
+class AnswerWriteBehindMixin:
+    """Optional write-behind saving of answers with read-your-writes"""
+    answer_queue = answer_queue
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # User reading data sees answers they have sent before
+        if (request.method in ('GET', 'HEAD') and
+                self.answer_queue.has_pending(request.user.pk)):
+            self.answer_queue.flush(user_id=request.user.pk)
+
+    def write_behind_enabled(self):
+        """Return True if answers should be queued"""
+        return getattr(settings, 'EXAM_ANSWER_WRITE_BEHIND', False)
+
+    def queue_answer(self, task, answer):
+        """Queue answer to task, return response if it can't be queued"""
+        queued = self.answer_queue.submit(
+            task.id, task.exam_sheet_id, self.request.user.pk, answer
+        )
+        if not queued:
+            return Response(
+                {'detail': 'Too many answers waiting to be saved.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={
+                    'Retry-After': str(math.ceil(self.answer_queue.interval))
+                }
+            )
+        return None
+
+    def flush_answers(self, task_ids):
+        """Write queued answers of tasks before they are written directly"""
+        self.answer_queue.flush(task_ids=set(task_ids))
@@ -0,0 +1,249 @@
+import base64
+import math
+import statistics
+import time
+import tracemalloc
+from urllib.parse import urlencode
+
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import URLResolver, get_resolver, reverse
+from rest_framework.test import APIClient
+
+from exam.authentication import make_token
+from exam.cache import get_cache
+from exam.models import ExamSheet, ExamTask, sheet_counters
+
+# Password of users of benchmark data set, so token route can be timed
+PASSWORD = 'benchmark-password'
+
+# Cache of benchmark process only, so shared cache of running server isn't
+# cleared between routes
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'exam-benchmark',
+    }
+}
+
+
+class Route:
+    """Request sent to one route of exam API
+
+    Arguments of url and request data may be functions of BenchmarkData,
+    they are called before each request and aren't timed. Settings are
+    overridden while requests are sent.
+    """
+
+    def __init__(self, name, method='get', args=(), data=None,
+                 params=None, user='teacher', auth='token', label='',
+                 settings=None):
+        self.name = name
+        self.method = method
+        self.args = args
+        self.data = data
+        self.params = params
+        self.user = user
+        self.auth = auth
+        self.label = label
+        self.settings = settings or {}
+
+    def __str__(self):
+        label = f' {self.label}' if self.label else ''
+        return f'{self.method.upper()} {self.name}{label}'
+
+    def prepare(self, data):
+        """Return path, body and headers of next request"""
+        args = self.args(data) if callable(self.args) else self.args
+        path = reverse(f'exam:{self.name}', args=args)
+        if self.params:
+            path = f'{path}?{urlencode(self.params)}'
+        body = self.data(data) if callable(self.data) else self.data
+        user = getattr(data, self.user)
+        if self.auth == 'basic':
+            credentials = base64.b64encode(
+                f'{user.username}:{PASSWORD}'.encode()
+            ).decode()
+            return path, body, {'HTTP_AUTHORIZATION': f'Basic {credentials}'}
+        return path, body, {'HTTP_AUTHORIZATION': f'Token {data.token(user)}'}
+
+    def send(self, client, path, body, headers):
+        """Send request, return response with content read"""
+        response = getattr(client, self.method)(
+            path, body, format='json', **headers
+        )
+        if response.streaming:
+            b''.join(response.streaming_content)
+        else:
+            response.content
+        return response
+
+
+def sheet_id(data):
+    """Return url arguments of benchmarked exam sheet"""
+    return [data.sheet.id]
+
+
+def task_id(data):
+    """Return url arguments of benchmarked exam task"""
+    return [data.task.id]
+
+
+# Every route of exam API with requests sent to it
+ROUTES = (
+    Route('api-root'),
+    Route('token', 'post', auth='basic'),
+    Route('metrics', user='admin'),
+    Route('examsheet-list'),
+    Route('examsheet-list', 'post', data=lambda data: {
+        'description': 'Benchmark exam sheet', 'tasks': []
+    }),
+    Route('examsheet-archive-list'),
+    Route('examsheet-nofilter'),
+    Route('examsheet-nofilter', params={'stream': '1'}, label='stream=1'),
+    Route('examsheet-detail', args=sheet_id),
+    Route('examsheet-detail', 'patch', args=sheet_id, data={
+        'description': 'Changed exam sheet'
+    }),
+    Route('examsheet-answers', 'patch', args=sheet_id, user='student',
+          data=lambda data: {
+              str(task.id): 'Answer to all tasks'
+              for task in data.sheet.tasks.all()
+          }),
+    # Stream ends right after first event instead of waiting for changes
+    Route('examsheet-grade', 'post', args=sheet_id),
+    Route('examsheet-events', args=sheet_id, user='student',
+          settings={'EXAM_EVENTS_TIMEOUT': 0}, label='first event'),
+    Route('examtask-list'),
+    Route('examtask-list', 'post', data=lambda data: {
+        'exam_sheet': data.sheet.id, 'title': 'Benchmark task'
+    }),
+    Route('examtask-bulk', 'post', data=lambda data: [
+        {'exam_sheet': data.sheet.id, 'title': f'Bulk task {number}'}
+        for number in range(10)
+    ]),
+    Route('examtask-bulk', 'patch', data=lambda data: [
+        {'id': task.id, 'points': 1}
+        for task in data.sheet.tasks.order_by('id')[:10]
+    ]),
+    Route('examtask-bulk', 'delete', data=lambda data: data.new_tasks(10)),
+    Route('examtask-detail', args=task_id),
+    Route('examtask-detail', 'patch', args=task_id, data={'points': 2}),
+    Route('examtask-answer', args=task_id, user='student'),
+    Route('examtask-answer', 'patch', args=task_id, user='student',
+          data={'answer': 'Answer of student'}),
+    Route('examtask-sheet', args=sheet_id),
+    # Toggles archived status of sheet, so it's sent last
+    Route('examsheet-archive', args=sheet_id),
+)
+
+
+def route_names(resolver=None, namespace=''):
+    """Return names of every route of exam API"""
+    if resolver is None:
+        resolver = get_resolver()
+    names = set()
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            names |= route_names(
+                pattern, pattern.namespace or namespace
+            )
+        elif namespace == 'exam' and pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+def missing_routes(routes=ROUTES):
+    """Return names of exam API routes not covered by routes"""
+    return route_names() - {route.name for route in routes}
+
+
+class BenchmarkData:
+    """Users and objects of seeded data set that requests are sent to"""
+
+    def __init__(self, teacher, admin):
+        self.teacher = teacher
+        self.admin = admin
+        # First active sheet of teacher that has student and tasks
+        self.sheet = ExamSheet.objects.filter(
+            owner=teacher, student__isnull=False, tasks__isnull=False,
+            is_archived=False
+        ).select_related('student').order_by('id').first()
+        self.student = self.sheet.student
+        self.task = self.sheet.tasks.order_by('id').first()
+        self._tokens = {}
+
+    def token(self, user):
+        """Return token of user, issued once"""
+        if user.pk not in self._tokens:
+            self._tokens[user.pk] = make_token(user)[0]
+        return self._tokens[user.pk]
+
+    def new_tasks(self, count):
+        """Create tasks of sheet, return their ids"""
+        tasks = ExamTask.objects.bulk_create(
+            ExamTask(exam_sheet=self.sheet, title=f'Task {number}')
+            for number in range(count)
+        )
+        ExamSheet.objects.filter(pk=self.sheet.pk).update(**sheet_counters())
+        return [task.id for task in tasks]
+
+
+def percentile(values, percent):
+    """Return percentile of values, nearest rank"""
+    ordered = sorted(values)
+    index = max(0, math.ceil(percent / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def run_route(route, data, iterations, warmup=1):
+    """Send requests to route, return their latency, queries and memory"""
+    with override_settings(**route.settings):
+        return _run_route(route, data, iterations, warmup)
+
+
+def _run_route(route, data, iterations, warmup):
+    client = APIClient()
+    queries = []
+
+    def count_query(execute, sql, params, many, context):
+        queries[-1] += 1
+        return execute(sql, params, many, context)
+
+    # Cached payloads of previous route aren't reused
+    get_cache().clear()
+    for _ in range(warmup):
+        route.send(client, *route.prepare(data))
+
+    latencies = []
+    statuses = set()
+    for _ in range(max(iterations, 1)):
+        request = route.prepare(data)
+        queries.append(0)
+        with connection.execute_wrapper(count_query):
+            start = time.perf_counter()
+            response = route.send(client, *request)
+            latencies.append(time.perf_counter() - start)
+        statuses.add(response.status_code)
+
+    # Tracing slows requests down, so memory is measured separately
+    request = route.prepare(data)
+    tracemalloc.start()
+    try:
+        route.send(client, *request)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'route': str(route),
+        'status': sorted(statuses),
+        'requests': len(latencies),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'queries': round(statistics.mean(queries), 2),
+        'max_queries': max(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
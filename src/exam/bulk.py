@@ -0,0 +1,192 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from exam.events import publish_task_events
+from exam.models import ExamSheet, ExamTask
+from exam.serializers import ExamTaskBulkSerializer, ExamTaskSerializer
+from exam.signals import batched_sheet_changes
+
+
+def pk_value(value):
+    """Return value as primary key, None if it can't be one"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def pk_values(values):
+    """Return set of given values that can be primary keys"""
+    return {pk_value(value) for value in values} - {None}
+
+
+class BulkExamTaskMixin:
+    """Create, update and delete many exam tasks in one request
+
+    Whole list is validated before anything is written, errors are
+    reported per item in order of request data.
+    """
+
+    @action(
+        detail=False, url_path='bulk', url_name='bulk',
+        methods=['post', 'patch', 'delete']
+    )
+    def bulk(self, request):
+        """Write list of exam tasks in one transaction"""
+        items = request.data
+        max_items = getattr(settings, 'EXAM_BULK_MAX_ITEMS', 1000)
+        if not isinstance(items, list):
+            return Response(
+                {'non_field_errors': ['Expected a list of items.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > max_items:
+            return Response(
+                {'non_field_errors': [
+                    f'Ensure there are no more than {max_items} items.'
+                ]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if request.method == 'POST':
+            return self.bulk_create(items)
+        elif request.method == 'PATCH':
+            return self.bulk_update(items)
+        return self.bulk_delete(items)
+
+    def get_bulk_context(self, sheet_ids):
+        """Return serializer context with exam sheets loaded at once"""
+        context = self.get_serializer_context()
+        context['exam_sheets'] = ExamSheet.objects.only(
+            'id', 'owner'
+        ).in_bulk(pk_values(sheet_ids))
+        return context
+
+    def bulk_create(self, items):
+        """Create exam tasks with one insert"""
+        context = self.get_bulk_context(
+            item.get('exam_sheet') for item in items
+            if isinstance(item, dict)
+        )
+        serializer = ExamTaskBulkSerializer(
+            data=items, many=True, context=context
+        )
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with transaction.atomic(), batched_sheet_changes() as changed:
+            tasks = ExamTask.objects.bulk_create(
+                ExamTask(**data) for data in serializer.validated_data
+            )
+            changed.update(task.exam_sheet_id for task in tasks)
+            publish_task_events(
+                'task_added', ((task.exam_sheet_id, task.id) for task in tasks)
+            )
+
+        return Response(
+            ExamTaskSerializer(tasks, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    def bulk_update(self, items):
+        """Update exam tasks with one query per batch of tasks"""
+        tasks = ExamTask.objects.in_bulk(pk_values(
+            item.get('id') for item in items if isinstance(item, dict)
+        ))
+        context = self.get_bulk_context(
+            [task.exam_sheet_id for task in tasks.values()] +
+            [item.get('exam_sheet') for item in items
+             if isinstance(item, dict)]
+        )
+        user = self.request.user
+
+        errors, updated, sheet_ids = [], [], set()
+        for item in items:
+            if not isinstance(item, dict):
+                errors.append({'non_field_errors': ['Expected an object.']})
+                continue
+            task = tasks.get(pk_value(item.get('id')))
+            if task is None:
+                errors.append({'id': ['Exam task not found.']})
+                continue
+            exam_sheet = context['exam_sheets'][task.exam_sheet_id]
+            if exam_sheet.owner_id != user.pk:
+                errors.append({'id': ['You are not owner of exam task.']})
+                continue
+            serializer = ExamTaskBulkSerializer(
+                task, data=item, partial=True, context=context
+            )
+            if not serializer.is_valid():
+                errors.append(serializer.errors)
+                continue
+            errors.append({})
+            updated.append((task, serializer.validated_data))
+
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        self.flush_answers(tasks)
+        fields = {'updated_at'}
+        now = timezone.now()
+        events = defaultdict(list)
+        for task, data in updated:
+            # Both old and new sheet of moved task are changed
+            old_sheet_id = task.exam_sheet_id
+            for field, value in data.items():
+                setattr(task, field, value)
+            sheet_ids.update((old_sheet_id, task.exam_sheet_id))
+            task.updated_at = now
+            fields.update(data)
+            if old_sheet_id != task.exam_sheet_id:
+                events['task_removed'].append((old_sheet_id, task.id))
+                events['task_added'].append((task.exam_sheet_id, task.id))
+            elif 'answer' in data:
+                events['answer_submitted'].append((old_sheet_id, task.id))
+            else:
+                events['task_changed'].append((old_sheet_id, task.id))
+
+        with transaction.atomic(), batched_sheet_changes() as changed:
+            # Every loaded task is referenced by valid item
+            ExamTask.objects.bulk_update(tasks.values(), fields)
+            changed.update(sheet_ids)
+            for event_type, sheet_tasks in events.items():
+                publish_task_events(event_type, sheet_tasks)
+
+        return Response(ExamTaskSerializer(
+            [task for task, data in updated], many=True
+        ).data)
+
+    def bulk_delete(self, items):
+        """Delete exam tasks with given ids"""
+        owners = {
+            pk: owner_id for pk, owner_id in
+            ExamTask.objects.filter(pk__in=pk_values(items)).values_list(
+                'id', 'exam_sheet__owner'
+            )
+        }
+        errors = []
+        for item in items:
+            pk = pk_value(item)
+            if pk not in owners:
+                errors.append(['Exam task not found.'])
+            elif owners[pk] != self.request.user.pk:
+                errors.append(['You are not owner of exam task.'])
+            else:
+                errors.append([])
+
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic(), batched_sheet_changes():
+            ExamTask.objects.filter(pk__in=owners).delete()
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
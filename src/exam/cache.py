@@ -0,0 +1,141 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+def get_cache():
+    """Return cache used for exam API responses"""
+    return caches[getattr(settings, 'EXAM_CACHE_ALIAS', 'default')]
+
+
+def version_key(sheet_id):
+    """Return cache key of exam sheet version counter"""
+    return f'exam:sheet:{sheet_id}:version'
+
+
+def get_sheet_version(sheet_id):
+    """Return current version of exam sheet, None if it can't be stored"""
+    cache = get_cache()
+    key = version_key(sheet_id)
+    version = cache.get(key)
+    if version is None:
+        # Counter starts from current time, so payloads stored under
+        # evicted counter are never matched again
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_sheet_version(sheet_id):
+    """Async version of get_sheet_version"""
+    cache = get_cache()
+    key = version_key(sheet_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key)
+    return version
+
+
+def _bump(sheet_id):
+    cache = get_cache()
+    key = version_key(sheet_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def bump_sheet_version(sheet_id):
+    """Invalidate every cached payload of exam sheet"""
+    _bump(sheet_id)
+    # Payload built by other request before commit would hold old data
+    # under new version, so version is changed once more after commit
+    transaction.on_commit(lambda: _bump(sheet_id))
+
+
+def cached_payload(sheet_id, name, variant, build):
+    """Return payload of exam sheet, build and store it on cache miss
+
+    Payloads are stored under current version of sheet, name of
+    serializer and variant, which holds everything else response
+    depends on (e.g. query params).
+    """
+    version = get_sheet_version(sheet_id)
+    if version is None:
+        return build()
+
+    key = payload_key(sheet_id, version, name, variant)
+    cache = get_cache()
+    payload = cache.get(key)
+    if payload is None:
+        payload = build()
+        cache.set(
+            key, payload, getattr(settings, 'EXAM_CACHE_TIMEOUT', 600)
+        )
+    return payload
+
+
+async def acached_payload(sheet_id, name, variant, build):
+    """Async version of cached_payload, build is coroutine function"""
+    version = await aget_sheet_version(sheet_id)
+    if version is None:
+        return await build()
+
+    key = payload_key(sheet_id, version, name, variant)
+    cache = get_cache()
+    payload = await cache.aget(key)
+    if payload is None:
+        payload = await build()
+        await cache.aset(
+            key, payload, getattr(settings, 'EXAM_CACHE_TIMEOUT', 600)
+        )
+    return payload
+
+
+def payload_key(sheet_id, version, name, variant):
+    """Return cache key of exam sheet payload"""
+    variant = hashlib.md5(variant.encode()).hexdigest()
+    return f'exam:sheet:{sheet_id}:{version}:{name}:{variant}'
+
+
+class SheetCacheMixin:
+    """Serve exam sheet payloads from versioned cache
+
+    Cached actions must not filter queryset by requesting user, because
+    payloads are shared between users.
+    """
+
+    payload_cached = False
+
+    def cached_data(self, sheet_id, name, build):
+        """Return data for exam sheet from cache or build function"""
+        if (not getattr(settings, 'EXAM_RESPONSE_CACHE', True) or
+                not str(sheet_id).isdigit()):
+            return build()
+        self.payload_cached = True
+        return cached_payload(
+            sheet_id, name, self.request.build_absolute_uri(), build
+        )
+
+    async def acached_data(self, sheet_id, name, build):
+        """Async version of cached_data, build is coroutine function"""
+        if (not getattr(settings, 'EXAM_RESPONSE_CACHE', True) or
+                not str(sheet_id).isdigit()):
+            return await build()
+        self.payload_cached = True
+        return await acached_payload(
+            sheet_id, name, self.request.build_absolute_uri(), build
+        )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        # Compression middleware caches compressed bytes of repeated
+        # payloads
+        response.cache_compressed = self.payload_cached
+        return response
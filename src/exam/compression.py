@@ -0,0 +1,142 @@
+import gzip
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from exam.cache import get_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/x-ndjson', 'application/javascript',
+    'application/xml',
+)
+
+
+def _gzip(content, level):
+    # No modification time in header, so the same content gives the same
+    # bytes
+    return gzip.compress(content, compresslevel=level, mtime=0)
+
+
+def _brotli(content, level):
+    # Brotli quality has range 0-11, one below gzip level compresses better
+    # in similar time
+    return brotli.compress(content, quality=max(level - 1, 0))
+
+
+def available_encodings():
+    """Return compress function of every supported encoding, best first"""
+    encodings = {}
+    if brotli is not None:
+        encodings['br'] = _brotli
+    encodings['gzip'] = _gzip
+    return encodings
+
+
+def parse_accept_encoding(header):
+    """Return mapping of content coding to its quality from header"""
+    qualities = {}
+    for item in header.split(','):
+        coding, *params = item.strip().split(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def choose_encoding(header):
+    """Return name of supported encoding accepted by client, or None"""
+    qualities = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    # Encodings are in order of preference, so ties keep the first one
+    for encoding in available_encodings():
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def is_compressible(content_type):
+    """Return True if content of given type is worth compressing"""
+    media_type = content_type.split(';')[0].strip().lower()
+    return (
+        media_type.startswith('text/') or
+        media_type in COMPRESSIBLE_TYPES or
+        media_type.endswith('+json')
+    )
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress responses larger than EXAM_COMPRESS_MIN_SIZE
+
+    Encoding (brotli if it's installed, gzip) is negotiated with
+    Accept-Encoding header. Streaming, 304 and already encoded responses
+    aren't touched. Compressed bytes of responses marked by
+    `cache_compressed` attribute (payloads served from response cache)
+    are cached too, so repeated payload is compressed only once.
+    """
+
+    def process_response(self, request, response):
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if (response.streaming or response.status_code == 304 or
+                response.has_header('Content-Encoding') or
+                'no-transform' in response.get('Cache-Control', '') or
+                not is_compressible(response.get('Content-Type', ''))):
+            return response
+        min_size = getattr(settings, 'EXAM_COMPRESS_MIN_SIZE', 1024)
+        if len(response.content) < min_size:
+            return response
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        compressed = self.compress(
+            response.content, encoding,
+            getattr(response, 'cache_compressed', False)
+        )
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # Compressed body isn't byte for byte equal to uncompressed one
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+    def compress(self, content, encoding, cached):
+        """Return content compressed with encoding, cached if requested"""
+        level = getattr(settings, 'EXAM_COMPRESS_LEVEL', 6)
+        compress = available_encodings()[encoding]
+        if not cached or not getattr(settings, 'EXAM_RESPONSE_CACHE', True):
+            return compress(content, level)
+
+        # Key of content itself, so it's never matched after payload
+        # changes
+        digest = hashlib.sha256(content).hexdigest()
+        key = f'exam:compressed:{encoding}:{level}:{digest}'
+        cache = get_cache()
+        compressed = cache.get(key)
+        if compressed is None:
+            compressed = compress(content, level)
+            cache.set(
+                key, compressed, getattr(settings, 'EXAM_CACHE_TIMEOUT', 600)
+            )
+        return compressed
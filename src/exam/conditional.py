@@ -0,0 +1,86 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from exam.cache import aget_sheet_version, get_sheet_version
+
+
+class ConditionalGetMixin:
+    """Answer conditional GET requests without serializing anything"""
+
+    def make_etag(self, *parts):
+        """Return ETag of requested URL for resource state given by parts"""
+        # Representations negotiated by Accept header differ
+        parts = (
+            self.request.build_absolute_uri(),
+            getattr(self.request, 'accepted_media_type', None)
+        ) + parts
+        return quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+
+    def sheet_etag(self, sheet_id):
+        """Return ETag based on exam sheet version, without queries"""
+        if not str(sheet_id).isdigit():
+            return None
+        version = get_sheet_version(sheet_id)
+        if version is None:
+            return None
+        return self.make_etag(version)
+
+    async def asheet_etag(self, sheet_id):
+        """Async version of sheet_etag"""
+        if not str(sheet_id).isdigit():
+            return None
+        version = await aget_sheet_version(sheet_id)
+        if version is None:
+            return None
+        return self.make_etag(version)
+
+    def queryset_etag(self, queryset):
+        """Return ETag of listed exam sheets
+
+        Sheet is touched whenever its tasks change, so count and latest
+        modification of sheets describe whole list. Latest modification
+        alone doesn't change when sheet leaves the list (it's deleted or
+        archived), so lists have no Last-Modified.
+        """
+        return self.stats_etag(queryset.order_by().aggregate(
+            count=Count('id'),
+            last_modified=Max('updated_at')
+        ))
+
+    async def aqueryset_etag(self, queryset):
+        """Async version of queryset_etag"""
+        return self.stats_etag(await queryset.order_by().aaggregate(
+            count=Count('id'),
+            last_modified=Max('updated_at')
+        ))
+
+    def stats_etag(self, stats):
+        """Return ETag from list statistics"""
+        return self.make_etag(
+            self.request.user.pk, stats['count'], stats['last_modified']
+        )
+
+    def conditional_response(self, build, etag=None):
+        """Return 304 if client has current version, otherwise build it"""
+        response = get_conditional_response(self.request, etag=etag)
+        if response is None:
+            response = build()
+        return self.set_etag(response, etag)
+
+    async def aconditional_response(self, build, etag=None):
+        """Async version of conditional_response, build is awaited"""
+        response = get_conditional_response(self.request, etag=etag)
+        if response is None:
+            response = await build()
+        return self.set_etag(response, etag)
+
+    def set_etag(self, response, etag):
+        """Add ETag header to successful response"""
+        if etag and (
+                200 <= response.status_code < 300 or
+                response.status_code == 304):
+            response['ETag'] = etag
+        return response
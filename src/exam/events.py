@@ -0,0 +1,333 @@
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+from rest_framework.renderers import BaseRenderer
+
+logger = logging.getLogger(__name__)
+
+# Event sent instead of events dropped because subscriber was too slow,
+# client should fetch sheet again
+RESYNC = 'resync'
+
+
+class Subscription:
+    """Events of one exam sheet waiting to be sent to one client
+
+    Events are put by any thread and taken by sync (get) or async (aget)
+    consumer.
+    """
+
+    def __init__(self, broker, sheet_id, max_queued=100):
+        self.broker = broker
+        self.sheet_id = sheet_id
+        self.max_queued = max_queued
+        self._events = deque()
+        self._condition = threading.Condition()
+        self._waiters = set()
+
+    def put(self, event):
+        """Queue event and wake up consumer"""
+        with self._condition:
+            if len(self._events) >= self.max_queued:
+                self._events.clear()
+                event = {'type': RESYNC, 'sheet': self.sheet_id}
+            self._events.append(event)
+            self._condition.notify_all()
+            waiters = list(self._waiters)
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(waiter.set)
+
+    def _take(self):
+        events = list(self._events)
+        self._events.clear()
+        return events
+
+    def get(self, timeout):
+        """Return queued events, wait for them at most timeout seconds"""
+        with self._condition:
+            if not self._events:
+                self._condition.wait(timeout)
+            return self._take()
+
+    async def aget(self, timeout):
+        """Async version of get"""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._condition:
+            if self._events:
+                return self._take()
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._condition:
+                self._waiters.discard(waiter)
+        with self._condition:
+            return self._take()
+
+    def close(self):
+        """Stop receiving events"""
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Pub/sub of exam sheet events within one process
+
+    Brokers used by EXAM_EVENT_BROKER setting implement publish,
+    subscribe and unsubscribe. This one reaches only clients connected to
+    the process where change was made.
+    """
+
+    def __init__(self, max_queued=None):
+        self.max_queued = max_queued or getattr(
+            settings, 'EXAM_EVENTS_QUEUE_SIZE', 100
+        )
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, sheet_id, event):
+        """Send event to every subscriber of exam sheet"""
+        self.dispatch(sheet_id, event)
+
+    def dispatch(self, sheet_id, event):
+        """Put event to subscriptions of this process"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(sheet_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def subscribe(self, sheet_id):
+        """Return subscription of events of exam sheet"""
+        subscription = Subscription(self, sheet_id, self.max_queued)
+        with self._lock:
+            self._subscriptions[sheet_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Remove subscription"""
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.sheet_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.sheet_id]
+
+
+class PostgresBroker(InProcessBroker):
+    """Pub/sub of exam sheet events between processes with LISTEN/NOTIFY
+
+    Events are sent through PostgreSQL database, so they reach clients
+    connected to any process. Every process listens with one extra
+    connection, opened when first client subscribes.
+    """
+    channel = 'exam_sheet_events'
+    # NOTIFY payload has to be shorter than 8000 bytes
+    max_payload = 7900
+
+    def __init__(self, max_queued=None, retry_interval=1.0):
+        super().__init__(max_queued)
+        self.retry_interval = retry_interval
+        self._thread = None
+        self._ready = threading.Event()
+        self._stopped = False
+
+    def publish(self, sheet_id, event):
+        with connection.cursor() as cursor:
+            for payload in self.payloads(sheet_id, event):
+                cursor.execute(
+                    'SELECT pg_notify(%s, %s)', [self.channel, payload]
+                )
+
+    def payloads(self, sheet_id, event):
+        """Return NOTIFY payloads of event, each within size limit
+
+        Event with too many tasks is split into events with parts of
+        them, other event too large is replaced by resync event.
+        """
+        # ASCII only, so length of payload is its size in bytes
+        payload = json.dumps({'sheet': sheet_id, 'event': event})
+        if len(payload) <= self.max_payload:
+            return [payload]
+        tasks = event.get('tasks', ())
+        if len(tasks) > 1:
+            half = len(tasks) // 2
+            return (
+                self.payloads(sheet_id, dict(event, tasks=tasks[:half])) +
+                self.payloads(sheet_id, dict(event, tasks=tasks[half:]))
+            )
+        return [json.dumps({
+            'sheet': sheet_id, 'event': {'type': RESYNC, 'sheet': sheet_id}
+        })]
+
+    def subscribe(self, sheet_id):
+        subscription = super().subscribe(sheet_id)
+        self.start()
+        return subscription
+
+    def start(self):
+        """Start listening thread if it's not running"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(
+                target=self._run, name='exam-event-listener', daemon=True
+            )
+            self._thread.start()
+        # Events published before LISTEN is executed would be missed
+        self._ready.wait(5)
+
+    def stop(self):
+        """Stop listening thread and close its connection"""
+        self._stopped = True
+        if self._thread is not None:
+            self._thread.join()
+        self._ready.clear()
+
+    def _run(self):
+        while not self._stopped:
+            try:
+                self._listen()
+            except Exception:
+                logger.exception('Listening to exam sheet events failed')
+                time.sleep(self.retry_interval)
+            self._ready.clear()
+
+    def _listen(self):
+        import psycopg
+
+        params = connection.get_connection_params()
+        with psycopg.connect(**params, autocommit=True) as listener:
+            listener.execute(f'LISTEN {self.channel}')
+            self._ready.set()
+            while not self._stopped:
+                # Timeout lets thread notice it was stopped
+                for notify in listener.notifies(timeout=1.0):
+                    message = json.loads(notify.payload)
+                    self.dispatch(message['sheet'], message['event'])
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return broker set by EXAM_EVENT_BROKER setting"""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(getattr(
+                settings, 'EXAM_EVENT_BROKER', 'exam.events.InProcessBroker'
+            ))()
+        return _broker
+
+
+def publish_event(sheet_id, event_type, **data):
+    """Publish event of exam sheet when transaction is committed"""
+    if sheet_id is None:
+        return
+    event = dict(data, type=event_type, sheet=sheet_id)
+    # Failed publishing is logged, committed change is still reported
+    transaction.on_commit(
+        lambda: get_broker().publish(sheet_id, event), robust=True
+    )
+
+
+def publish_task_events(event_type, sheet_tasks):
+    """Publish one event per exam sheet for (sheet id, task id) pairs"""
+    task_ids = defaultdict(list)
+    for sheet_id, task_id in sheet_tasks:
+        task_ids[sheet_id].append(task_id)
+    for sheet_id, ids in task_ids.items():
+        publish_event(sheet_id, event_type, tasks=ids)
+
+
+_event_ids = itertools.count(1)
+
+
+def format_event(event):
+    """Return event in text/event-stream format"""
+    return (
+        f'id: {next(_event_ids)}\n'
+        f'event: {event["type"]}\n'
+        f'data: {json.dumps(event)}\n\n'
+    )
+
+
+def _stream_settings():
+    return (
+        getattr(settings, 'EXAM_EVENTS_KEEPALIVE', 15),
+        getattr(settings, 'EXAM_EVENTS_TIMEOUT', 300),
+    )
+
+
+def _prelude():
+    # Stream is closed after timeout and browser reconnects one second
+    # later. Events sent in between are missed, so client fetches sheet
+    # again after every (re)connection
+    return 'retry: 1000\n\n'
+
+
+def event_stream(sheet_id):
+    """Yield events of exam sheet until timeout or sheet is deleted"""
+    keepalive, timeout = _stream_settings()
+    subscription = get_broker().subscribe(sheet_id)
+    try:
+        yield _prelude()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            events = subscription.get(
+                min(keepalive, deadline - time.monotonic())
+            )
+            if not events:
+                yield ': keepalive\n\n'
+            for event in events:
+                yield format_event(event)
+                if event['type'] == 'sheet_deleted':
+                    return
+    finally:
+        subscription.close()
+
+
+async def aevent_stream(sheet_id):
+    """Async version of event_stream"""
+    keepalive, timeout = _stream_settings()
+    # Broker may have to connect to start listening
+    subscription = await sync_to_async(
+        get_broker().subscribe, thread_sensitive=False
+    )(sheet_id)
+    try:
+        yield _prelude()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            events = await subscription.aget(
+                min(keepalive, deadline - time.monotonic())
+            )
+            if not events:
+                yield ': keepalive\n\n'
+            for event in events:
+                yield format_event(event)
+                if event['type'] == 'sheet_deleted':
+                    return
+    finally:
+        subscription.close()
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Renders error responses of event stream endpoint"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return f'event: error\ndata: {json.dumps(data)}\n\n'
@@ -0,0 +1,82 @@
+from collections import defaultdict
+
+from exam.instrumentation import timer
+from exam.models import ExamTask
+from exam.serializers import ExamSheetSerializer, ExamTaskSerializer
+
+
+class ValuesSerializer:
+    """Read-only serializer building representation from values() rows
+
+    Output is the same as of `serializer_class`, but rows aren't turned
+    into model instances and no serializer fields are run. Model fields
+    and foreign keys are read as columns, fields in `related_ids` as list
+    of primary keys loaded with one query per list of rows. Serializers
+    with optional fields choose shown ones by request, write-only fields
+    aren't shown.
+    """
+    serializer_class = None
+    # Field name -> (related model, name of its foreign key to this model)
+    related_ids = {}
+
+    def __init__(self, request=None):
+        meta = self.serializer_class.Meta
+        shown_fields = getattr(self.serializer_class, 'shown_fields', None)
+        fields = meta.fields if shown_fields is None else shown_fields(
+            request
+        )
+        write_only = {
+            name for name, kwargs in getattr(meta, 'extra_kwargs', {}).items()
+            if kwargs.get('write_only')
+        }
+        self.fields = tuple(name for name in fields if name not in write_only)
+        self.columns = {
+            name: meta.model._meta.get_field(name).attname
+            for name in self.fields if name not in self.related_ids
+        }
+
+    def values(self, queryset):
+        """Return queryset of rows with columns of serialized fields"""
+        return queryset.prefetch_related(None).values(
+            *dict.fromkeys(['id', *self.columns.values()])
+        )
+
+    def load_related_ids(self, name, object_ids):
+        """Return mapping of object id to ids of related objects"""
+        model, foreign_key = self.related_ids[name]
+        related = defaultdict(list)
+        if object_ids:
+            for object_id, pk in model.objects.filter(**{
+                f'{foreign_key}__in': object_ids
+            }).order_by('id').values_list(f'{foreign_key}_id', 'id'):
+                related[object_id].append(pk)
+        return related
+
+    def represent(self, rows):
+        """Return list of serialized rows"""
+        rows = list(rows)
+        object_ids = [row['id'] for row in rows]
+        related = {
+            name: self.load_related_ids(name, object_ids)
+            for name in self.related_ids
+        }
+        with timer('serializer'):
+            return [
+                {
+                    name: related[name][row['id']] if name in related
+                    else row[self.columns[name]]
+                    for name in self.fields
+                }
+                for row in rows
+            ]
+
+
+class ExamSheetValuesSerializer(ValuesSerializer):
+    """Exam sheets with ids of their tasks"""
+    serializer_class = ExamSheetSerializer
+    related_ids = {'tasks': (ExamTask, 'exam_sheet')}
+
+
+class ExamTaskValuesSerializer(ValuesSerializer):
+    """Exam tasks"""
+    serializer_class = ExamTaskSerializer
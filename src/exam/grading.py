@@ -0,0 +1,114 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from exam.events import publish_event, publish_task_events
+from exam.models import ExamSheet, ExamTask
+from exam.scoring import DEFAULT_GRADE_SCALE, TaskRubric, score_sheets
+from exam.signals import batched_sheet_changes
+
+
+def grading_settings():
+    """Return grade scale, sheets per batch and pool threshold"""
+    return (
+        tuple(getattr(settings, 'EXAM_GRADE_SCALE', DEFAULT_GRADE_SCALE)),
+        getattr(settings, 'EXAM_GRADING_BATCH_SIZE', 200),
+        getattr(settings, 'EXAM_GRADING_POOL_MIN_SHEETS', 1000),
+    )
+
+
+def load_batch(sheet_ids):
+    """Return (sheet id, tasks) pairs of exam sheets, read with one query"""
+    rows = ExamTask.objects.filter(exam_sheet__in=sheet_ids).order_by(
+        'exam_sheet', 'id'
+    ).values_list('exam_sheet', *TaskRubric._fields)
+    return [
+        (sheet_id, [TaskRubric(*row[1:]) for row in tasks])
+        for sheet_id, tasks in groupby(rows, key=lambda row: row[0])
+    ]
+
+
+def save_scores(batch, scores):
+    """Write changed points of tasks and grades of sheets of one batch"""
+    loaded = {
+        task.id: task.points for sheet_id, tasks in batch for task in tasks
+    }
+    now = timezone.now()
+    tasks, sheets, task_events = [], [], []
+    for score in scores:
+        for task_id, points in score.points.items():
+            if loaded[task_id] != points:
+                tasks.append(
+                    ExamTask(id=task_id, points=points, updated_at=now)
+                )
+                task_events.append((score.sheet_id, task_id))
+        if score.grade is not None:
+            sheets.append(ExamSheet(id=score.sheet_id, grade=score.grade))
+
+    with transaction.atomic(), batched_sheet_changes() as changed:
+        ExamTask.objects.bulk_update(tasks, ['points', 'updated_at'])
+        # Grade is written even if it didn't change, sheets aren't loaded
+        ExamSheet.objects.bulk_update(sheets, ['grade'])
+        changed.update(sheet_id for sheet_id, task_id in task_events)
+        changed.update(sheet.id for sheet in sheets)
+        publish_task_events('task_changed', task_events)
+        for sheet in sheets:
+            publish_event(sheet.id, 'grade_set', grade=sheet.grade)
+    return len(tasks)
+
+
+def grade_sheets(sheet_ids, workers=None, batch_size=None):
+    """Score answers of exam sheets, write points of tasks and grades
+
+    Sheets are read, scored and written in batches of batch_size (by
+    default EXAM_GRADING_BATCH_SIZE), with one query per batch for tasks
+    and one per written model. Tasks with rubric get points of correct
+    answer or 0, sheets with rubric for every task get grade from
+    EXAM_GRADE_SCALE. Batches are scored in pool of worker processes if
+    workers is more than 1, by default from EXAM_GRADING_POOL_MIN_SHEETS
+    sheets on, with at most two batches per worker loaded at once.
+    Return scores of sheets and number of tasks whose points changed.
+    """
+    scale, default_batch_size, pool_min_sheets = grading_settings()
+    batch_size = batch_size or default_batch_size
+    sheet_ids = sorted(set(sheet_ids))
+    batches = (
+        load_batch(sheet_ids[start:start + batch_size])
+        for start in range(0, len(sheet_ids), batch_size)
+    )
+
+    if workers is None:
+        workers = 1
+        if len(sheet_ids) >= pool_min_sheets:
+            workers = os.cpu_count() or 1
+    scores, changed_tasks = [], 0
+
+    def save(batch, batch_scores):
+        nonlocal changed_tasks
+        changed_tasks += save_scores(batch, batch_scores)
+        scores.extend(batch_scores)
+
+    if workers <= 1 or len(sheet_ids) <= batch_size:
+        for batch in batches:
+            save(batch, score_sheets(batch, scale))
+        return scores, changed_tasks
+
+    # Batches are written in order while later ones are scored
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for batch in batches:
+            pending.append(
+                (batch, executor.submit(score_sheets, batch, scale))
+            )
+            if len(pending) >= 2 * workers:
+                batch, future = pending.popleft()
+                save(batch, future.result())
+        while pending:
+            batch, future = pending.popleft()
+            save(batch, future.result())
+    return scores, changed_tasks
@@ -0,0 +1,362 @@
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from rest_framework.serializers import ListSerializer
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of request duration histogram buckets
+BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Timed parts of request, besides database
+PHASES = ('serializer', 'auth', 'render')
+
+
+class RequestMetrics:
+    """Time spent by one request, filled while it's handled"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.action = None
+        self.queries = 0
+        self.db = 0.0
+        self.durations = dict.fromkeys(PHASES, 0.0)
+
+    def as_dict(self, total):
+        """Return metrics as mapping of name to value"""
+        return dict(
+            action=self.action, total=total, db=self.db,
+            queries=self.queries, **self.durations
+        )
+
+
+# Metrics of request handled in current thread or task, None outside of
+# request (e.g. in background threads)
+current_metrics = contextvars.ContextVar('exam_request_metrics', default=None)
+
+
+@contextmanager
+def timer(phase):
+    """Add time spent in block to phase of current request"""
+    metrics = current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.durations[phase] += time.perf_counter() - start
+
+
+def query_timer(execute, sql, params, many, context):
+    """Database execute wrapper counting queries of current request"""
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db += time.perf_counter() - start
+
+
+def install_query_timer(connection):
+    """Time every query executed by connection"""
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, query_timer)
+
+
+# True while plan of slow query is read, so EXPLAIN isn't explained
+_explaining = contextvars.ContextVar('exam_explaining', default=False)
+
+
+def slow_query_explainer(execute, sql, params, many, context):
+    """Database execute wrapper logging plan of slow SELECT queries"""
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - start
+    if (duration >= getattr(settings, 'EXAM_SLOW_QUERY_THRESHOLD', 0.1) and
+            not many and sql.lstrip()[:6].upper() == 'SELECT' and
+            not _explaining.get()):
+        explain_query(context['connection'], sql, params, duration)
+    return result
+
+
+def explain_query(connection, sql, params, duration):
+    """Log query with its plan"""
+    explaining = _explaining.set(True)
+    # Plan isn't a query of current request
+    metrics = current_metrics.set(None)
+    try:
+        # Failed query must not abort transaction of request
+        with transaction.atomic(using=connection.alias), \
+                connection.cursor() as cursor:
+            cursor.execute(
+                f'{connection.ops.explain_query_prefix()} {sql}', params
+            )
+            plan = '\n'.join(
+                ' '.join(str(value) for value in row)
+                for row in cursor.fetchall()
+            )
+    except DatabaseError as exc:
+        plan = f'EXPLAIN failed: {exc}'
+    finally:
+        current_metrics.reset(metrics)
+        _explaining.reset(explaining)
+    logger.warning(
+        'Slow query (%.1f ms): %s\n%s', duration * 1000, sql, plan,
+        extra={'duration': duration, 'sql': sql}
+    )
+
+
+def install_slow_query_explainer(connection):
+    """Log plans of slow queries executed by connection"""
+    if slow_query_explainer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_explainer)
+
+
+class ActionStats:
+    """Histogram of request duration and totals of one action"""
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.totals = dict.fromkeys(('total', 'db', 'queries') + PHASES, 0)
+
+    def observe(self, values):
+        """Record metrics of one request"""
+        index = bisect.bisect_left(BUCKETS, values['total'])
+        if index < len(BUCKETS):
+            self.buckets[index] += 1
+        self.count += 1
+        for name in self.totals:
+            self.totals[name] += values[name]
+
+
+class MetricsRegistry:
+    """Request metrics of every action served by this process"""
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def observe(self, values):
+        """Record metrics of request"""
+        with self._lock:
+            stats = self._stats.get(values['action'])
+            if stats is None:
+                stats = self._stats[values['action']] = ActionStats()
+            stats.observe(values)
+
+    def clear(self):
+        """Remove every recorded value"""
+        with self._lock:
+            self._stats.clear()
+
+    def exposition(self):
+        """Return metrics in Prometheus text format"""
+        with self._lock:
+            stats = sorted(
+                (action, stats.count, list(stats.buckets),
+                 dict(stats.totals))
+                for action, stats in self._stats.items()
+            )
+
+        lines = [
+            '# HELP exam_request_duration_seconds '
+            'Time of handling request by exam API view.',
+            '# TYPE exam_request_duration_seconds histogram',
+        ]
+        for action, count, buckets, totals in stats:
+            label = f'action="{escape_label(action)}"'
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS, buckets):
+                cumulative += bucket
+                lines.append(
+                    f'exam_request_duration_seconds_bucket'
+                    f'{{{label},le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f'exam_request_duration_seconds_bucket'
+                f'{{{label},le="+Inf"}} {count}'
+            )
+            lines.append(
+                f'exam_request_duration_seconds_sum{{{label}}} '
+                f'{totals["total"]:.6f}'
+            )
+            lines.append(
+                f'exam_request_duration_seconds_count{{{label}}} {count}'
+            )
+
+        for name, description in (
+                ('db', 'database queries'),
+                ('serializer', 'serializing data'),
+                ('auth', 'authentication'),
+                ('render', 'rendering response')):
+            metric = f'exam_request_{name}_seconds_total'
+            lines.append(f'# HELP {metric} Time spent on {description}.')
+            lines.append(f'# TYPE {metric} counter')
+            lines.extend(
+                f'{metric}{{action="{escape_label(action)}"}} '
+                f'{totals[name]:.6f}'
+                for action, count, buckets, totals in stats
+            )
+        lines.append(
+            '# HELP exam_request_queries_total Number of database queries.'
+        )
+        lines.append('# TYPE exam_request_queries_total counter')
+        lines.extend(
+            f'exam_request_queries_total{{action="{escape_label(action)}"}} '
+            f'{totals["queries"]}'
+            for action, count, buckets, totals in stats
+        )
+        return '\n'.join(lines) + '\n'
+
+
+def escape_label(value):
+    """Return value escaped for Prometheus label"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n'
+    )
+
+
+registry = MetricsRegistry()
+
+
+def server_timing(values):
+    """Return Server-Timing header value of request metrics"""
+    parts = [
+        f'db;dur={values["db"] * 1000:.1f};desc="{values["queries"]} queries"'
+    ]
+    parts.extend(
+        f'{phase};dur={values[phase] * 1000:.1f}' for phase in PHASES
+    )
+    parts.append(f'total;dur={values["total"] * 1000:.1f}')
+    return ', '.join(parts)
+
+
+class InstrumentationMiddleware:
+    """Measure every request, report it in headers, log and registry
+
+    Exam API views label requests with their action (e.g.
+    'ExamSheetViewSet.list') and time authentication, serializers and
+    rendering. Database time is measured for every request.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not getattr(settings, 'EXAM_INSTRUMENTATION', True):
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'EXAM_INSTRUMENTATION', True):
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        """Report metrics of finished request"""
+        if metrics.action is None:
+            match = request.resolver_match
+            metrics.action = match.view_name if match else 'unmatched'
+        values = metrics.as_dict(time.perf_counter() - metrics.start)
+
+        if getattr(settings, 'EXAM_SERVER_TIMING', True):
+            response['Server-Timing'] = server_timing(values)
+        registry.observe(values)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                'action=%s method=%s status=%d total_ms=%.1f db_ms=%.1f '
+                'queries=%d serializer_ms=%.1f auth_ms=%.1f render_ms=%.1f',
+                values['action'], request.method, response.status_code,
+                values['total'] * 1000, values['db'] * 1000,
+                values['queries'], values['serializer'] * 1000,
+                values['auth'] * 1000, values['render'] * 1000,
+                extra={'metrics': values}
+            )
+        return response
+
+
+class TimedListSerializer(ListSerializer):
+    """List serializer adding time of serializing to current request"""
+
+    @property
+    def data(self):
+        with timer('serializer'):
+            return super().data
+
+
+class TimedSerializerMixin:
+    """Serializer adding time of serializing to current request
+
+    Serializers created with many=True use TimedListSerializer if it's set
+    as list_serializer_class of Meta.
+    """
+
+    @property
+    def data(self):
+        with timer('serializer'):
+            return super().data
+
+
+class InstrumentedViewMixin:
+    """Label request with view action, time authentication and rendering"""
+
+    def initial(self, request, *args, **kwargs):
+        metrics = current_metrics.get()
+        if metrics is not None:
+            # Plain API views have no actions, only methods
+            action = getattr(self, 'action', None) or request.method.lower()
+            metrics.action = f'{self.__class__.__name__}.{action}'
+        super().initial(request, *args, **kwargs)
+
+    def perform_authentication(self, request):
+        with timer('auth'):
+            super().perform_authentication(request)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        metrics = current_metrics.get()
+        if metrics is not None and hasattr(response, 'render'):
+            # Response is rendered right after it's returned by view
+            start = time.perf_counter()
+
+            def rendered(response):
+                metrics.durations['render'] += time.perf_counter() - start
+
+            response.add_post_render_callback(rendered)
+        return response
@@ -0,0 +1,113 @@
+import json
+import platform
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from exam.benchmark import CACHES, PASSWORD, ROUTES, BenchmarkData, \
+                           missing_routes, run_route
+from exam.management.commands.generate_exam_data import \
+    add_dataset_arguments, dataset_options
+from exam.seed import generate_exam_data
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class Command(BaseCommand):
+    """Time every exam API route on synthetic data set"""
+    help = (
+        'Generate synthetic data set, send requests to every route of exam '
+        'API through test client (in process, DEBUG disabled) and print '
+        'p50/p95/p99 latency, queries per request and peak memory of each '
+        'route as JSON. Seeded rows are rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        add_dataset_arguments(parser)
+        parser.add_argument('--iterations', type=int, default=50,
+                            help='Timed requests per route')
+        parser.add_argument('--warmup', type=int, default=2,
+                            help='Requests per route sent before timing')
+        parser.add_argument('--output',
+                            help='File to write JSON report to (stdout by '
+                                 'default)')
+        parser.add_argument('--baseline',
+                            help='JSON report of earlier run to compare '
+                                 'latency with')
+
+    def handle(self, *args, **options):
+        kwargs = dataset_options(options)
+        missing = missing_routes(ROUTES)
+        if missing:
+            raise CommandError(
+                'Routes without benchmark requests: ' +
+                ', '.join(sorted(missing))
+            )
+        baseline = self.load_baseline(options['baseline'])
+
+        results = []
+        with override_settings(
+                DEBUG=False,
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                CACHES=CACHES, EXAM_CACHE_ALIAS='default'), \
+                transaction.atomic():
+            teachers, students = generate_exam_data(
+                prefix='benchmark-', password=PASSWORD, **kwargs
+            )
+            admin = get_user_model().objects.create_user(
+                'benchmark-admin', password=PASSWORD, is_staff=True
+            )
+            data = BenchmarkData(teachers[0], admin)
+            for route in ROUTES:
+                result = run_route(
+                    route, data, options['iterations'], options['warmup']
+                )
+                if result['route'] in baseline:
+                    before = baseline[result['route']]['p50_ms']
+                    result['baseline_p50_ms'] = before
+                    result['p50_change'] = round(
+                        result['p50_ms'] / max(before, 1e-9), 3
+                    )
+                results.append(result)
+                if options['verbosity'] > 1:
+                    self.stderr.write(
+                        f'{route}: p50 {result["p50_ms"]} ms, '
+                        f'{result["queries"]} queries'
+                    )
+            transaction.set_rollback(True)
+
+        report = json.dumps({
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'dataset': {**kwargs, 'answer_sizes': options['answer_sizes']},
+            'iterations': options['iterations'],
+            'routes': results,
+            'max_rss_kb': (
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                if resource else None
+            ),
+        }, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    def load_baseline(self, path):
+        """Return results of routes from earlier report, by route"""
+        if not path:
+            return {}
+        try:
+            with open(path) as baseline:
+                report = json.load(baseline)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Can\'t read baseline: {exc}')
+        return {result['route']: result for result in report['routes']}
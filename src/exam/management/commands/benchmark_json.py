@@ -0,0 +1,82 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from exam.models import ExamSheet
+from exam.renderers import FastJSONParser, FastJSONRenderer, \
+                           get_json_backend
+from exam.seed import seed_exam_data
+from exam.serializers import ExamSheetDetailSerializer
+
+
+class Command(BaseCommand):
+    """Compare JSON renderer and parser with ones using JSON backend"""
+    help = (
+        'Time rendering and parsing exam sheet details with many tasks by '
+        'JSONRenderer/JSONParser and by renderer/parser using '
+        'EXAM_JSON_BACKEND. Seeded rows are rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=200,
+                            help='Exam tasks of sheet')
+        parser.add_argument('--repeat', type=int, default=200,
+                            help='Runs of each renderer and parser')
+
+    def handle(self, *args, **options):
+        backend = get_json_backend()
+        self.stdout.write(
+            f'JSON backend: {backend.__class__.__name__}' if backend else
+            'JSON backend not available, json module is compared with itself'
+        )
+        data = self.payload(options['tasks'])
+        content = JSONRenderer().render(data)
+        if FastJSONRenderer().render(data) != content:
+            raise CommandError('FastJSONRenderer output differs')
+        self.stdout.write(
+            f'Exam sheet with {options["tasks"]} tasks, {len(content)} bytes'
+        )
+
+        self.compare('Render', options['repeat'], (
+            (renderer.__class__.__name__,
+             lambda renderer=renderer: renderer.render(data))
+            for renderer in (JSONRenderer(), FastJSONRenderer())
+        ))
+        self.compare('Parse', options['repeat'], (
+            (parser.__class__.__name__,
+             lambda parser=parser: parser.parse(io.BytesIO(content)))
+            for parser in (JSONParser(), FastJSONParser())
+        ))
+
+    def payload(self, tasks):
+        """Return serialized exam sheet details with given number of tasks"""
+        with transaction.atomic():
+            seed_exam_data(1, 1, tasks, prefix='benchmark-user-')
+            exam_sheet = ExamSheet.objects.prefetch_related('tasks').get(
+                owner__username__startswith='benchmark-user-'
+            )
+            # Realistic answers are longer than seeded ones
+            for task in exam_sheet.tasks.all():
+                task.description = f'Description of task "{task.title}". ' * 5
+                task.answer = f'Answer ąęłó {task.id}\n' * 10
+            data = ExamSheetDetailSerializer(exam_sheet).data
+            transaction.set_rollback(True)
+        return data
+
+    def compare(self, name, repeat, functions):
+        """Print time per run of each function and speedup of last one"""
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        times = []
+        for label, function in functions:
+            start = time.perf_counter()
+            for _ in range(max(repeat, 1)):
+                function()
+            times.append((time.perf_counter() - start) / max(repeat, 1))
+            self.stdout.write(f'  {label}: {times[-1] * 1e6:.0f} us')
+        self.stdout.write(
+            f'  Speedup: {times[0] / max(times[-1], 1e-9):.1f}x'
+        )
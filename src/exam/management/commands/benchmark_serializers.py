@@ -0,0 +1,90 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from exam.seed import seed_exam_data
+from exam.views import ExamSheetViewSet, ExamTaskViewSet
+
+
+class Command(BaseCommand):
+    """Compare serializers with values serializers of list responses"""
+    help = (
+        'Seed exam sheets of one teacher and time serializing them (with '
+        'database queries) by model serializers and by values() '
+        'serializers. Seeded rows are rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sheets', type=int, default=2000)
+        parser.add_argument('--tasks', type=int, default=5,
+                            help='Exam tasks per sheet')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Runs of each serializer, best is shown')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            teachers, student = seed_exam_data(
+                1, options['sheets'], options['tasks'],
+                prefix='benchmark-user-'
+            )
+            for viewset, action in (
+                    (ExamSheetViewSet, 'not_filtered_list'),
+                    (ExamTaskViewSet, 'list')):
+                view = self.get_view(viewset, action, teachers[0])
+                self.compare(view, options['repeat'])
+            transaction.set_rollback(True)
+
+    def get_view(self, viewset, action, user):
+        """Return viewset instance handling action for user"""
+        request = Request(APIRequestFactory().get('/'))
+        request.user = user
+        return viewset(action=action, request=request, format_kwarg=None)
+
+    def compare(self, view, repeat):
+        """Print time of both serializers of view and check their output"""
+        queryset = view.filter_queryset(view.get_queryset()).order_by('id')
+        fast = view.fast_serializer_class()
+
+        def serialize():
+            return view.get_serializer(queryset.all(), many=True).data
+
+        def fast_serialize():
+            return fast.represent(fast.values(queryset))
+
+        (serializer_time, data), (fast_time, fast_data) = (
+            self.best_time(function, repeat)
+            for function in (serialize, fast_serialize)
+        )
+        renderer = JSONRenderer()
+        if renderer.render(data) != renderer.render(fast_data):
+            raise CommandError(
+                f'{fast.__class__.__name__} output differs from '
+                f'{fast.serializer_class.__name__}'
+            )
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{view.__class__.__name__}.{view.action}: {len(data)} rows'
+        ))
+        self.stdout.write(
+            f'  {fast.serializer_class.__name__}: '
+            f'{serializer_time * 1000:.1f} ms'
+        )
+        self.stdout.write(
+            f'  {fast.__class__.__name__}: {fast_time * 1000:.1f} ms'
+        )
+        self.stdout.write(
+            f'  Speedup: {serializer_time / max(fast_time, 1e-9):.1f}x'
+        )
+
+    def best_time(self, function, repeat):
+        """Return shortest time of running function and its result"""
+        times = []
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            result = function()
+            times.append(time.perf_counter() - start)
+        return min(times), result
@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from exam.models import ExamSheet, ExamTask
+from exam.seed import seed_exam_data
+from exam.views import ExamSheetViewSet, ExamTaskViewSet
+
+
+class Command(BaseCommand):
+    """Show query plans of exam API querysets on seeded data set"""
+    help = (
+        'Seed large data set and print query plan of every exam '
+        'viewset action. Seeded rows are rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teachers', type=int, default=20)
+        parser.add_argument('--sheets', type=int, default=500,
+                            help='Exam sheets per teacher')
+        parser.add_argument('--tasks', type=int, default=5,
+                            help='Exam tasks per sheet')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Database vendor: {connection.vendor}')
+        with transaction.atomic():
+            teachers, student = seed_exam_data(
+                options['teachers'], options['sheets'], options['tasks']
+            )
+            teacher = teachers[0]
+            for name, queryset in self.querysets(teacher, student):
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                self.stdout.write(queryset.explain())
+            transaction.set_rollback(True)
+
+    def querysets(self, teacher, student):
+        """Yield name and paginated queryset of every list action"""
+        sheet_id = ExamSheet.objects.filter(owner=teacher).first().id
+        actions = (
+            (ExamSheetViewSet, 'list', {}),
+            (ExamSheetViewSet, 'list', {'student': student.id}),
+            (ExamSheetViewSet, 'archive_list', {}),
+            (ExamSheetViewSet, 'not_filtered_list', {}),
+            (ExamTaskViewSet, 'list', {}),
+        )
+        for viewset, action, params in actions:
+            queryset = self.get_queryset(viewset, action, teacher, params)
+            yield (
+                f'{viewset.__name__}.{action} {params or ""}',
+                queryset.order_by('id')[:100]
+            )
+
+        queryset = self.get_queryset(
+            ExamTaskViewSet, 'task_list_for_sheet', teacher, {}
+        )
+        yield (
+            'ExamTaskViewSet.task_list_for_sheet',
+            queryset.filter(exam_sheet__pk=sheet_id).order_by('id')[:100]
+        )
+        yield (
+            'Prefetch of tasks for sheet list',
+            ExamTask.objects.filter(exam_sheet__in=list(
+                ExamSheet.objects.filter(owner=teacher).values_list(
+                    'id', flat=True
+                )[:100]
+            )).only('id', 'exam_sheet')
+        )
+
+    def get_queryset(self, viewset, action, user, params):
+        """Return queryset built by viewset for given action"""
+        request = Request(APIRequestFactory().get('/', params))
+        request.user = user
+        view = viewset(action=action, request=request, format_kwarg=None)
+        return view.filter_queryset(view.get_queryset())
@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from exam.models import ExamSheet, ExamTask
+from exam.seed import generate_exam_data, parse_answer_sizes
+
+
+def add_dataset_arguments(parser):
+    """Add options describing size of synthetic data set"""
+    parser.add_argument('--teachers', type=int, default=10)
+    parser.add_argument('--students', type=int, default=50)
+    parser.add_argument('--sheets', type=int, default=20,
+                        help='Exam sheets per teacher')
+    parser.add_argument('--tasks', type=int, default=10,
+                        help='Exam tasks per sheet')
+    parser.add_argument(
+        '--answer-sizes', default='0:30,40:40,400:20,4000:10',
+        help='Answer lengths in characters with their weights as '
+             'size:weight,... (size 0 means no answer)'
+    )
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed of random generator')
+
+
+def dataset_options(options):
+    """Return keyword arguments of generate_exam_data from options"""
+    for name in ('teachers', 'students', 'sheets', 'tasks'):
+        if options[name] < 1:
+            raise CommandError(f'--{name} has to be at least 1')
+    try:
+        answer_sizes = parse_answer_sizes(options['answer_sizes'])
+    except ValueError as exc:
+        raise CommandError(exc)
+    return dict(
+        teachers=options['teachers'], students=options['students'],
+        sheets=options['sheets'], tasks=options['tasks'],
+        answer_sizes=answer_sizes, seed=options['seed']
+    )
+
+
+class Command(BaseCommand):
+    """Create synthetic data set of exam sheets, tasks and answers"""
+    help = (
+        'Create teachers, students, exam sheets of every teacher and '
+        'tasks of every sheet with answers of random sizes. The same '
+        'options give the same data set.'
+    )
+
+    def add_arguments(self, parser):
+        add_dataset_arguments(parser)
+        parser.add_argument('--prefix', default='dataset-',
+                            help='Prefix of usernames of created users')
+        parser.add_argument('--password',
+                            help='Password of created users, unusable '
+                                 'if not given')
+        parser.add_argument('--replace', action='store_true',
+                            help='Delete users with prefix (and their '
+                                 'exam sheets) first')
+
+    def handle(self, *args, **options):
+        kwargs = dataset_options(options)
+        users = get_user_model().objects.filter(
+            username__startswith=options['prefix']
+        )
+        with transaction.atomic():
+            if options['replace']:
+                users.delete()
+            elif users.exists():
+                raise CommandError(
+                    f'Users with prefix "{options["prefix"]}" exist, use '
+                    '--replace or other --prefix'
+                )
+            teachers, students = generate_exam_data(
+                prefix=options['prefix'], password=options['password'],
+                **kwargs
+            )
+
+        sheets = ExamSheet.objects.filter(owner__in=teachers)
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(teachers)} teachers, {len(students)} students, '
+            f'{sheets.count()} exam sheets and '
+            f'{ExamTask.objects.filter(exam_sheet__in=sheets).count()} '
+            'exam tasks'
+        ))
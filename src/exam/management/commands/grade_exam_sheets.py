@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from exam.grading import grade_sheets
+from exam.models import ExamSheet
+
+
+class Command(BaseCommand):
+    """Grade answers of many exam sheets in one batched pass"""
+    help = (
+        'Score answers to tasks with rubric and grade exam sheets whose '
+        'every task has one. Sheets are given by ids or by username of '
+        'teacher owning them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('sheets', nargs='*', type=int,
+                            help='Ids of exam sheets')
+        parser.add_argument('--owner',
+                            help='Grade every exam sheet of this teacher')
+        parser.add_argument('--include-archived', action='store_true',
+                            help='Grade archived sheets of teacher too')
+        parser.add_argument('--workers', type=int,
+                            help='Worker processes scoring batches, 1 '
+                                 'scores in this process (chosen by '
+                                 'number of sheets by default)')
+        parser.add_argument('--batch-size', type=int,
+                            help='Sheets read, scored and written together '
+                                 '(EXAM_GRADING_BATCH_SIZE by default)')
+
+    def handle(self, *args, **options):
+        if bool(options['sheets']) == bool(options['owner']):
+            raise CommandError('Give either ids of exam sheets or --owner.')
+        for name in ('workers', 'batch_size'):
+            if options[name] is not None and options[name] < 1:
+                raise CommandError(
+                    f'--{name.replace("_", "-")} has to be at least 1'
+                )
+
+        sheets = ExamSheet.objects.all()
+        if options['owner']:
+            User = get_user_model()
+            try:
+                owner = User.objects.get_by_natural_key(options['owner'])
+            except User.DoesNotExist:
+                raise CommandError(f'User "{options["owner"]}" not found.')
+            sheets = sheets.filter(owner=owner)
+            if not options['include_archived']:
+                sheets = sheets.filter(is_archived=False)
+        else:
+            sheets = sheets.filter(pk__in=options['sheets'])
+        sheet_ids = list(sheets.values_list('id', flat=True))
+
+        scores, changed_tasks = grade_sheets(
+            sheet_ids, workers=options['workers'],
+            batch_size=options['batch_size']
+        )
+        graded = sum(score.grade is not None for score in scores)
+        self.stdout.write(
+            f'Graded {graded} of {len(sheet_ids)} exam sheets, points of '
+            f'{changed_tasks} tasks changed.'
+        )
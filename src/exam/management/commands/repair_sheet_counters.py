@@ -0,0 +1,56 @@
+from functools import reduce
+from operator import or_
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Q
+
+from exam.models import COUNTER_FIELDS, ExamSheet, sheet_counters
+from exam.signals import sheets_changed
+
+
+def stale_sheet_ids():
+    """Return ids of exam sheets whose counters don't match their tasks"""
+    counted = {
+        f'counted_{name}': expression
+        for name, expression in sheet_counters().items()
+    }
+    return ExamSheet.objects.alias(**counted).filter(reduce(or_, (
+        ~Q(**{name: F(f'counted_{name}')}) for name in COUNTER_FIELDS
+    ))).order_by('id').values_list('id', flat=True)
+
+
+class Command(BaseCommand):
+    """Recompute denormalized counters of exam sheets"""
+    help = (
+        'Find exam sheets whose task count, answered count or total '
+        'points differ from their tasks and recompute them in batches.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Exam sheets updated by one query')
+        parser.add_argument('--check', action='store_true',
+                            help='Only report stale sheets, fail if any')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size has to be at least 1')
+        sheet_ids = list(stale_sheet_ids())
+        if options['check']:
+            if sheet_ids:
+                raise CommandError(
+                    f'{len(sheet_ids)} exam sheets have stale counters: '
+                    + ', '.join(map(str, sheet_ids[:20]))
+                )
+            self.stdout.write('Counters of every exam sheet are correct.')
+            return
+
+        for start in range(0, len(sheet_ids), batch_size):
+            # Cached payloads of repaired sheets are invalidated too
+            with transaction.atomic():
+                sheets_changed(sheet_ids[start:start + batch_size])
+        self.stdout.write(
+            f'Repaired counters of {len(sheet_ids)} exam sheets.'
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from exam.sqlite import read_pragmas
+
+
+class Command(BaseCommand):
+    """Show pragmas of SQLite database connection"""
+    help = 'Print active values of tuned pragmas of SQLite database.'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(
+                f'Database vendor is {connection.vendor}, not sqlite.'
+            )
+        for name, value in read_pragmas(connection).items():
+            self.stdout.write(f'{name} = {value}')
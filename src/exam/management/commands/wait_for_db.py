@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.utils import OperationalError
+
+
+class Command(BaseCommand):
+    """Wait until database accepts connections"""
+    help = 'Wait until default database is available.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--timeout', type=float, default=60,
+                            help='Seconds to wait before giving up')
+        parser.add_argument('--interval', type=float, default=1)
+
+    def handle(self, *args, **options):
+        self.stdout.write('Waiting for database...')
+        deadline = time.monotonic() + options['timeout']
+        while True:
+            try:
+                connections['default'].ensure_connection()
+                break
+            except OperationalError:
+                if time.monotonic() >= deadline:
+                    raise
+                self.stdout.write('Database unavailable, waiting...')
+                time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS('Database available'))
@@ -0,0 +1,25 @@
+# Generated by Django 2.1.15 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0003_examtask'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='examsheet',
+            index=models.Index(fields=['owner', 'is_archived', 'id'], name='exam_sheet_owner_arch_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examsheet',
+            index=models.Index(fields=['student', 'is_archived'], name='exam_sheet_student_arch_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examtask',
+            index=models.Index(fields=['exam_sheet', 'id'], name='exam_task_sheet_id_idx'),
+        ),
+    ]
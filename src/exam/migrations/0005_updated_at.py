@@ -0,0 +1,26 @@
+# Generated by Django 2.1.15 on 2026-10-18 13:58
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0004_exam_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examsheet',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='examtask',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
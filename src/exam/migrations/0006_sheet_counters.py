@@ -0,0 +1,47 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def count_tasks(apps, schema_editor):
+    """Compute counters of existing exam sheets from their tasks"""
+    ExamSheet = apps.get_model('exam', 'ExamSheet')
+    ExamTask = apps.get_model('exam', 'ExamTask')
+
+    def aggregate(value):
+        return Coalesce(Subquery(
+            ExamTask.objects.filter(exam_sheet=OuterRef('pk')).order_by()
+            .values('exam_sheet').annotate(value=value).values('value')
+        ), 0)
+
+    ExamSheet.objects.using(schema_editor.connection.alias).update(
+        task_count=aggregate(Count('id')),
+        answered_count=aggregate(Count('id', filter=Q(answer__gt=''))),
+        total_points=aggregate(Sum('points')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0005_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examsheet',
+            name='task_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='examsheet',
+            name='answered_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='examsheet',
+            name='total_points',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_tasks, migrations.RunPython.noop),
+    ]
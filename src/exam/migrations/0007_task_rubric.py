@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0006_sheet_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examtask',
+            name='expected_answer',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='examtask',
+            name='max_points',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='examtask',
+            name='rubric',
+            field=models.CharField(blank=True, choices=[('exact', 'exact'), ('normalized', 'normalized'), ('regex', 'regex'), ('numeric', 'numeric')], max_length=16, null=True),
+        ),
+        migrations.AddField(
+            model_name='examtask',
+            name='tolerance',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
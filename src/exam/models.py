@@ -1,7 +1,22 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 
 from django.conf import settings
 
+from exam.scoring import RUBRICS
+
+# Denormalized from tasks of sheet by exam.signals.sheets_changed
+COUNTER_FIELDS = ('task_count', 'answered_count', 'total_points')
+
+
+def loaded_values(instance, names):
+    """Return values of given fields loaded from database, not deferred"""
+    return {
+        name: instance.__dict__[name]
+        for name in names if name in instance.__dict__
+    }
+
 
 class ExamSheet(models.Model):
     owner = models.ForeignKey(
@@ -23,6 +38,46 @@ class ExamSheet(models.Model):
         null=True
     )
     is_archived = models.BooleanField(default=False)
+    # Changed also when any task of sheet changes
+    updated_at = models.DateTimeField(auto_now=True)
+    task_count = models.PositiveIntegerField(default=0)
+    answered_count = models.PositiveIntegerField(default=0)
+    total_points = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Owner's active or archived sheets ordered for pagination
+            models.Index(
+                fields=['owner', 'is_archived', 'id'],
+                name='exam_sheet_owner_arch_idx'
+            ),
+            models.Index(
+                fields=['student', 'is_archived'],
+                name='exam_sheet_student_arch_idx'
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Compared on save to tell which change happened
+        instance._loaded_values = loaded_values(
+            instance, ('grade', 'is_archived')
+        )
+        return instance
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # Counters loaded with instance may be outdated already, they
+            # are only written by recomputing them from tasks
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and
+                field.attname not in deferred and
+                field.name not in COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.description
@@ -38,6 +93,65 @@ class ExamTask(models.Model):
     description = models.TextField(blank=True, null=True)
     answer = models.TextField(blank=True, null=True)
     points = models.IntegerField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # How answer is scored automatically, graded by hand without rubric
+    rubric = models.CharField(
+        max_length=16,
+        choices=[(rubric, rubric) for rubric in RUBRICS],
+        blank=True,
+        null=True
+    )
+    expected_answer = models.TextField(blank=True, null=True)
+    # Allowed difference from expected answer with numeric rubric
+    tolerance = models.FloatField(blank=True, null=True)
+    # Points of correct answer
+    max_points = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            # Tasks of sheet ordered for pagination
+            models.Index(
+                fields=['exam_sheet', 'id'],
+                name='exam_task_sheet_id_idx'
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Sheet that task was loaded with, changed when task is moved
+        instance._loaded_exam_sheet_id = instance.__dict__.get(
+            'exam_sheet_id'
+        )
+        instance._loaded_values = loaded_values(instance, ('answer',))
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Counters of sheet are recomputed by post_save receiver, in the
+        # same transaction as the task is written
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f'{self.title} in exam sheet {self.exam_sheet.id}'
+
+
+def task_aggregate(aggregate):
+    """Return subquery of aggregate over tasks of outer exam sheet"""
+    return Coalesce(Subquery(
+        ExamTask.objects.filter(exam_sheet=OuterRef('pk')).order_by().values(
+            'exam_sheet'
+        ).annotate(value=aggregate).values('value')
+    ), 0)
+
+
+def sheet_counters():
+    """Return expressions recomputing counters of exam sheet from tasks"""
+    return {
+        'task_count': task_aggregate(Count('id')),
+        # Neither missing nor empty answer is counted
+        'answered_count': task_aggregate(
+            Count('id', filter=Q(answer__gt=''))
+        ),
+        'total_points': task_aggregate(Sum('points')),
+    }
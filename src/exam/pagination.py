@@ -0,0 +1,57 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset pagination over primary key
+
+    Next page is selected with id greater than last seen one, so deep pages
+    cost the same as the first one.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        """Return requested page size, default and limit from settings"""
+        self.page_size = getattr(settings, 'EXAM_PAGE_SIZE', 100)
+        self.max_page_size = getattr(settings, 'EXAM_MAX_PAGE_SIZE', 1000)
+        return super().get_page_size(request)
+
+
+class PaginatedActionMixin:
+    """Pagination of querysets returned by custom list actions
+
+    If `fast_serializer_class` is set and action uses its serializer, page
+    is read as values() rows and serialized without serializer fields.
+    """
+    fast_serializer_class = None
+
+    def get_fast_serializer(self):
+        """Return values serializer replacing serializer of action, if any"""
+        fast_class = self.fast_serializer_class
+        if fast_class is None or not getattr(
+                settings, 'EXAM_FAST_SERIALIZERS', True):
+            return None
+        if self.get_serializer_class() is not fast_class.serializer_class:
+            return None
+        return fast_class(self.request)
+
+    def serialized_page(self, queryset):
+        """Return serialized page of queryset"""
+        fast = self.get_fast_serializer()
+        if fast is not None:
+            page = self.paginate_queryset(fast.values(queryset))
+            return fast.represent(page)
+        page = self.paginate_queryset(queryset)
+        return self.get_serializer(page, many=True).data
+
+    def paginated_response(self, queryset):
+        """Return response with serialized page of queryset"""
+        return self.get_paginated_response(self.serialized_page(queryset))
+
+    async def apaginated_response(self, queryset):
+        """Async version of paginated_response"""
+        # Cursor pagination evaluates page of queryset itself
+        data = await sync_to_async(self.serialized_page)(queryset)
+        return self.get_paginated_response(data)
@@ -1,3 +1,4 @@
+from rest_framework.filters import BaseFilterBackend
 from rest_framework.permissions import BasePermission
 
 SAFE_METHODS = ['GET', 'POST', 'HEAD', 'OPTIONS']
@@ -7,28 +8,54 @@ class IsOwnerOrReadOnly(BasePermission):
     """Permits only owner to make any changes or delete"""
 
     def has_object_permission(self, request, view, obj):
-        if request.method in SAFE_METHODS or obj.owner == request.user:
+        if (request.method in SAFE_METHODS or
+                obj.owner_id == request.user.pk):
             return True
         return False
 
 
 class IsExamTaskOwnerOrReadOnly(BasePermission):
-    """Permits only owner to make any changes or delete"""
+    """Permits only owner to make any changes or delete
+
+    Compares ids only, so exam sheet should be loaded with task.
+    """
 
     def has_object_permission(self, request, view, obj):
         if (request.method in SAFE_METHODS or
-                obj.exam_sheet.owner == request.user):
+                obj.exam_sheet.owner_id == request.user.pk):
             return True
         return False
 
 
 class IsStudentOrOwnerOrReadOnly(BasePermission):
-    """Permits only owner or student to make any changes or delete"""
+    """Permits only owner or student to make any changes or delete
 
-    def has_object_permission(self, request, view, obj):
+    Compares ids only, so exam sheet should be loaded with task.
+    """
 
+    def has_object_permission(self, request, view, obj):
         if (request.method in SAFE_METHODS or
-                obj.exam_sheet.owner == request.user or
-                obj.exam_sheet.student == request.user):
+                request.user.pk in (obj.exam_sheet.owner_id,
+                                    obj.exam_sheet.student_id)):
             return True
         return False
+
+
+class IsSheetStudentOrOwner(BasePermission):
+    """Permits only owner or student of exam sheet"""
+
+    def has_object_permission(self, request, view, obj):
+        return request.user.pk in (obj.owner_id, obj.student_id)
+
+
+class ExamTaskOwnerFilter(BaseFilterBackend):
+    """Limits exam tasks to ones of sheets owned by user in database
+
+    Actions named in `unfiltered_actions` of view are not limited, their
+    objects are checked by permission classes instead.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if view.action in getattr(view, 'unfiltered_actions', ()):
+            return queryset
+        return queryset.filter(exam_sheet__owner_id=request.user.pk)
@@ -0,0 +1,123 @@
+import codecs
+import functools
+import logging
+import re
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+logger = logging.getLogger(__name__)
+
+# Same output as compact JSONRenderer of rest framework
+_encoder = encoders.JSONEncoder(
+    ensure_ascii=False, separators=(',', ':'), allow_nan=False
+)
+
+# Floats below 1e-4 are written by orjson without exponent or with one
+# digit exponent (0.00001, 1e-7), by json module as 1e-05 and 1e-07.
+# Strings which look like them only cost encoding with json module
+_ORJSON_FLOAT = re.compile(rb'(?<![0-9.])0\.0000|[0-9]e-[0-9](?![0-9])')
+
+
+class OrjsonBackend:
+    """JSON encoding with orjson, several times faster than json module
+
+    Output is the same as of compact JSONRenderer: types orjson doesn't
+    know (and datetimes, formatted differently by it) are converted by
+    rest framework encoder, output with floats formatted differently is
+    rejected. Only NaN and infinity differ, written as null instead of
+    error, serializers don't accept them.
+    """
+
+    def __init__(self):
+        import orjson
+
+        self.orjson = orjson
+        self.options = (
+            orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        )
+        self.default = encoders.JSONEncoder().default
+
+    def dumps(self, data):
+        """Return data encoded as UTF-8 JSON"""
+        content = self.orjson.dumps(
+            data, default=self.default, option=self.options
+        )
+        if _ORJSON_FLOAT.search(content):
+            raise ValueError('Float formatted differently than by json')
+        return content
+
+    def loads(self, content):
+        """Return data decoded from UTF-8 JSON"""
+        return self.orjson.loads(content)
+
+
+@functools.lru_cache()
+def _load_backend(path):
+    try:
+        return import_string(path)()
+    except ImportError as exc:
+        logger.info('JSON backend %s not available: %s', path, exc)
+        return None
+
+
+def get_json_backend():
+    """Return backend set by EXAM_JSON_BACKEND setting
+
+    None means json module, also used when backend can't be imported.
+    """
+    path = getattr(settings, 'EXAM_JSON_BACKEND', None)
+    return _load_backend(path) if path else None
+
+
+def json_dumps(data):
+    """Return data encoded as compact UTF-8 JSON"""
+    backend = get_json_backend()
+    if backend is not None:
+        try:
+            content = backend.dumps(data)
+        except (TypeError, ValueError):
+            # e.g. integers above 64 bits or small floats, json module
+            # encodes them like JSONRenderer
+            pass
+        else:
+            # Line separators are escaped by json module, see JSONRenderer
+            return content.replace(
+                b'\xe2\x80\xa8', b'\\u2028'
+            ).replace(b'\xe2\x80\xa9', b'\\u2029')
+    return _encoder.encode(data).replace(
+        '\u2028', '\\u2028'
+    ).replace('\u2029', '\\u2029').encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON renderer encoding with EXAM_JSON_BACKEND
+
+    Indented output (e.g. of browsable API) is rendered by json module.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (data is None or not self.compact or self.ensure_ascii or
+                self.get_indent(accepted_media_type, renderer_context or {})):
+            return super().render(data, accepted_media_type, renderer_context)
+        return json_dumps(data)
+
+
+class FastJSONParser(JSONParser):
+    """JSON parser decoding with EXAM_JSON_BACKEND"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        backend = get_json_backend()
+        encoding = (parser_context or {}).get(
+            'encoding', settings.DEFAULT_CHARSET
+        )
+        if backend is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return backend.loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,112 @@
+import math
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# Ways of comparing answer of exam task with its expected answer
+EXACT = 'exact'
+NORMALIZED = 'normalized'
+REGEX = 'regex'
+NUMERIC = 'numeric'
+RUBRICS = (EXACT, NORMALIZED, REGEX, NUMERIC)
+
+# Lowest percent of points of sheet needed for each grade
+DEFAULT_GRADE_SCALE = (
+    (90, 'A'), (75, 'B'), (60, 'C'), (50, 'D'), (0, 'F'),
+)
+
+# Fields of exam task read by scoring, in order of values_list()
+TaskRubric = namedtuple(
+    'TaskRubric',
+    'id rubric expected_answer tolerance max_points answer points'
+)
+
+# Points scored by tasks with rubric and grade of sheet, None if some of
+# its tasks have to be graded by hand
+SheetScore = namedtuple('SheetScore', 'sheet_id points grade')
+
+
+def normalize(text):
+    """Return text compared case-insensitively, with whitespace collapsed"""
+    return ' '.join(text.casefold().split())
+
+
+@lru_cache(maxsize=1024)
+def compile_pattern(pattern):
+    """Return compiled regular expression, cached between tasks"""
+    return re.compile(pattern)
+
+
+def parse_number(text):
+    """Return number written in text, decimal comma is accepted"""
+    return float(text.strip().replace(',', '.'))
+
+
+def check_rubric(rubric, expected_answer):
+    """Raise ValueError if answers can't be compared with expected one"""
+    if rubric is None:
+        return
+    if rubric not in RUBRICS:
+        raise ValueError(f'Unknown rubric "{rubric}".')
+    if not expected_answer:
+        raise ValueError('Expected answer is required by rubric.')
+    if rubric == REGEX:
+        try:
+            compile_pattern(expected_answer)
+        except re.error as exc:
+            raise ValueError(f'Invalid regular expression: {exc}.')
+    elif rubric == NUMERIC:
+        try:
+            number = parse_number(expected_answer)
+        except ValueError:
+            raise ValueError('Expected answer has to be a number.')
+        if not math.isfinite(number):
+            raise ValueError('Expected answer has to be a finite number.')
+
+
+def is_correct(task):
+    """Return True if answer of task matches its expected answer"""
+    answer, expected = task.answer, task.expected_answer
+    if not answer:
+        return False
+    if task.rubric == EXACT:
+        return answer == expected
+    elif task.rubric == NORMALIZED:
+        return normalize(answer) == normalize(expected)
+    elif task.rubric == REGEX:
+        return compile_pattern(expected).fullmatch(answer.strip()) is not None
+    try:
+        number = parse_number(answer)
+    except ValueError:
+        return False
+    return abs(number - parse_number(expected)) <= (task.tolerance or 0)
+
+
+def grade_for(percent, scale):
+    """Return grade of given percent of points"""
+    for threshold, grade in scale:
+        if percent >= threshold:
+            return grade
+    return None
+
+
+def score_sheet(sheet_id, tasks, scale):
+    """Return points of tasks with rubric and grade of whole sheet"""
+    points = {
+        task.id: task.max_points if is_correct(task) else 0
+        for task in tasks if task.rubric
+    }
+    maximum = sum(task.max_points for task in tasks)
+    grade = None
+    if tasks and len(points) == len(tasks) and maximum > 0:
+        grade = grade_for(100 * sum(points.values()) / maximum, scale)
+    return SheetScore(sheet_id, points, grade)
+
+
+def score_sheets(sheets, scale=DEFAULT_GRADE_SCALE):
+    """Score list of (sheet id, tasks) pairs
+
+    Only plain values are passed in and returned, so batches can be
+    scored in worker processes.
+    """
+    return [score_sheet(sheet_id, tasks, scale) for sheet_id, tasks in sheets]
@@ -0,0 +1,164 @@
+import random
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+from exam.models import ExamSheet, ExamTask, sheet_counters
+
+# Answer text sizes in characters and their weights, 0 means no answer
+DEFAULT_ANSWER_SIZES = ((0, 30), (40, 40), (400, 20), (4000, 10))
+
+_WORDS = (
+    'exam', 'answer', 'task', 'sheet', 'student', 'because', 'therefore',
+    'equation', 'result', 'value', 'proof', 'zażółć', 'gęślą', 'jaźń',
+)
+
+
+def seed_exam_data(teachers, sheets, tasks, prefix='explain-user-'):
+    """Create data set, return list of teachers and one student
+
+    Every teacher gets given number of sheets with given number of tasks,
+    student is assigned to every tenth sheet and every fourth sheet is
+    archived.
+    """
+    user_model = get_user_model()
+    # Usernames are unique, so prefix avoids clashes with real users
+    user_model.objects.bulk_create(
+        user_model(username=f'{prefix}{number}')
+        for number in range(teachers + 1)
+    )
+    users = list(user_model.objects.filter(
+        username__startswith=prefix
+    ).order_by('id'))
+    student, teachers = users[0], users[1:]
+
+    ExamSheet.objects.bulk_create((
+        ExamSheet(
+            owner=teacher,
+            student=student if number % 10 == 0 else None,
+            description=f'Exam sheet {number}',
+            is_archived=number % 4 == 0
+        )
+        for teacher in teachers
+        for number in range(sheets)
+    ))
+    sheet_ids = ExamSheet.objects.filter(
+        owner__in=teachers
+    ).values_list('id', flat=True)
+    ExamTask.objects.bulk_create((
+        ExamTask(
+            exam_sheet_id=sheet_id,
+            title=f'Task {number}',
+            answer=f'Answer {number}' if number % 2 else None,
+            points=number
+        )
+        for sheet_id in sheet_ids.iterator()
+        for number in range(tasks)
+    ))
+    # Bulk inserted tasks aren't counted by signals
+    ExamSheet.objects.filter(owner__in=teachers).update(**sheet_counters())
+    return teachers, student
+
+
+def parse_answer_sizes(value):
+    """Return answer sizes and weights from 'size:weight,...' string"""
+    sizes = []
+    for item in value.split(','):
+        size, _, weight = item.partition(':')
+        try:
+            size, weight = int(size), float(weight or 1)
+        except ValueError:
+            raise ValueError(f'Invalid answer size "{item.strip()}"')
+        if size < 0 or weight < 0:
+            raise ValueError(f'Invalid answer size "{item.strip()}"')
+        sizes.append((size, weight))
+    if not any(weight for size, weight in sizes):
+        raise ValueError('At least one answer size needs positive weight')
+    return tuple(sizes)
+
+
+def bulk_create_batches(model, objects, batch_size=2000):
+    """Insert objects from iterable in batches, without keeping them"""
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            return
+        model.objects.bulk_create(batch)
+
+
+def generate_exam_data(teachers, students, sheets, tasks,
+                       answer_sizes=DEFAULT_ANSWER_SIZES, seed=0,
+                       prefix='dataset-', password=None):
+    """Create synthetic data set, return lists of teachers and students
+
+    Every teacher gets given number of sheets with given number of tasks.
+    Sheets are assigned to random students, every fourth sheet is
+    archived and answers have random sizes from answer_sizes. The same
+    arguments always give the same data set.
+    """
+    rng = random.Random(seed)
+    user_model = get_user_model()
+    # Hashing password once instead of per user
+    password = make_password(password)
+    bulk_create_batches(user_model, (
+        user_model(username=f'{prefix}{role}-{number}', password=password)
+        for role, count in (('teacher', teachers), ('student', students))
+        for number in range(count)
+    ))
+    users = user_model.objects.filter(
+        username__startswith=prefix
+    ).order_by('id')
+    teachers = [
+        user for user in users
+        if user.username.startswith(f'{prefix}teacher-')
+    ]
+    students = [
+        user for user in users
+        if user.username.startswith(f'{prefix}student-')
+    ]
+
+    bulk_create_batches(ExamSheet, (
+        ExamSheet(
+            owner=teacher,
+            student=rng.choice(students) if students else None,
+            description=f'Exam sheet {number} of {teacher.username}',
+            is_archived=number % 4 == 0
+        )
+        for teacher in teachers
+        for number in range(sheets)
+    ))
+    sheet_ids = ExamSheet.objects.filter(
+        owner__in=teachers
+    ).order_by('id').values_list('id', flat=True)
+    sizes, weights = zip(*answer_sizes)
+    bulk_create_batches(ExamTask, (
+        ExamTask(
+            exam_sheet_id=sheet_id,
+            title=f'Task {number}',
+            description=f'Description of task {number}',
+            answer=answer_text(rng, size),
+            points=rng.randint(0, 10)
+        )
+        for sheet_id in sheet_ids.iterator()
+        for number, size in enumerate(
+            rng.choices(sizes, weights, k=tasks)
+        )
+    ))
+    # Bulk inserted tasks aren't counted by signals
+    ExamSheet.objects.filter(owner__in=teachers).update(**sheet_counters())
+    return teachers, students
+
+
+def answer_text(rng, size):
+    """Return random text of given length, None for size 0"""
+    if not size:
+        return None
+    words = []
+    # Length of words joined with spaces, without the last one
+    length = -1
+    while length < size:
+        words.append(rng.choice(_WORDS))
+        length += len(words[-1]) + 1
+    return ' '.join(words)[:size]
@@ -1,11 +1,64 @@
+import math
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+from exam.instrumentation import TimedListSerializer, TimedSerializerMixin
+from exam.models import COUNTER_FIELDS, ExamSheet, ExamTask
+from exam.scoring import check_rubric
+
+
+def counters_requested(request):
+    """Return True if request asks for counters of exam sheets"""
+    return request is not None and request.query_params.get(
+        'counters', ''
+    ).lower() in ('1', 'true')
+
+
+class ManyPrimaryKeysField(serializers.ManyRelatedField):
+    """List of primary keys validated with one query, not one per item"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        queryset = child.get_queryset()
+        pks = []
+        for item in data:
+            try:
+                if isinstance(item, bool):
+                    raise TypeError
+                pks.append(queryset.model._meta.pk.to_python(item))
+            except (TypeError, DjangoValidationError):
+                child.fail('incorrect_type', data_type=type(item).__name__)
+        objects = queryset.in_bulk(pks)
+        for item, pk in zip(data, pks):
+            if pk not in objects:
+                child.fail('does_not_exist', pk_value=item)
+        return [objects[pk] for pk in pks]
 
-from exam.models import ExamSheet, ExamTask
 
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field, list of which is validated with one query"""
 
-class ExamSheetSerializer(serializers.ModelSerializer):
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return ManyPrimaryKeysField(**list_kwargs)
+
+
+class ExamSheetSerializer(TimedSerializerMixin,
+                          serializers.ModelSerializer):
     """Serializer for exam sheet objects"""
-    tasks = serializers.PrimaryKeyRelatedField(
+    tasks = BulkPrimaryKeyRelatedField(
         many=True,
         queryset=ExamTask.objects.all()
     )
@@ -15,22 +68,90 @@ class ExamSheetSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'owner', 'student',
             'description', 'tasks', 'grade', 'is_archived'
-            )
-        read_only_fields = ('id', 'owner', 'is_archived')
+            ) + COUNTER_FIELDS
+        read_only_fields = ('id', 'owner', 'is_archived') + COUNTER_FIELDS
+        # Shown only if requested with query param counters=1
+        optional_fields = COUNTER_FIELDS
+        list_serializer_class = TimedListSerializer
 
+    @classmethod
+    def shown_fields(cls, request):
+        """Return names of fields shown in response to request"""
+        if counters_requested(request):
+            return cls.Meta.fields
+        return tuple(
+            name for name in cls.Meta.fields
+            if name not in cls.Meta.optional_fields
+        )
 
-class ExamTaskSerializer(serializers.ModelSerializer):
+    def get_field_names(self, declared_fields, info):
+        return self.shown_fields(self.context.get('request'))
+
+
+class ExamTaskSerializer(TimedSerializerMixin,
+                         serializers.ModelSerializer):
     """Serializer for exam task"""
     class Meta:
         model = ExamTask
         fields = (
             'id', 'exam_sheet', 'title',
-            'description', 'answer', 'points'
+            'description', 'answer', 'points',
+            'rubric', 'expected_answer', 'tolerance', 'max_points'
         )
         read_only_fields = ('id',)
+        # Tasks are shown to students too
+        extra_kwargs = {'expected_answer': {'write_only': True}}
+        list_serializer_class = TimedListSerializer
 
+    def validate_tolerance(self, value):
+        """Check that tolerance is finite, NaN can't be rendered as JSON"""
+        if value is not None and not math.isfinite(value):
+            raise serializers.ValidationError(
+                'Tolerance has to be a finite number.'
+            )
+        return value
 
-class ExamTaskStudentSerializer(serializers.ModelSerializer):
+    def validate(self, attrs):
+        """Check that expected answer can be compared by rubric"""
+        def current(name):
+            return attrs.get(name, getattr(self.instance, name, None))
+
+        try:
+            check_rubric(current('rubric'), current('expected_answer'))
+        except ValueError as exc:
+            raise serializers.ValidationError({'expected_answer': [str(exc)]})
+        return attrs
+
+
+class PreloadedExamSheetField(serializers.PrimaryKeyRelatedField):
+    """Exam sheet field resolved from sheets preloaded into context
+
+    Saves a query per item when many tasks are validated at once, and
+    accepts only sheets owned by requesting user.
+    """
+    default_error_messages = {
+        'not_owner': 'You are not owner of exam sheet "{pk_value}".',
+    }
+
+    def to_internal_value(self, data):
+        try:
+            exam_sheet = self.context['exam_sheets'][int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if exam_sheet.owner_id != self.context['request'].user.pk:
+            self.fail('not_owner', pk_value=data)
+        return exam_sheet
+
+
+class ExamTaskBulkSerializer(ExamTaskSerializer):
+    """Serializer for exam tasks written in bulk"""
+    exam_sheet = PreloadedExamSheetField(queryset=ExamSheet.objects.all())
+
+
+class ExamTaskStudentSerializer(TimedSerializerMixin,
+                                serializers.ModelSerializer):
     """Exam task serializer for student"""
 
     class Meta:
@@ -41,6 +162,23 @@ class ExamTaskStudentSerializer(serializers.ModelSerializer):
         read_only_fields = (
             'title', 'description',
         )
+        list_serializer_class = TimedListSerializer
+
+
+class ExamSheetAnswersField(serializers.DictField):
+    """Answers to many tasks of exam sheet, mapping of task id to answer"""
+    child = serializers.CharField(
+        allow_blank=True, allow_null=True, trim_whitespace=False
+    )
+
+    def to_internal_value(self, data):
+        answers = super().to_internal_value(data)
+        max_items = getattr(settings, 'EXAM_BULK_MAX_ITEMS', 1000)
+        if len(answers) > max_items:
+            raise serializers.ValidationError(
+                f'Ensure there are no more than {max_items} answers.'
+            )
+        return answers
 
 
 class ExamSheetDetailSerializer(ExamSheetSerializer):
@@ -48,8 +186,10 @@ class ExamSheetDetailSerializer(ExamSheetSerializer):
     tasks = ExamTaskSerializer(many=True)
 
 
-class ExamSheetArchiveSerializer(serializers.ModelSerializer):
+class ExamSheetArchiveSerializer(TimedSerializerMixin,
+                                 serializers.ModelSerializer):
     """Serializer for changing is_archived status"""
     class Meta:
         model = ExamSheet
         fields = ('id', 'is_archived')
+        list_serializer_class = TimedListSerializer
@@ -0,0 +1,182 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from exam.authentication import credential_cache
+from exam.cache import bump_sheet_version
+from exam.events import publish_event
+from exam.instrumentation import install_query_timer, \
+                                 install_slow_query_explainer
+from exam.models import ExamSheet, ExamTask, loaded_values, sheet_counters
+from exam.sqlite import apply_pragmas
+
+_batch = threading.local()
+
+
+def sheets_changed(sheet_ids):
+    """Invalidate cached payloads, recompute counters and touch sheets"""
+    sheet_ids = set(sheet_ids) - {None}
+    if getattr(_batch, 'sheet_ids', None) is not None:
+        _batch.sheet_ids |= sheet_ids
+        return
+    for sheet_id in sheet_ids:
+        bump_sheet_version(sheet_id)
+    # Modification time of sheet is validator of sheet lists. Counters
+    # are recomputed by the same query, in transaction of task writes.
+    if not sheet_ids:
+        return
+    with transaction.atomic(savepoint=False):
+        if connection.features.has_select_for_update:
+            # Subqueries of UPDATE which waited for lock of sheet row don't
+            # see tasks committed by its holder (READ COMMITTED), so rows
+            # are locked by separate query first. Key share locks taken by
+            # inserted tasks don't conflict with this one.
+            list(ExamSheet.objects.select_for_update(no_key=True).filter(
+                pk__in=sheet_ids
+            ).order_by('pk').values_list('pk', flat=True))
+        ExamSheet.objects.filter(pk__in=sheet_ids).update(
+            updated_at=timezone.now(), **sheet_counters()
+        )
+
+
+@contextmanager
+def batched_sheet_changes():
+    """Collect changes of sheets and apply them once when block exits
+
+    Used when many tasks are written at once, so sheet isn't touched
+    for every one of them. Yields set that more sheet ids can be added to.
+    """
+    if getattr(_batch, 'sheet_ids', None) is not None:
+        # Already collected by outer block
+        yield _batch.sheet_ids
+        return
+    _batch.sheet_ids = set()
+    try:
+        yield _batch.sheet_ids
+        sheet_ids = _batch.sheet_ids
+    finally:
+        _batch.sheet_ids = None
+    sheets_changed(sheet_ids)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_credentials(sender, instance, **kwargs):
+    """Drop cached credentials when user is changed or deleted"""
+    credential_cache.invalidate(instance.get_username())
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def collect_student_sheets(sender, instance, **kwargs):
+    """Remember sheets of deleted student, unassigned without signals"""
+    instance._student_sheet_ids = list(ExamSheet.objects.filter(
+        student=instance
+    ).values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_student_sheets(sender, instance, **kwargs):
+    """Invalidate sheets whose student was set to null"""
+    sheets_changed(getattr(instance, '_student_sheet_ids', ()))
+
+
+@receiver(post_save, sender=ExamSheet)
+@receiver(post_delete, sender=ExamSheet)
+def invalidate_sheet(sender, instance, **kwargs):
+    """Invalidate cached payloads of changed exam sheet"""
+    bump_sheet_version(instance.pk)
+
+
+@receiver(post_save, sender=ExamTask)
+@receiver(post_delete, sender=ExamTask)
+def invalidate_task_sheet(sender, instance, **kwargs):
+    """Invalidate cached payloads of sheets that changed task belongs to"""
+    sheets_changed({
+        instance.exam_sheet_id,
+        getattr(instance, '_loaded_exam_sheet_id', None)
+    })
+
+
+def changed_fields(instance):
+    """Return tracked fields changed since instance was loaded"""
+    loaded = getattr(instance, '_loaded_values', {})
+    changed = {
+        name for name, value in loaded.items()
+        if instance.__dict__.get(name, value) != value
+    }
+    # Next save is compared with saved values
+    instance._loaded_values = loaded_values(instance, loaded)
+    return changed
+
+
+@receiver(post_save, sender=ExamSheet)
+def publish_sheet_change(sender, instance, created, raw, **kwargs):
+    """Notify subscribers of exam sheet about its change"""
+    if created or raw:
+        return
+    changed = changed_fields(instance)
+    if 'grade' in changed:
+        publish_event(instance.pk, 'grade_set', grade=instance.grade)
+    if 'is_archived' in changed:
+        publish_event(
+            instance.pk, 'archive_toggled', is_archived=instance.is_archived
+        )
+    if not changed:
+        publish_event(instance.pk, 'sheet_changed')
+
+
+@receiver(post_delete, sender=ExamSheet)
+def publish_sheet_deleted(sender, instance, **kwargs):
+    """Notify subscribers that exam sheet was deleted"""
+    publish_event(instance.pk, 'sheet_deleted')
+
+
+@receiver(post_save, sender=ExamTask)
+def publish_task_change(sender, instance, created, raw, **kwargs):
+    """Notify subscribers of exam sheet about change of its task"""
+    if raw:
+        return
+    tasks = [instance.pk]
+    changed = changed_fields(instance)
+    # Connected after invalidate_task_sheet, which still needs loaded sheet
+    loaded_sheet_id = getattr(instance, '_loaded_exam_sheet_id', None)
+    if created:
+        publish_event(instance.exam_sheet_id, 'task_added', tasks=tasks)
+    elif loaded_sheet_id not in (None, instance.exam_sheet_id):
+        publish_event(loaded_sheet_id, 'task_removed', tasks=tasks)
+        publish_event(instance.exam_sheet_id, 'task_added', tasks=tasks)
+    elif 'answer' in changed:
+        publish_event(
+            instance.exam_sheet_id, 'answer_submitted', tasks=tasks
+        )
+    else:
+        publish_event(instance.exam_sheet_id, 'task_changed', tasks=tasks)
+    instance._loaded_exam_sheet_id = instance.exam_sheet_id
+
+
+@receiver(post_delete, sender=ExamTask)
+def publish_task_deleted(sender, instance, **kwargs):
+    """Notify subscribers of exam sheet that its task was deleted"""
+    publish_event(instance.exam_sheet_id, 'task_deleted', tasks=[instance.pk])
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """Set pragmas on new SQLite connection if tuning is enabled"""
+    if (connection.vendor == 'sqlite' and
+            getattr(settings, 'EXAM_SQLITE_TUNING', False)):
+        apply_pragmas(connection)
+
+
+@receiver(connection_created)
+def time_connection_queries(sender, connection, **kwargs):
+    """Count queries of new connection in metrics of current request"""
+    install_query_timer(connection)
+    if settings.DEBUG and getattr(settings, 'EXAM_SLOW_QUERY_EXPLAIN', False):
+        install_slow_query_explainer(connection)
@@ -0,0 +1,32 @@
+from django.conf import settings
+
+# Pragmas which can be set by EXAM_SQLITE_PRAGMAS and are reported
+PRAGMAS = ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size',
+           'cache_size')
+
+SYNCHRONOUS_NAMES = {0: 'OFF', 1: 'NORMAL', 2: 'FULL', 3: 'EXTRA'}
+
+
+def apply_pragmas(connection):
+    """Set pragmas from EXAM_SQLITE_PRAGMAS on SQLite connection"""
+    pragmas = getattr(settings, 'EXAM_SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            if name not in PRAGMAS:
+                raise ValueError(f'Unsupported SQLite pragma: {name}')
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def read_pragmas(connection):
+    """Return active values of tuned pragmas of SQLite connection"""
+    values = {}
+    with connection.cursor() as cursor:
+        for name in PRAGMAS:
+            cursor.execute(f'PRAGMA {name}')
+            row = cursor.fetchone()
+            # In-memory database doesn't report mmap_size
+            values[name] = row[0] if row else None
+    values['synchronous'] = SYNCHRONOUS_NAMES.get(
+        values['synchronous'], values['synchronous']
+    )
+    return values
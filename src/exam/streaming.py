@@ -0,0 +1,134 @@
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+
+from exam.renderers import json_dumps
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Newline delimited JSON, one object per line
+
+    Lists are streamed by StreamingListMixin, this renderer is used only
+    for responses that aren't streamed (e.g. errors).
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        return b''.join(json_dumps(item) + b'\n' for item in items)
+
+
+# Renderers of actions which can be streamed
+STREAMING_RENDERER_CLASSES = (
+    list(api_settings.DEFAULT_RENDERER_CLASSES) + [NDJSONRenderer]
+)
+
+
+def json_array_stream(rows):
+    """Yield JSON array of rows given in chunks, chunk by chunk"""
+    yield b'['
+    separator = b''
+    for chunk in rows:
+        if chunk:
+            yield separator + b','.join(map(json_dumps, chunk))
+            separator = b','
+    yield b']'
+
+
+def ndjson_stream(rows):
+    """Yield rows given in chunks as lines of JSON, chunk by chunk"""
+    for chunk in rows:
+        if chunk:
+            yield b''.join(json_dumps(row) + b'\n' for row in chunk)
+
+
+async def aiterate(iterator):
+    """Yield items of sync iterator, each one taken in the request thread
+
+    Database connection used by iterator belongs to thread of sync view.
+    """
+    sentinel = object()
+    next_item = sync_to_async(next)
+    try:
+        while True:
+            item = await next_item(iterator, sentinel)
+            if item is sentinel:
+                return
+            yield item
+    finally:
+        # Closes database cursor if client disconnected
+        await sync_to_async(iterator.close)()
+
+
+class StreamingListMixin:
+    """Whole list streamed in chunks instead of serialized page
+
+    List is streamed when NDJSON is requested (Accept header
+    'application/x-ndjson' or format=ndjson query param) or when 'stream'
+    query param is set with JSON. Queryset is read with iterator, so
+    memory use doesn't depend on length of list.
+    """
+
+    def stream_requested(self):
+        """Return True if list should be streamed"""
+        renderer = self.request.accepted_renderer
+        if isinstance(renderer, NDJSONRenderer):
+            return True
+        return renderer.format == 'json' and self.request.query_params.get(
+            'stream', ''
+        ).lower() in ('1', 'true')
+
+    def serialized_chunks(self, queryset):
+        """Yield lists of serialized objects, one per chunk of queryset"""
+        chunk_size = getattr(settings, 'EXAM_STREAM_CHUNK_SIZE', 1000)
+        queryset = queryset.order_by('id')
+        fast = self.get_fast_serializer()
+        if fast is not None:
+            rows = fast.values(queryset).iterator(chunk_size=chunk_size)
+            for chunk in iter(lambda: list(islice(rows, chunk_size)), []):
+                yield fast.represent(chunk)
+            return
+
+        serializer = self.get_serializer()
+        chunk = []
+        # Prefetched relations are loaded once per chunk
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            chunk.append(serializer.to_representation(obj))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        yield chunk
+
+    def streaming_response(self, queryset):
+        """Return response streaming every object of queryset"""
+        chunks = self.serialized_chunks(queryset)
+        if isinstance(self.request.accepted_renderer, NDJSONRenderer):
+            stream = ndjson_stream(chunks)
+            content_type = 'application/x-ndjson'
+        else:
+            stream = json_array_stream(chunks)
+            content_type = 'application/json'
+        if isinstance(self.request._request, ASGIRequest):
+            # ASGI handler would read whole sync iterator before sending it
+            stream = aiterate(stream)
+        return StreamingHttpResponse(stream, content_type=content_type)
+
+    def list_response(self, queryset):
+        """Return streamed or paginated response with queryset"""
+        if self.stream_requested():
+            response = self.streaming_response(queryset)
+        else:
+            response = self.paginated_response(queryset)
+        # Same URL returns JSON or NDJSON
+        patch_vary_headers(response, ('Accept',))
+        return response
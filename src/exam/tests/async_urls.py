@@ -0,0 +1,14 @@
+from django.test import override_settings
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+
+from exam import views
+
+# Exam API routes built with async views, as served by ASGI server
+with override_settings(EXAM_ASYNC_VIEWS=True):
+    router = DefaultRouter()
+    router.register('exam-sheets', views.ExamSheetViewSet)
+    router.register('exam-tasks', views.ExamTaskViewSet)
+    urlpatterns = [
+        path('api/exam/', include((router.urls, 'exam')))
+    ]
@@ -0,0 +1,107 @@
+
+from asgiref.sync import iscoroutinefunction
+from django.test import AsyncClient, Client, TestCase, override_settings
+from django.urls import resolve, reverse
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from exam.models import ExamSheet, ExamTask
+from exam.tests.utils import basic_auth, detail_url, sample_user
+from exam.views import ExamSheetViewSet
+
+EXAM_SHEETS_URL = reverse('exam:examsheet-list')
+
+
+@override_settings(ROOT_URLCONF='exam.tests.async_urls')
+class AsyncReadViewTests(TestCase):
+    """Test read-only actions served by async views"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.client = AsyncClient()
+        self.exam_sheet = ExamSheet.objects.create(
+            owner=self.user,
+            description='Test description'
+        )
+        self.exam_task = ExamTask.objects.create(
+            exam_sheet=self.exam_sheet,
+            title='Task'
+        )
+
+    def test_read_views_are_async(self):
+        """Test that read-only actions are routed to async views"""
+        urls = [
+            EXAM_SHEETS_URL,
+            detail_url(self.exam_sheet.id),
+            reverse('exam:examtask-detail', args=[self.exam_task.id]),
+            reverse('exam:examtask-sheet', args=[self.exam_sheet.id]),
+        ]
+
+        for url in urls:
+            self.assertTrue(iscoroutinefunction(resolve(url).func), url)
+
+    async def test_list(self):
+        """Test that async list returns owned sheets"""
+        res = await self.client.get(EXAM_SHEETS_URL, headers=basic_auth())
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in res.json()['results']],
+            [self.exam_sheet.id]
+        )
+
+    async def test_retrieve_not_modified(self):
+        """Test that async retrieve answers conditional request"""
+        res = await self.client.get(
+            detail_url(self.exam_sheet.id), headers=basic_auth()
+        )
+
+        res = await self.client.get(
+            detail_url(self.exam_sheet.id),
+            headers={**basic_auth(), 'if-none-match': res['ETag']}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_unauthenticated(self):
+        """Test that async views require authentication"""
+        res = await AsyncClient().get(EXAM_SHEETS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_missing_task(self):
+        """Test that async retrieve of missing task returns 404"""
+        res = await self.client.get(
+            reverse('exam:examtask-detail', args=[0]), headers=basic_auth()
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_write_runs_sync_view(self):
+        """Test that writes to URL of async view still work"""
+        res = await self.client.post(
+            EXAM_SHEETS_URL,
+            {'description': 'New sheet', 'owner': self.user.id, 'tasks': []},
+            content_type='application/json',
+            headers=basic_auth()
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(
+            await ExamSheet.objects.filter(description='New sheet').aexists()
+        )
+
+    def test_same_data_as_sync_view(self):
+        """Test that async and sync retrieve return the same data"""
+        with override_settings(EXAM_ASYNC_VIEWS=False):
+            view = ExamSheetViewSet.as_view({'get': 'retrieve'})
+        self.assertFalse(iscoroutinefunction(view))
+        request = APIRequestFactory().get(detail_url(self.exam_sheet.id))
+        force_authenticate(request, self.user)
+
+        sync_res = view(request, pk=self.exam_sheet.id)
+        async_res = Client().get(
+            detail_url(self.exam_sheet.id), headers=basic_auth()
+        )
+
+        self.assertEqual(sync_res.data, async_res.json())
@@ -0,0 +1,181 @@
+import base64
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from exam.authentication import CredentialCache, credential_cache, \
+                                make_token
+from exam.models import ExamSheet
+from exam.tests.utils import sample_user
+
+EXAM_SHEETS_URL = reverse('exam:examsheet-list')
+TOKEN_URL = reverse('exam:token')
+
+
+def basic_auth(username, password):
+    """Return value of Basic authorization header"""
+    credentials = f'{username}:{password}'.encode()
+    return 'Basic ' + base64.b64encode(credentials).decode()
+
+
+class CachedBasicAuthenticationTests(TestCase):
+    """Test caching of verified Basic credentials"""
+
+    def setUp(self):
+        credential_cache.clear()
+        self.user = sample_user()
+        self.client = APIClient()
+
+    def get_sheets(self, password='testpassword123'):
+        """Request exam sheet list with Basic credentials"""
+        self.client.credentials(
+            HTTP_AUTHORIZATION=basic_auth(self.user.username, password)
+        )
+        return self.client.get(EXAM_SHEETS_URL)
+
+    def test_second_request_skips_password_check(self):
+        """Test that cached credentials don't check password again"""
+        self.get_sheets()
+        with mock.patch(
+                'rest_framework.authentication.authenticate'
+                ) as authenticate:
+            res = self.get_sheets()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        authenticate.assert_not_called()
+        self.assertEqual(credential_cache.stats()['hits'], 1)
+        self.assertEqual(credential_cache.stats()['misses'], 1)
+
+    def test_wrong_password_not_cached(self):
+        """Test that failed login is not remembered"""
+        res = self.get_sheets(password='wrongpassword')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(credential_cache.stats()['size'], 0)
+
+    def test_password_change_invalidates_cache(self):
+        """Test that old password stops working after change"""
+        self.get_sheets()
+        self.user.set_password('newpassword123')
+        self.user.save()
+
+        res = self.get_sheets()
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(
+            self.get_sheets('newpassword123').status_code,
+            status.HTTP_200_OK
+        )
+
+    def test_password_change_in_other_process(self):
+        """Test that changed hash is detected without signals"""
+        self.get_sheets()
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            password='pbkdf2_sha256$1$salt$changed'
+        )
+
+        res = self.get_sheets()
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test that inactive user can't use cached credentials"""
+        self.get_sheets()
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False
+        )
+
+        res = self.get_sheets()
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cache_is_bounded(self):
+        """Test that least recently used entries are dropped"""
+        cache = CredentialCache(maxsize=2, ttl=60)
+        for username in ('user1', 'user2', 'user3'):
+            cache.set(cache.make_key(username, 'pass'), 'hash')
+
+        self.assertEqual(cache.stats()['size'], 2)
+        self.assertFalse(cache.get(cache.make_key('user1', 'pass'), 'hash'))
+        self.assertTrue(cache.get(cache.make_key('user3', 'pass'), 'hash'))
+
+    def test_expired_entry_is_miss(self):
+        """Test that entries older than ttl are not used"""
+        cache = CredentialCache(maxsize=2, ttl=-1)
+        key = cache.make_key('user1', 'pass')
+        cache.set(key, 'hash')
+
+        self.assertFalse(cache.get(key, 'hash'))
+        self.assertEqual(cache.stats()['misses'], 1)
+
+
+class SignedTokenAuthenticationTests(TestCase):
+    """Test login-once signed token authentication"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.client = APIClient()
+
+    def test_obtain_token_with_basic_credentials(self):
+        """Test that Basic credentials can be exchanged for token"""
+        self.client.credentials(
+            HTTP_AUTHORIZATION=basic_auth('testusername', 'testpassword123')
+        )
+        res = self.client.post(TOKEN_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('token', res.data)
+        self.assertIn('expires', res.data)
+
+    def test_obtain_token_requires_credentials(self):
+        """Test that token is not issued without login"""
+        res = self.client.post(TOKEN_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_authenticates_without_user_query(self):
+        """Test that token is checked without loading user"""
+        ExamSheet.objects.create(owner=self.user, description='Test')
+        token, _ = make_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+
+        # Only exam sheets, their tasks and list validators are loaded
+        with self.assertNumQueries(3):
+            res = self.client.get(EXAM_SHEETS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_token_user_creates_owned_sheet(self):
+        """Test that token user is stored as exam sheet owner"""
+        token, _ = make_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+
+        res = self.client.post(EXAM_SHEETS_URL, {'description': 'Test'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(ExamSheet.objects.filter(owner=self.user).exists())
+
+    def test_tampered_token_rejected(self):
+        """Test that token with changed signature is rejected"""
+        token, _ = make_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}x')
+
+        res = self.client.get(EXAM_SHEETS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_token_rejected(self):
+        """Test that token can't be used after expiry"""
+        with self.settings(EXAM_TOKEN_TTL=-1):
+            token, _ = make_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+
+        res = self.client.get(EXAM_SHEETS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
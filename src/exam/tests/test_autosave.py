@@ -0,0 +1,140 @@
+from unittest import mock
+
+from django.db import connection
+from django.urls import reverse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from exam.autosave import AnswerWriteBehind
+from exam.models import ExamSheet, ExamTask
+from exam.tests.utils import sample_user
+from exam.views import ExamSheetViewSet, ExamTaskViewSet
+
+
+def exam_task_answer(exam_task_id):
+    """Return url for exam answer view"""
+    return reverse('exam:examtask-answer', args=[exam_task_id])
+
+
+def exam_task_detail(exam_task_id):
+    """Return url for exam task detail"""
+    return reverse('exam:examtask-detail', args=[exam_task_id])
+
+
+@override_settings(EXAM_ANSWER_WRITE_BEHIND=True)
+class AnswerWriteBehindTests(TestCase):
+    """Test queued saving of student answers"""
+
+    def setUp(self):
+        # Queue is flushed explicitly, worker thread would use
+        # other database connection
+        self.queue = AnswerWriteBehind(max_pending=2, autostart=False)
+        for viewset in (ExamSheetViewSet, ExamTaskViewSet):
+            patcher = mock.patch.object(viewset, 'answer_queue', self.queue)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.teacher = sample_user(username='teacher')
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.exam_sheet = ExamSheet.objects.create(
+            owner=self.teacher,
+            student=self.user,
+            description='Test description'
+        )
+        self.exam_task = ExamTask.objects.create(
+            exam_sheet=self.exam_sheet,
+            title='Test title'
+        )
+
+    def send_answer(self, answer, exam_task=None):
+        """Send answer to exam task"""
+        exam_task = exam_task or self.exam_task
+        return self.client.patch(
+            exam_task_answer(exam_task.id), {'answer': answer}
+        )
+
+    def test_answer_is_queued(self):
+        """Test that answer is saved only when queue is flushed"""
+        res = self.send_answer('First answer')
+        self.exam_task.refresh_from_db()
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertIsNone(self.exam_task.answer)
+
+        self.queue.flush()
+        self.exam_task.refresh_from_db()
+        self.assertEqual(self.exam_task.answer, 'First answer')
+
+    def test_repeated_answers_merged(self):
+        """Test that only latest answer to task is written"""
+        self.send_answer('First answer')
+        self.send_answer('Second answer')
+
+        with CaptureQueriesContext(connection) as context:
+            self.queue.flush()
+
+        task_updates = [
+            query for query in context.captured_queries
+            if query['sql'].startswith('UPDATE "exam_examtask"')
+        ]
+        self.assertEqual(len(task_updates), 1)
+        self.exam_task.refresh_from_db()
+        self.assertEqual(self.exam_task.answer, 'Second answer')
+
+    def test_read_your_writes(self):
+        """Test that student reading task sees queued answer"""
+        self.send_answer('Queued answer')
+
+        res = self.client.get(exam_task_detail(self.exam_task.id))
+
+        self.assertEqual(res.data['answer'], 'Queued answer')
+        self.assertFalse(self.queue.has_pending(self.user.pk))
+
+    def test_full_queue_rejects_answers(self):
+        """Test that answers are refused when queue is full"""
+        tasks = [
+            ExamTask.objects.create(exam_sheet=self.exam_sheet, title='Task')
+            for _ in range(2)
+        ]
+        for exam_task in tasks:
+            self.send_answer('Answer', exam_task)
+
+        res = self.send_answer('Answer')
+
+        self.assertEqual(
+            res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        self.assertIn('Retry-After', res)
+        # Answer to already queued task is still accepted
+        self.assertEqual(
+            self.send_answer('New answer', tasks[0]).status_code,
+            status.HTTP_202_ACCEPTED
+        )
+
+    def test_direct_write_not_overwritten(self):
+        """Test that queued answer doesn't overwrite later direct write"""
+        self.send_answer('Queued answer')
+        self.client.force_authenticate(self.teacher)
+        self.client.patch(
+            exam_task_detail(self.exam_task.id),
+            {'answer': 'Teacher answer'}
+        )
+
+        self.queue.flush()
+
+        self.exam_task.refresh_from_db()
+        self.assertEqual(self.exam_task.answer, 'Teacher answer')
+
+    def test_stop_flushes_queue(self):
+        """Test that answers are written when queue is stopped"""
+        self.send_answer('Queued answer')
+
+        self.queue.stop()
+
+        self.exam_task.refresh_from_db()
+        self.assertEqual(self.exam_task.answer, 'Queued answer')
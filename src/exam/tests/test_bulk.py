@@ -0,0 +1,298 @@
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from exam.models import ExamSheet, ExamTask
+from exam.tests.utils import QueryCountMixin, sample_user
+
+EXAM_TASK_BULK_URL = reverse('exam:examtask-bulk')
+
+
+def sample_exam_sheet(owner, description='Test description'):
+    """Create and return sample exam sheet"""
+    return ExamSheet.objects.create(owner=owner, description=description)
+
+
+class BulkExamTaskApiTests(QueryCountMixin, TestCase):
+    """Test writing many exam tasks in one request"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.exam_sheet = sample_exam_sheet(owner=self.user)
+
+    def test_bulk_create(self):
+        """Test creating many tasks at once"""
+        payload = [
+            {'exam_sheet': self.exam_sheet.id, 'title': f'Task {number}'}
+            for number in range(5)
+        ]
+
+        res = self.client.post(EXAM_TASK_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        tasks = ExamTask.objects.filter(exam_sheet=self.exam_sheet)
+        self.assertEqual(
+            [task['id'] for task in res.data],
+            list(tasks.order_by('id').values_list('id', flat=True))
+        )
+        self.assertEqual(
+            [task['title'] for task in res.data],
+            [item['title'] for item in payload]
+        )
+
+    def test_bulk_create_queries(self):
+        """Test that validation and insert don't run query per task"""
+        exam_sheet2 = sample_exam_sheet(owner=self.user)
+        payload = []
+
+        def add_items():
+            payload.extend(
+                {'exam_sheet': exam_sheet.id, 'title': 'Task'}
+                for exam_sheet in (self.exam_sheet, exam_sheet2)
+            )
+
+        self.assertConstantQueries(
+            lambda: self.client.post(
+                EXAM_TASK_BULK_URL, payload, format='json'
+            ),
+            add_items
+        )
+
+    def test_bulk_create_errors_per_item(self):
+        """Test that nothing is created if any item is invalid"""
+        user2 = sample_user(username='testuser2')
+        exam_sheet2 = sample_exam_sheet(owner=user2)
+        payload = [
+            {'exam_sheet': self.exam_sheet.id, 'title': 'Valid'},
+            {'exam_sheet': exam_sheet2.id, 'title': 'Not owner'},
+            {'exam_sheet': self.exam_sheet.id},
+        ]
+
+        res = self.client.post(EXAM_TASK_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('exam_sheet', res.data[1])
+        self.assertIn('title', res.data[2])
+        self.assertFalse(ExamTask.objects.exists())
+
+    def test_bulk_requires_list(self):
+        """Test that payload has to be a list"""
+        res = self.client.post(
+            EXAM_TASK_BULK_URL,
+            {'exam_sheet': self.exam_sheet.id, 'title': 'Task'},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update(self):
+        """Test updating many tasks at once"""
+        tasks = [
+            ExamTask.objects.create(exam_sheet=self.exam_sheet, title='Old')
+            for _ in range(3)
+        ]
+        payload = [
+            {'id': task.id, 'title': f'New {task.id}', 'points': task.id}
+            for task in tasks
+        ]
+
+        res = self.client.patch(EXAM_TASK_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for task in tasks:
+            task.refresh_from_db()
+            self.assertEqual(task.title, f'New {task.id}')
+            self.assertEqual(task.points, task.id)
+
+    def test_bulk_update_moves_task(self):
+        """Test that task can be moved to other owned sheet"""
+        exam_sheet2 = sample_exam_sheet(owner=self.user)
+        task = ExamTask.objects.create(
+            exam_sheet=self.exam_sheet,
+            title='Task'
+        )
+        payload = [{'id': task.id, 'exam_sheet': exam_sheet2.id}]
+
+        res = self.client.patch(EXAM_TASK_BULK_URL, payload, format='json')
+
+        task.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(task.exam_sheet, exam_sheet2)
+
+    def test_bulk_update_not_owner(self):
+        """Test that tasks of other user can't be updated"""
+        user2 = sample_user(username='testuser2')
+        task = ExamTask.objects.create(
+            exam_sheet=sample_exam_sheet(owner=user2),
+            title='Task'
+        )
+        own_task = ExamTask.objects.create(
+            exam_sheet=self.exam_sheet,
+            title='Task'
+        )
+        payload = [
+            {'id': own_task.id, 'title': 'New title'},
+            {'id': task.id, 'title': 'New title'},
+            {'id': 0, 'title': 'New title'},
+        ]
+
+        res = self.client.patch(EXAM_TASK_BULK_URL, payload, format='json')
+
+        own_task.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('id', res.data[1])
+        self.assertIn('id', res.data[2])
+        self.assertEqual(own_task.title, 'Task')
+
+    def test_bulk_delete(self):
+        """Test deleting many tasks at once"""
+        tasks = [
+            ExamTask.objects.create(exam_sheet=self.exam_sheet, title='Task')
+            for _ in range(3)
+        ]
+
+        res = self.client.delete(
+            EXAM_TASK_BULK_URL,
+            [task.id for task in tasks[:2]],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(ExamTask.objects.all()), tasks[2:])
+
+    def test_bulk_delete_not_owner(self):
+        """Test that tasks of other user can't be deleted"""
+        user2 = sample_user(username='testuser2')
+        task = ExamTask.objects.create(
+            exam_sheet=sample_exam_sheet(owner=user2),
+            title='Task'
+        )
+
+        res = self.client.delete(
+            EXAM_TASK_BULK_URL, [task.id], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(ExamTask.objects.filter(pk=task.pk).exists())
+
+    def test_bulk_update_invalidates_cached_sheet(self):
+        """Test that cached sheet detail shows tasks updated in bulk"""
+        task = ExamTask.objects.create(
+            exam_sheet=self.exam_sheet,
+            title='Task'
+        )
+        url = reverse('exam:examsheet-detail', args=[self.exam_sheet.id])
+        self.client.get(url)
+
+        self.client.patch(
+            EXAM_TASK_BULK_URL,
+            [{'id': task.id, 'title': 'New title'}],
+            format='json'
+        )
+
+        res = self.client.get(url)
+        self.assertEqual(res.data['tasks'][0]['title'], 'New title')
+
+
+def sheet_answers_url(exam_sheet_id):
+    """Return url for sending answers to tasks of exam sheet"""
+    return reverse('exam:examsheet-answers', args=[exam_sheet_id])
+
+
+class BulkAnswerApiTests(QueryCountMixin, TestCase):
+    """Test sending answers to every task of exam sheet at once"""
+
+    def setUp(self):
+        self.teacher = sample_user(username='teacher')
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.exam_sheet = ExamSheet.objects.create(
+            owner=self.teacher,
+            student=self.user,
+            description='Test description'
+        )
+        self.tasks = [
+            ExamTask.objects.create(exam_sheet=self.exam_sheet, title='Task')
+            for _ in range(3)
+        ]
+
+    def test_student_sends_answers(self):
+        """Test that student can answer many tasks at once"""
+        payload = {task.id: f'Answer {task.id}' for task in self.tasks}
+
+        res = self.client.patch(
+            sheet_answers_url(self.exam_sheet.id), payload, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for task in self.tasks:
+            task.refresh_from_db()
+            self.assertEqual(task.answer, f'Answer {task.id}')
+
+    def test_answers_queries(self):
+        """Test that number of queries doesn't depend on number of tasks"""
+        payload = {}
+
+        def add_answers():
+            task = ExamTask.objects.create(
+                exam_sheet=self.exam_sheet,
+                title='Task'
+            )
+            payload[task.id] = 'Answer'
+
+        self.assertConstantQueries(
+            lambda: self.client.patch(
+                sheet_answers_url(self.exam_sheet.id), payload, format='json'
+            ),
+            add_answers
+        )
+
+    def test_task_from_other_sheet_rejected(self):
+        """Test that only tasks of given sheet can be answered"""
+        exam_sheet2 = ExamSheet.objects.create(
+            owner=self.teacher,
+            student=self.user,
+            description='Test description'
+        )
+        other_task = ExamTask.objects.create(
+            exam_sheet=exam_sheet2,
+            title='Task'
+        )
+        payload = {self.tasks[0].id: 'Answer', other_task.id: 'Answer'}
+
+        res = self.client.patch(
+            sheet_answers_url(self.exam_sheet.id), payload, format='json'
+        )
+
+        self.tasks[0].refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(other_task.id), res.data)
+        self.assertIsNone(self.tasks[0].answer)
+
+    def test_not_student_cant_answer(self):
+        """Test that other users can't send answers"""
+        self.client.force_authenticate(sample_user(username='testuser2'))
+        payload = {self.tasks[0].id: 'Answer'}
+
+        res = self.client.patch(
+            sheet_answers_url(self.exam_sheet.id), payload, format='json'
+        )
+
+        self.tasks[0].refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertIsNone(self.tasks[0].answer)
+
+    def test_answers_require_mapping(self):
+        """Test that answers have to be sent as object"""
+        res = self.client.patch(
+            sheet_answers_url(self.exam_sheet.id), ['Answer'], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,158 @@
+import tempfile
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from exam.models import ExamSheet, ExamTask
+from exam.tests.utils import detail_url, exam_tasks_for_sheet, sample_user
+
+
+class SheetCacheTests(TestCase):
+    """Test versioned cache of exam sheet payloads"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.exam_sheet = ExamSheet.objects.create(
+            owner=self.user,
+            description='Test description'
+        )
+        self.exam_task = ExamTask.objects.create(
+            exam_sheet=self.exam_sheet,
+            title='Test title'
+        )
+
+    def test_detail_served_from_cache(self):
+        """Test that unchanged sheet is returned without queries"""
+        url = detail_url(self.exam_sheet.id)
+        res = self.client.get(url)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(url)
+
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.data, res.data)
+
+    def test_task_list_for_sheet_served_from_cache(self):
+        """Test that tasks of unchanged sheet are returned without queries"""
+        url = exam_tasks_for_sheet(self.exam_sheet.id)
+        res = self.client.get(url)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(url)
+
+        self.assertEqual(cached.data, res.data)
+
+    def test_sheet_change_invalidates_detail(self):
+        """Test that saving sheet invalidates cached detail"""
+        url = detail_url(self.exam_sheet.id)
+        self.client.get(url)
+
+        self.client.patch(url, {'description': 'New description'})
+        res = self.client.get(url)
+
+        self.assertEqual(res.data['description'], 'New description')
+
+    def test_task_change_invalidates_sheet(self):
+        """Test that saving task invalidates cached sheet payloads"""
+        detail = detail_url(self.exam_sheet.id)
+        tasks = exam_tasks_for_sheet(self.exam_sheet.id)
+        self.client.get(detail)
+        self.client.get(tasks)
+
+        self.exam_task.answer = 'New answer'
+        self.exam_task.save()
+
+        self.assertEqual(
+            self.client.get(detail).data['tasks'][0]['answer'],
+            'New answer'
+        )
+        self.assertEqual(
+            self.client.get(tasks).data['results'][0]['answer'],
+            'New answer'
+        )
+
+    def test_task_moved_invalidates_both_sheets(self):
+        """Test that moving task invalidates its old sheet"""
+        url = detail_url(self.exam_sheet.id)
+        self.client.get(url)
+        exam_sheet2 = ExamSheet.objects.create(
+            owner=self.user,
+            description='Test description'
+        )
+
+        exam_task = ExamTask.objects.get(pk=self.exam_task.pk)
+        exam_task.exam_sheet = exam_sheet2
+        exam_task.save()
+
+        self.assertEqual(self.client.get(url).data['tasks'], [])
+
+    def test_deleted_sheet_not_served(self):
+        """Test that deleted sheet is not returned from cache"""
+        url = detail_url(self.exam_sheet.id)
+        self.client.get(url)
+
+        self.exam_sheet.delete()
+
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_deleted_student_invalidates_sheet(self):
+        """Test that sheet of deleted student isn't served from cache"""
+        student = sample_user('student')
+        self.exam_sheet.student = student
+        self.exam_sheet.save()
+        url = detail_url(self.exam_sheet.id)
+        self.assertEqual(self.client.get(url).data['student'], student.id)
+
+        student.delete()
+
+        self.assertIsNone(self.client.get(url).data['student'])
+
+    def test_query_params_cached_separately(self):
+        """Test that student filter is respected for cached detail"""
+        url = detail_url(self.exam_sheet.id)
+        self.client.get(url)
+
+        res = self.client.get(url, {'student': self.user.id})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_file_based_cache(self):
+        """Test that payloads can be stored in file based cache"""
+        with tempfile.TemporaryDirectory() as location:
+            file_cache = {
+                'exam': {
+                    'BACKEND': 'django.core.cache.backends.filebased.'
+                               'FileBasedCache',
+                    'LOCATION': location,
+                }
+            }
+            with override_settings(CACHES=file_cache,
+                                   EXAM_CACHE_ALIAS='exam'):
+                url = detail_url(self.exam_sheet.id)
+                res = self.client.get(url)
+
+                with self.assertNumQueries(0):
+                    cached = self.client.get(url)
+
+                self.exam_sheet.description = 'New description'
+                self.exam_sheet.save()
+                changed = self.client.get(url)
+
+        self.assertEqual(cached.data, res.data)
+        self.assertEqual(changed.data['description'], 'New description')
+
+    @override_settings(EXAM_RESPONSE_CACHE=False)
+    def test_cache_disabled(self):
+        """Test that payloads are built every time if cache is off"""
+        url = detail_url(self.exam_sheet.id)
+        self.client.get(url)
+
+        with self.assertNumQueries(2):
+            self.client.get(url)
@@ -0,0 +1,313 @@
+import json
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.utils import OperationalError
+from django.test import TestCase
+
+from exam.benchmark import ROUTES, Route, missing_routes
+from exam.models import ExamSheet, ExamTask
+
+
+class ExplainExamQueriesTests(TestCase):
+    """Test command showing query plans of exam API"""
+
+    def test_plans_use_composite_indexes(self):
+        """Test that sheet lists are read with composite indexes"""
+        out = StringIO()
+        call_command(
+            'explain_exam_queries',
+            teachers=2, sheets=10, tasks=2,
+            stdout=out
+        )
+
+        if connection.vendor == 'sqlite':
+            self.assertIn('exam_sheet_owner_arch_idx', out.getvalue())
+            self.assertIn('exam_sheet_student_arch_idx', out.getvalue())
+
+    def test_seeded_rows_rolled_back(self):
+        """Test that command doesn't leave seeded data"""
+        call_command(
+            'explain_exam_queries',
+            teachers=2, sheets=10, tasks=2,
+            stdout=StringIO()
+        )
+
+        self.assertFalse(ExamSheet.objects.exists())
+
+
+class BenchmarkSerializersTests(TestCase):
+    """Test command comparing serializers of list responses"""
+
+    def test_benchmark_output(self):
+        """Test that both serializers are timed and data rolled back"""
+        out = StringIO()
+        call_command(
+            'benchmark_serializers',
+            sheets=10, tasks=2, repeat=1,
+            stdout=out
+        )
+
+        self.assertIn('ExamSheetValuesSerializer', out.getvalue())
+        self.assertIn('ExamTaskValuesSerializer', out.getvalue())
+        self.assertIn('Speedup', out.getvalue())
+        self.assertFalse(ExamSheet.objects.exists())
+
+
+class BenchmarkJsonTests(TestCase):
+    """Test command comparing JSON renderers and parsers"""
+
+    def test_benchmark_output(self):
+        """Test that renderers and parsers are timed"""
+        out = StringIO()
+        call_command('benchmark_json', tasks=5, repeat=1, stdout=out)
+
+        self.assertIn('FastJSONRenderer', out.getvalue())
+        self.assertIn('FastJSONParser', out.getvalue())
+        self.assertFalse(ExamSheet.objects.exists())
+
+
+class GenerateExamDataTests(TestCase):
+    """Test command creating synthetic data set"""
+
+    def generate(self, **options):
+        """Run command with small data set, return its output"""
+        out = StringIO()
+        call_command(
+            'generate_exam_data', teachers=2, students=3, sheets=4, tasks=5,
+            stdout=out, **options
+        )
+        return out.getvalue()
+
+    def test_data_set_created(self):
+        """Test that every teacher gets sheets with tasks"""
+        output = self.generate(answer_sizes='0:1,100:1')
+
+        self.assertIn('2 teachers, 3 students, 8 exam sheets', output)
+        self.assertEqual(ExamTask.objects.count(), 40)
+        answers = ExamTask.objects.values_list('answer', flat=True)
+        self.assertEqual(
+            {len(answer) if answer else 0 for answer in answers}, {0, 100}
+        )
+        self.assertEqual(
+            get_user_model().objects.filter(
+                username__startswith='dataset-student-'
+            ).count(),
+            3
+        )
+        # Counters of sheets match their bulk created tasks
+        call_command('repair_sheet_counters', check=True, stdout=StringIO())
+        self.assertEqual(
+            set(ExamSheet.objects.values_list('task_count', flat=True)), {5}
+        )
+
+    def test_same_seed_same_data(self):
+        """Test that data set is reproducible"""
+        def answers():
+            return list(ExamTask.objects.order_by('id').values_list(
+                'answer', 'points', 'exam_sheet__student__username'
+            ))
+
+        self.generate(seed=7)
+        first = answers()
+        self.generate(seed=7, replace=True)
+
+        self.assertEqual(answers(), first)
+        self.assertEqual(ExamSheet.objects.count(), 8)
+
+    def test_existing_prefix_rejected(self):
+        """Test that data set isn't added twice without replace option"""
+        self.generate()
+
+        with self.assertRaises(CommandError):
+            self.generate()
+
+    def test_invalid_answer_sizes(self):
+        """Test that invalid size distribution is rejected"""
+        for answer_sizes in ('ten:1', '10:-1', '10:0'):
+            with self.assertRaises(CommandError, msg=answer_sizes):
+                self.generate(answer_sizes=answer_sizes)
+
+
+class BenchmarkApiTests(TestCase):
+    """Test command timing every route of exam API"""
+
+    def test_every_route_benchmarked(self):
+        """Test that there are requests for every route of exam urls"""
+        self.assertEqual(missing_routes(), set())
+        self.assertEqual(
+            missing_routes(ROUTES[1:]), {ROUTES[0].name}
+        )
+
+    def test_benchmark_report(self):
+        """Test that report has statistics of every route as JSON"""
+        cache.set('served-by-app', 1)
+        out = StringIO()
+        call_command(
+            'benchmark_api', teachers=1, students=1, sheets=2, tasks=2,
+            iterations=2, warmup=0, stdout=out
+        )
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(len(report['routes']), len(ROUTES))
+        for result in report['routes']:
+            self.assertTrue(
+                all(200 <= code < 300 for code in result['status']), result
+            )
+            self.assertEqual(result['requests'], 2)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertGreater(result['peak_memory_kb'], 0)
+        self.assertFalse(ExamSheet.objects.exists())
+        # Benchmark uses cache of its own
+        self.assertEqual(cache.get('served-by-app'), 1)
+
+    def test_missing_route_rejected(self):
+        """Test that command fails if any route isn't benchmarked"""
+        with mock.patch(
+                'exam.management.commands.benchmark_api.ROUTES',
+                ROUTES[1:]), \
+                self.assertRaises(CommandError):
+            call_command('benchmark_api', stdout=StringIO())
+
+    def test_route_label(self):
+        """Test that route is shown with method and label"""
+        self.assertEqual(
+            str(Route('examsheet-nofilter', label='stream=1')),
+            'GET examsheet-nofilter stream=1'
+        )
+
+
+class RepairSheetCountersTests(TestCase):
+    """Test command recomputing counters of exam sheets"""
+
+    def setUp(self):
+        owner = get_user_model().objects.create_user('teacher', 'password')
+        self.exam_sheets = ExamSheet.objects.bulk_create(
+            ExamSheet(owner=owner, description=f'Sheet {number}')
+            for number in range(3)
+        )
+        for exam_sheet in self.exam_sheets:
+            ExamTask.objects.create(
+                exam_sheet=exam_sheet, title='Task', answer='A', points=2
+            )
+        # Counters left behind by write that bypassed the model
+        ExamSheet.objects.filter(pk__in=[
+            exam_sheet.pk for exam_sheet in self.exam_sheets[:2]
+        ]).update(task_count=0, answered_count=5, total_points=0)
+
+    def test_check_reports_stale_sheets(self):
+        """Test that check fails and leaves counters as they are"""
+        with self.assertRaisesMessage(CommandError, '2 exam sheets'):
+            call_command(
+                'repair_sheet_counters', check=True, stdout=StringIO()
+            )
+
+        self.assertEqual(
+            ExamSheet.objects.get(pk=self.exam_sheets[0].pk).task_count, 0
+        )
+
+    def test_counters_repaired(self):
+        """Test that stale counters are recomputed in batches"""
+        out = StringIO()
+        call_command('repair_sheet_counters', batch_size=1, stdout=out)
+
+        self.assertIn('Repaired counters of 2 exam sheets', out.getvalue())
+        self.assertEqual(
+            set(ExamSheet.objects.values_list(
+                'task_count', 'answered_count', 'total_points'
+            )),
+            {(1, 1, 2)}
+        )
+        call_command('repair_sheet_counters', check=True, stdout=StringIO())
+
+
+class GradeExamSheetsTests(TestCase):
+    """Test command grading exam sheets"""
+
+    def setUp(self):
+        self.owner = get_user_model().objects.create_user(
+            'teacher', 'password'
+        )
+        self.exam_sheets = ExamSheet.objects.bulk_create(
+            ExamSheet(
+                owner=self.owner, description=f'Sheet {number}',
+                is_archived=number == 2
+            )
+            for number in range(3)
+        )
+        for exam_sheet in self.exam_sheets:
+            ExamTask.objects.create(
+                exam_sheet=exam_sheet, title='Task', answer='yes',
+                rubric='exact', expected_answer='yes'
+            )
+
+    def test_sheets_of_owner_graded(self):
+        """Test that active sheets of teacher are graded"""
+        out = StringIO()
+        call_command('grade_exam_sheets', owner='teacher', stdout=out)
+
+        self.assertIn('Graded 2 of 2 exam sheets', out.getvalue())
+        self.assertEqual(
+            list(ExamSheet.objects.order_by('id').values_list(
+                'grade', flat=True
+            )),
+            ['A', 'A', None]
+        )
+
+    def test_sheets_given_by_id(self):
+        """Test that sheets can be given by ids"""
+        out = StringIO()
+        call_command(
+            'grade_exam_sheets', self.exam_sheets[2].id, stdout=out
+        )
+
+        self.assertIn('Graded 1 of 1 exam sheets', out.getvalue())
+
+    def test_sheets_required(self):
+        """Test that either ids or owner have to be given"""
+        with self.assertRaises(CommandError):
+            call_command('grade_exam_sheets', stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, 'not found'):
+            call_command(
+                'grade_exam_sheets', owner='nobody', stdout=StringIO()
+            )
+
+
+class WaitForDbTests(TestCase):
+    """Test command waiting for database"""
+
+    def test_database_ready(self):
+        """Test that command returns when database is available"""
+        with mock.patch(
+                'django.db.backends.base.base.BaseDatabaseWrapper.'
+                'ensure_connection') as ensure_connection:
+            call_command('wait_for_db', stdout=StringIO())
+
+        self.assertEqual(ensure_connection.call_count, 1)
+
+    @mock.patch('time.sleep')
+    def test_waits_for_database(self, sleep):
+        """Test that command retries until database is available"""
+        with mock.patch(
+                'django.db.backends.base.base.BaseDatabaseWrapper.'
+                'ensure_connection',
+                side_effect=[OperationalError] * 3 + [None]
+        ) as ensure_connection:
+            call_command('wait_for_db', stdout=StringIO())
+
+        self.assertEqual(ensure_connection.call_count, 4)
+        self.assertEqual(sleep.call_count, 3)
+
+    @mock.patch('time.sleep')
+    def test_gives_up_after_timeout(self, sleep):
+        """Test that error is raised when database doesn't come up"""
+        with mock.patch(
+                'django.db.backends.base.base.BaseDatabaseWrapper.'
+                'ensure_connection',
+                side_effect=OperationalError):
+            with self.assertRaises(OperationalError):
+                call_command('wait_for_db', timeout=0, stdout=StringIO())
@@ -0,0 +1,153 @@
+import gzip
+import unittest
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from exam import compression
+from exam.compression import choose_encoding
+from exam.models import ExamSheet, ExamTask
+from exam.tests.utils import detail_url, sample_user
+
+
+class ChooseEncodingTests(SimpleTestCase):
+    """Test negotiating content coding with Accept-Encoding header"""
+
+    def test_gzip(self):
+        """Test that gzip is chosen when it's the only accepted one"""
+        self.assertEqual(choose_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(choose_encoding('GZip;q=0.5'), 'gzip')
+
+    def test_nothing_accepted(self):
+        """Test that no encoding is chosen if none is acceptable"""
+        for header in ('', 'identity', 'deflate', 'gzip;q=0', '*;q=0'):
+            self.assertIsNone(choose_encoding(header), header)
+
+    @unittest.skipIf(compression.brotli is None, 'brotli not installed')
+    def test_brotli_preferred(self):
+        """Test that brotli is chosen unless client prefers gzip"""
+        self.assertEqual(choose_encoding('gzip, deflate, br'), 'br')
+        self.assertEqual(choose_encoding('*'), 'br')
+        self.assertEqual(choose_encoding('br;q=0.5, gzip'), 'gzip')
+        self.assertEqual(choose_encoding('br;q=0, *'), 'gzip')
+
+
+@override_settings(EXAM_COMPRESS_MIN_SIZE=1024)
+class CompressionMiddlewareTests(TestCase):
+    """Test compressing large API responses"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.exam_sheet = ExamSheet.objects.create(
+            owner=self.user,
+            description='Test description'
+        )
+        for number in range(10):
+            ExamTask.objects.create(
+                exam_sheet=self.exam_sheet,
+                title=f'Task {number}',
+                answer='Long answer. ' * 20
+            )
+
+    def test_large_response_compressed(self):
+        """Test that response above threshold is compressed with gzip"""
+        plain = self.client.get(detail_url(self.exam_sheet.id))
+
+        res = self.client.get(
+            detail_url(self.exam_sheet.id), HTTP_ACCEPT_ENCODING='gzip'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(res['Content-Length'], str(len(res.content)))
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertLess(len(res.content), len(plain.content))
+        self.assertEqual(gzip.decompress(res.content), plain.content)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+
+    def test_etag_of_compressed_response(self):
+        """Test that weak ETag of compressed response gives 304"""
+        res = self.client.get(
+            detail_url(self.exam_sheet.id), HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertTrue(res['ETag'].startswith('W/'))
+
+        res = self.client.get(
+            detail_url(self.exam_sheet.id),
+            HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=res['ETag']
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    def test_small_response_not_compressed(self):
+        """Test that response below threshold is sent as it is"""
+        res = self.client.get(
+            reverse('exam:examtask-detail', args=[
+                self.exam_sheet.tasks.first().id
+            ]),
+            HTTP_ACCEPT_ENCODING='gzip'
+        )
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    def test_streaming_response_not_compressed(self):
+        """Test that streamed list isn't compressed"""
+        res = self.client.get(
+            reverse('exam:examsheet-nofilter'), {'stream': '1'},
+            HTTP_ACCEPT_ENCODING='gzip'
+        )
+
+        self.assertTrue(res.streaming)
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    def test_cached_payload_compressed_once(self):
+        """Test that compressed bytes of cached payload are reused"""
+        with mock.patch(
+                'exam.compression._gzip', wraps=compression._gzip) as compress:
+            responses = [
+                self.client.get(
+                    detail_url(self.exam_sheet.id),
+                    HTTP_ACCEPT_ENCODING='gzip'
+                )
+                for _ in range(2)
+            ]
+
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(responses[0].content, responses[1].content)
+
+    @override_settings(EXAM_RESPONSE_CACHE=False)
+    def test_not_cached_without_response_cache(self):
+        """Test that compressed bytes aren't cached with cache disabled"""
+        with mock.patch(
+                'exam.compression._gzip', wraps=compression._gzip) as compress:
+            for _ in range(2):
+                self.client.get(
+                    detail_url(self.exam_sheet.id),
+                    HTTP_ACCEPT_ENCODING='gzip'
+                )
+
+        self.assertEqual(compress.call_count, 2)
+
+    @unittest.skipIf(compression.brotli is None, 'brotli not installed')
+    def test_brotli_response(self):
+        """Test that brotli is used when client accepts it"""
+        plain = self.client.get(detail_url(self.exam_sheet.id))
+
+        res = self.client.get(
+            detail_url(self.exam_sheet.id),
+            HTTP_ACCEPT_ENCODING='gzip, deflate, br'
+        )
+
+        self.assertEqual(res['Content-Encoding'], 'br')
+        self.assertEqual(
+            compression.brotli.decompress(res.content), plain.content
+        )
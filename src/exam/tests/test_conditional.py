@@ -0,0 +1,132 @@
+import time
+
+from django.core.cache import caches
+from django.urls import reverse
+from django.test import TestCase
+from django.utils.http import http_date
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from exam.models import ExamSheet, ExamTask
+from exam.tests.utils import detail_url, exam_tasks_for_sheet, sample_user
+
+EXAM_SHEETS_URL = reverse('exam:examsheet-list')
+ARCHIVED_EXAM_SHEETS_URL = reverse('exam:examsheet-archive-list')
+
+
+class ConditionalGetTests(TestCase):
+    """Test ETag validation of exam API"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.exam_sheet = ExamSheet.objects.create(
+            owner=self.user,
+            description='Test description'
+        )
+        self.exam_task = ExamTask.objects.create(
+            exam_sheet=self.exam_sheet,
+            title='Test title'
+        )
+
+    def test_detail_not_modified(self):
+        """Test that sheet detail with matching ETag returns 304"""
+        url = detail_url(self.exam_sheet.id)
+        res = self.client.get(url)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(res.content)
+
+    def test_detail_modified_after_task_change(self):
+        """Test that changing task changes ETag of sheet"""
+        url = detail_url(self.exam_sheet.id)
+        etag = self.client.get(url)['ETag']
+
+        self.exam_task.answer = 'New answer'
+        self.exam_task.save()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_task_list_for_sheet_not_modified(self):
+        """Test that tasks for sheet with matching ETag returns 304"""
+        url = exam_tasks_for_sheet(self.exam_sheet.id)
+        etag = self.client.get(url)['ETag']
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_not_modified(self):
+        """Test that sheet list with matching ETag returns 304"""
+        etag = self.client.get(EXAM_SHEETS_URL)['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(EXAM_SHEETS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_modified_after_task_deleted(self):
+        """Test that deleting task of listed sheet changes list ETag"""
+        etag = self.client.get(EXAM_SHEETS_URL)['ETag']
+
+        self.exam_task.delete()
+        res = self.client.get(EXAM_SHEETS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['tasks'], [])
+
+    def test_modified_after_student_deleted(self):
+        """Test that ETags change when student of sheet is deleted"""
+        student = sample_user(username='student')
+        self.exam_sheet.student = student
+        self.exam_sheet.save()
+        urls = [
+            detail_url(self.exam_sheet.id),
+            exam_tasks_for_sheet(self.exam_sheet.id),
+            EXAM_SHEETS_URL,
+        ]
+        etags = [self.client.get(url)['ETag'] for url in urls]
+
+        student.delete()
+
+        for url, etag in zip(urls, etags):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(res.status_code, status.HTTP_200_OK, url)
+        self.assertIsNone(res.data['results'][0]['student'])
+
+    def test_list_etag_differs_between_users(self):
+        """Test that users don't share list ETags"""
+        etag = self.client.get(EXAM_SHEETS_URL)['ETag']
+        self.client.force_authenticate(sample_user(username='testuser2'))
+
+        res = self.client.get(EXAM_SHEETS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_has_no_last_modified(self):
+        """Test that list isn't 304 by date after newest sheet is archived
+
+        Latest modification of listed sheets doesn't advance when sheet
+        leaves the list, so only ETag validates lists.
+        """
+        res = self.client.get(EXAM_SHEETS_URL)
+        self.assertFalse(res.has_header('Last-Modified'))
+        checked_at = http_date(time.time() + 60)
+
+        self.client.get(
+            reverse('exam:examsheet-archive', args=[self.exam_sheet.id])
+        )
+        res = self.client.get(
+            EXAM_SHEETS_URL, HTTP_IF_MODIFIED_SINCE=checked_at
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [])
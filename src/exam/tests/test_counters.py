@@ -0,0 +1,224 @@
+import threading
+import time
+import unittest
+
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from exam.models import ExamSheet, ExamTask
+from exam.tests.utils import sample_user
+
+EXAM_SHEETS_URL = reverse('exam:examsheet-list')
+BULK_URL = reverse('exam:examtask-bulk')
+
+
+def counters(exam_sheet):
+    """Return stored counters of exam sheet"""
+    exam_sheet.refresh_from_db()
+    return (
+        exam_sheet.task_count,
+        exam_sheet.answered_count,
+        exam_sheet.total_points
+    )
+
+
+class SheetCountersTests(TestCase):
+    """Test counters of exam sheet kept in sync with its tasks"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = sample_user()
+        self.exam_sheet = ExamSheet.objects.create(
+            owner=self.user,
+            description='Test description'
+        )
+
+    def test_task_created_and_deleted(self):
+        """Test that counters follow created and deleted tasks"""
+        task = ExamTask.objects.create(
+            exam_sheet=self.exam_sheet, title='Task', points=3
+        )
+        ExamTask.objects.create(
+            exam_sheet=self.exam_sheet, title='Task', points=2, answer='A'
+        )
+        self.assertEqual(counters(self.exam_sheet), (2, 1, 5))
+
+        task.delete()
+
+        self.assertEqual(counters(self.exam_sheet), (1, 1, 2))
+
+    def test_answer_and_points_changed(self):
+        """Test that empty answer isn't counted as answered"""
+        task = ExamTask.objects.create(
+            exam_sheet=self.exam_sheet, title='Task'
+        )
+        task.answer = 'Answer'
+        task.points = 4
+        task.save()
+        self.assertEqual(counters(self.exam_sheet), (1, 1, 4))
+
+        task.answer = ''
+        task.save()
+
+        self.assertEqual(counters(self.exam_sheet), (1, 0, 4))
+
+    def test_task_moved(self):
+        """Test that task moved to other sheet changes both sheets"""
+        other_sheet = ExamSheet.objects.create(
+            owner=self.user, description='Other'
+        )
+        task = ExamTask.objects.create(
+            exam_sheet=self.exam_sheet, title='Task', points=1
+        )
+
+        task = ExamTask.objects.get(pk=task.pk)
+        task.exam_sheet = other_sheet
+        task.save()
+
+        self.assertEqual(counters(self.exam_sheet), (0, 0, 0))
+        self.assertEqual(counters(other_sheet), (1, 0, 1))
+
+    def test_saved_sheet_keeps_counters(self):
+        """Test that sheet loaded before task changed doesn't undo it"""
+        loaded = ExamSheet.objects.get(pk=self.exam_sheet.pk)
+        ExamTask.objects.create(
+            exam_sheet=self.exam_sheet, title='Task', points=1
+        )
+
+        loaded.description = 'Changed'
+        loaded.save()
+
+        self.assertEqual(counters(self.exam_sheet), (1, 0, 1))
+        self.assertEqual(self.exam_sheet.description, 'Changed')
+
+
+class SheetCountersApiTests(TestCase):
+    """Test counters changed through API and shown on request"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = sample_user()
+        self.student = sample_user('student')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.exam_sheet = ExamSheet.objects.create(
+            owner=self.user,
+            student=self.student,
+            description='Test description'
+        )
+        self.tasks = [
+            ExamTask.objects.create(
+                exam_sheet=self.exam_sheet, title=f'Task {number}',
+                points=number
+            )
+            for number in range(1, 4)
+        ]
+
+    def test_counters_optional(self):
+        """Test that counters are shown only if requested"""
+        res = self.client.get(EXAM_SHEETS_URL)
+        self.assertNotIn('task_count', res.data['results'][0])
+
+        res = self.client.get(EXAM_SHEETS_URL, {'counters': '1'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        sheet = res.data['results'][0]
+        self.assertEqual(sheet['task_count'], 3)
+        self.assertEqual(sheet['answered_count'], 0)
+        self.assertEqual(sheet['total_points'], 6)
+
+    def test_counters_read_from_sheet_table(self):
+        """Test that listing counters doesn't cost more queries"""
+        with CaptureQueriesContext(connection) as plain:
+            self.client.get(EXAM_SHEETS_URL)
+        with CaptureQueriesContext(connection) as with_counters:
+            self.client.get(EXAM_SHEETS_URL, {'counters': '1'})
+
+        self.assertEqual(len(plain), len(with_counters))
+
+    def test_counters_read_only(self):
+        """Test that counters can't be written by client"""
+        res = self.client.patch(
+            reverse('exam:examsheet-detail', args=[self.exam_sheet.id]),
+            {'task_count': 100, 'description': 'Changed'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(counters(self.exam_sheet), (3, 0, 6))
+
+    def test_answers_counted(self):
+        """Test that answers submitted by student are counted"""
+        self.client.force_authenticate(self.student)
+
+        self.client.patch(
+            reverse('exam:examsheet-answers', args=[self.exam_sheet.id]),
+            {str(self.tasks[0].id): 'Answer', str(self.tasks[1].id): ''},
+            format='json'
+        )
+
+        self.assertEqual(counters(self.exam_sheet), (3, 1, 6))
+
+    def test_bulk_writes_counted(self):
+        """Test that bulk created, updated and deleted tasks are counted"""
+        res = self.client.post(BULK_URL, [
+            {'exam_sheet': self.exam_sheet.id, 'title': 'New', 'points': 4}
+        ], format='json')
+        self.assertEqual(counters(self.exam_sheet), (4, 0, 10))
+
+        self.client.patch(BULK_URL, [
+            {'id': self.tasks[0].id, 'points': 10}
+        ], format='json')
+        self.assertEqual(counters(self.exam_sheet), (4, 0, 19))
+
+        self.client.delete(BULK_URL, [res.data[0]['id']], format='json')
+        self.assertEqual(counters(self.exam_sheet), (3, 0, 15))
+
+    def test_tasks_assigned_to_new_sheet(self):
+        """Test that tasks moved by sheet serializer change both sheets"""
+        res = self.client.post(
+            f'{EXAM_SHEETS_URL}?counters=1',
+            {'description': 'New sheet', 'tasks': [self.tasks[2].id]},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['task_count'], 1)
+        self.assertEqual(res.data['total_points'], 3)
+        self.assertEqual(counters(self.exam_sheet), (2, 0, 3))
+
+
+@unittest.skipUnless(
+    connection.vendor == 'postgresql', 'Row locks need PostgreSQL'
+)
+class ConcurrentCountersTests(TransactionTestCase):
+    """Test counters written by concurrent transactions"""
+
+    def test_concurrent_tasks_counted(self):
+        """Test that task committed while other writer waited is counted"""
+        exam_sheet = ExamSheet.objects.create(
+            owner=sample_user(), description='Test description'
+        )
+        locked = threading.Event()
+
+        def create_task():
+            try:
+                locked.wait(5)
+                ExamTask.objects.create(exam_sheet=exam_sheet, title='Two')
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=create_task)
+        with transaction.atomic():
+            ExamTask.objects.create(exam_sheet=exam_sheet, title='One')
+            thread.start()
+            locked.set()
+            # Other writer waits for lock of sheet row held until commit
+            time.sleep(0.5)
+        thread.join()
+
+        self.assertEqual(counters(exam_sheet), (2, 0, 0))
@@ -0,0 +1,355 @@
+import asyncio
+import base64
+import json
+import unittest
+
+from django.db import connection
+from django.test import AsyncClient, TestCase, TransactionTestCase, \
+                        override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from exam.autosave import AnswerWriteBehind
+from exam.events import InProcessBroker, PostgresBroker, get_broker
+from exam.models import ExamSheet, ExamTask
+from exam.tests.utils import sample_user
+
+
+def events_url(exam_sheet_id):
+    """Return url of exam sheet event stream"""
+    return reverse('exam:examsheet-events', args=[exam_sheet_id])
+
+
+def event_types(events):
+    """Return types of events"""
+    return [event['type'] for event in events]
+
+
+class BrokerTests(TestCase):
+    """Test delivering events to subscriptions"""
+
+    def test_subscriber_gets_events_of_sheet(self):
+        """Test that only events of subscribed sheet are received"""
+        broker = InProcessBroker()
+        subscription = broker.subscribe(1)
+
+        broker.publish(1, {'type': 'task_added'})
+        broker.publish(2, {'type': 'task_changed'})
+
+        self.assertEqual(
+            event_types(subscription.get(timeout=0)), ['task_added']
+        )
+
+    def test_unsubscribed_gets_nothing(self):
+        """Test that closed subscription doesn't receive events"""
+        broker = InProcessBroker()
+        subscription = broker.subscribe(1)
+        subscription.close()
+
+        broker.publish(1, {'type': 'task_added'})
+
+        self.assertEqual(subscription.get(timeout=0), [])
+
+    def test_slow_subscriber_resyncs(self):
+        """Test that events above queue size are replaced by resync"""
+        broker = InProcessBroker(max_queued=2)
+        subscription = broker.subscribe(1)
+
+        for _ in range(3):
+            broker.publish(1, {'type': 'task_changed'})
+
+        self.assertEqual(
+            event_types(subscription.get(timeout=0)), ['resync']
+        )
+
+    def test_async_subscriber(self):
+        """Test that async consumer is woken up by event"""
+        broker = InProcessBroker()
+        subscription = broker.subscribe(1)
+
+        async def receive():
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.05, broker.publish, 1, {'type': 'grade_set'})
+            return await subscription.aget(timeout=5)
+
+        self.assertEqual(event_types(asyncio.run(receive())), ['grade_set'])
+
+    def test_large_event_split(self):
+        """Test that NOTIFY payloads of many tasks fit size limit"""
+        broker = PostgresBroker()
+        event = {'type': 'task_added', 'sheet': 1, 'tasks': list(range(5000))}
+
+        payloads = broker.payloads(1, event)
+
+        self.assertGreater(len(payloads), 1)
+        self.assertTrue(all(
+            len(payload) <= broker.max_payload for payload in payloads
+        ))
+        events = [json.loads(payload)['event'] for payload in payloads]
+        self.assertEqual(set(event_types(events)), {'task_added'})
+        self.assertEqual(
+            [task for event in events for task in event['tasks']],
+            event['tasks']
+        )
+
+    def test_large_event_resyncs(self):
+        """Test that too large event without tasks is sent as resync"""
+        broker = PostgresBroker()
+
+        payloads = broker.payloads(
+            1, {'type': 'grade_set', 'grade': 'A' * 9000}
+        )
+
+        self.assertEqual(
+            [json.loads(payload) for payload in payloads],
+            [{'sheet': 1, 'event': {'type': 'resync', 'sheet': 1}}]
+        )
+
+
+class ChangeEventTests(TestCase):
+    """Test events published when exam sheet or its tasks change"""
+
+    def setUp(self):
+        self.teacher = sample_user(username='teacher')
+        self.user = sample_user()
+        self.exam_sheet = ExamSheet.objects.create(
+            owner=self.teacher,
+            student=self.user,
+            description='Test description'
+        )
+        self.exam_task = ExamTask.objects.create(
+            exam_sheet=self.exam_sheet,
+            title='Task'
+        )
+        self.subscription = get_broker().subscribe(self.exam_sheet.id)
+        self.addCleanup(self.subscription.close)
+
+    def received(self):
+        """Return events received by subscription"""
+        return self.subscription.get(timeout=0)
+
+    def test_task_events(self):
+        """Test that adding, changing and answering task is published"""
+        with self.captureOnCommitCallbacks(execute=True):
+            task = ExamTask.objects.create(
+                exam_sheet=self.exam_sheet,
+                title='Task'
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            task = ExamTask.objects.get(pk=task.pk)
+            task.title = 'New title'
+            task.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            task.answer = 'Answer'
+            task.save()
+
+        events = self.received()
+        self.assertEqual(
+            event_types(events),
+            ['task_added', 'task_changed', 'answer_submitted']
+        )
+        self.assertEqual(events[0]['tasks'], [task.pk])
+
+    def test_moved_task_events(self):
+        """Test that moved task is removed from one sheet, added to other"""
+        exam_sheet2 = ExamSheet.objects.create(
+            owner=self.teacher,
+            description='Test description'
+        )
+        other = get_broker().subscribe(exam_sheet2.id)
+        self.addCleanup(other.close)
+        task = ExamTask.objects.get(pk=self.exam_task.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task.exam_sheet = exam_sheet2
+            task.save()
+
+        self.assertEqual(event_types(self.received()), ['task_removed'])
+        self.assertEqual(event_types(other.get(timeout=0)), ['task_added'])
+
+    def test_sheet_events(self):
+        """Test that grading and archiving sheet is published"""
+        exam_sheet = ExamSheet.objects.get(pk=self.exam_sheet.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            exam_sheet.grade = 5
+            exam_sheet.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            exam_sheet.is_archived = True
+            exam_sheet.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            exam_sheet.delete()
+
+        events = self.received()
+        self.assertEqual(
+            event_types(events),
+            ['grade_set', 'archive_toggled', 'task_deleted', 'sheet_deleted']
+        )
+        self.assertEqual(events[0]['grade'], 5)
+
+    def test_rolled_back_change_not_published(self):
+        """Test that events are published only after commit"""
+        with self.captureOnCommitCallbacks(execute=False):
+            ExamTask.objects.create(exam_sheet=self.exam_sheet, title='Task')
+
+        self.assertEqual(self.received(), [])
+
+    def test_bulk_answers_event(self):
+        """Test that answers sent at once are published as one event"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        task2 = ExamTask.objects.create(
+            exam_sheet=self.exam_sheet,
+            title='Task'
+        )
+        self.received()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            client.patch(
+                reverse('exam:examsheet-answers', args=[self.exam_sheet.id]),
+                {self.exam_task.id: 'Answer', task2.id: 'Answer'},
+                format='json'
+            )
+
+        events = self.received()
+        self.assertEqual(event_types(events), ['answer_submitted'])
+        self.assertCountEqual(
+            events[0]['tasks'], [self.exam_task.id, task2.id]
+        )
+
+    def test_bulk_update_events(self):
+        """Test that tasks updated in bulk are published"""
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            client.patch(
+                reverse('exam:examtask-bulk'),
+                [{'id': self.exam_task.id, 'title': 'New title'}],
+                format='json'
+            )
+
+        self.assertEqual(event_types(self.received()), ['task_changed'])
+
+    def test_queued_answers_event(self):
+        """Test that answers written by write-behind queue are published"""
+        queue = AnswerWriteBehind(autostart=False)
+        queue.submit(
+            self.exam_task.id, self.exam_sheet.id, self.user.pk, 'Answer'
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            queue.flush()
+
+        self.assertEqual(event_types(self.received()), ['answer_submitted'])
+
+
+@override_settings(EXAM_EVENTS_KEEPALIVE=0.05, EXAM_EVENTS_TIMEOUT=0.3)
+class EventStreamApiTests(TestCase):
+    """Test streaming exam sheet events to its owner and student"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.exam_sheet = ExamSheet.objects.create(
+            owner=sample_user(username='teacher'),
+            student=self.user,
+            description='Test description'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_stream_events(self):
+        """Test that changes are streamed as server-sent events"""
+        res = self.client.get(events_url(self.exam_sheet.id))
+        stream = iter(res.streaming_content)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/event-stream')
+        self.assertEqual(res['Cache-Control'], 'no-cache')
+        # Subscribed when stream is started
+        self.assertEqual(next(stream), b'retry: 1000\n\n')
+        with self.captureOnCommitCallbacks(execute=True):
+            ExamTask.objects.create(exam_sheet=self.exam_sheet, title='Task')
+        body = b''.join(stream).decode()
+
+        self.assertIn('event: task_added\n', body)
+        self.assertIn(': keepalive\n\n', body)
+
+    def test_stream_ends_when_sheet_deleted(self):
+        """Test that stream is closed after sheet is deleted"""
+        res = self.client.get(events_url(self.exam_sheet.id))
+        stream = iter(res.streaming_content)
+        next(stream)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.exam_sheet.delete()
+
+        self.assertIn('event: sheet_deleted\n', b''.join(stream).decode())
+        self.assertEqual(get_broker()._subscriptions, {})
+
+    def test_not_participant_forbidden(self):
+        """Test that other users can't subscribe to exam sheet"""
+        self.client.force_authenticate(sample_user(username='testuser2'))
+
+        res = self.client.get(events_url(self.exam_sheet.id))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertIn(b'event: error', res.content)
+
+    @override_settings(ROOT_URLCONF='exam.tests.async_urls')
+    async def test_async_stream(self):
+        """Test that ASGI request is streamed by async generator"""
+        credentials = base64.b64encode(b'testusername:testpassword123')
+
+        res = await AsyncClient().get(
+            events_url(self.exam_sheet.id),
+            headers={'authorization': f'Basic {credentials.decode()}'}
+        )
+        chunks = []
+        async for chunk in res.streaming_content:
+            if not chunks:
+                get_broker().publish(
+                    self.exam_sheet.id, {'type': 'grade_set'}
+                )
+            chunks.append(chunk)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.is_async)
+        self.assertIn('event: grade_set\n', b''.join(chunks).decode())
+
+
+@unittest.skipUnless(
+    connection.vendor == 'postgresql', 'LISTEN/NOTIFY needs PostgreSQL'
+)
+class PostgresBrokerTests(TransactionTestCase):
+    """Test sending events between processes through PostgreSQL"""
+
+    def test_notification_dispatched(self):
+        """Test that published event reaches subscriber of other process"""
+        listening, publishing = PostgresBroker(), PostgresBroker()
+        self.addCleanup(listening.stop)
+        subscription = listening.subscribe(1)
+
+        publishing.publish(1, {'type': 'task_added'})
+
+        self.assertEqual(
+            event_types(subscription.get(timeout=5)), ['task_added']
+        )
+
+    def test_large_event_published(self):
+        """Test that event above NOTIFY payload limit is delivered in parts"""
+        listening, publishing = PostgresBroker(), PostgresBroker()
+        self.addCleanup(listening.stop)
+        subscription = listening.subscribe(1)
+        tasks = list(range(5000))
+
+        publishing.publish(1, {'type': 'task_added', 'tasks': tasks})
+
+        received = []
+        while len(received) < len(tasks):
+            events = subscription.get(timeout=5)
+            self.assertTrue(events)
+            for event in events:
+                received.extend(event['tasks'])
+        self.assertEqual(received, tasks)
@@ -1,6 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -111,7 +111,7 @@ class PrivateExamApiTests(TestCase):
         serializer = ExamSheetSerializer(sheets, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_retreive_exam_sheet_list_limited_to_user(self):
         """Test that exam sheets returned are for authenticated user"""
@@ -128,8 +128,11 @@ class PrivateExamApiTests(TestCase):
         res = self.client.get(EXAM_SHEETS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['description'], exam_sheet.description)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(
+            res.data['results'][0]['description'],
+            exam_sheet.description
+        )
 
     def test_create_exam_sheet_successful(self):
         """Test creating a new exam sheet"""
@@ -171,8 +174,8 @@ class PrivateExamApiTests(TestCase):
         serializer1 = ExamSheetSerializer(archived)
         serializer2 = ExamSheetSerializer(valid_sheet)
 
-        self.assertNotIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
+        self.assertNotIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
 
     def test_retrieve_exam_sheet_detail(self):
         """Test viewing an exam_sheet detail"""
@@ -278,8 +281,8 @@ class PrivateExamApiTests(TestCase):
         serializer = ExamSheetSerializer(archived_sheets, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     # Both versions of  action 'change_archive_status' are tested
     # Commented part tests action with method='PATCH'
@@ -407,7 +410,7 @@ class PrivateExamApiTests(TestCase):
         res = self.client.get(NO_FILTERING_EXAM_SHEETS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 3)
+        self.assertEqual(len(res.data['results']), 3)
 
     def test_exam_sheet_list_filter_by_students(self):
         """Test if passing student query param filters out sheets"""
@@ -428,8 +431,8 @@ class PrivateExamApiTests(TestCase):
         serializer1 = ExamSheetSerializer(exam_sheet)
         serializer2 = ExamSheetSerializer(exam_sheet2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
 
 class PublicExamTaskApiTests(TestCase):
@@ -471,8 +474,8 @@ class PrivateExamTaskApiTests(TestCase):
         serializer = ExamTaskSerializer(exam_task)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertIn(serializer.data, res.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertIn(serializer.data, res.data['results'])
 
     def test_exam_task_list_for_user(self):
         """Test that view list all exam tasks for given user"""
@@ -492,8 +495,8 @@ class PrivateExamTaskApiTests(TestCase):
         serializer = ExamTaskSerializer(exam_task)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertIn(serializer.data, res.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertIn(serializer.data, res.data['results'])
 
     def test_create_exam_task_successful(self):
         """Test creating a new exam sheet"""
@@ -661,3 +664,62 @@ class PrivateExamTaskApiTests(TestCase):
 
         self.assertEqual(len(task_list), 1)
         self.assertIn(exam_task, task_list)
+
+
+class PaginationApiTests(TestCase):
+    """Test cursor pagination of list endpoints"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_exam_sheet_list_pages(self):
+        """Test that following next cursor returns every sheet once"""
+        sheets = [sample_exam_sheet(owner=self.user) for _ in range(5)]
+
+        ids = []
+        res = self.client.get(NO_FILTERING_EXAM_SHEETS_URL, {'page_size': 2})
+        while True:
+            self.assertLessEqual(len(res.data['results']), 2)
+            ids.extend(sheet['id'] for sheet in res.data['results'])
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(ids, [sheet.id for sheet in sheets])
+
+    def test_page_size_setting(self):
+        """Test that default page size is read from settings per request"""
+        for _ in range(3):
+            sample_exam_sheet(owner=self.user)
+
+        with override_settings(EXAM_PAGE_SIZE=2):
+            res = self.client.get(EXAM_SHEETS_URL)
+
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_max_page_size(self):
+        """Test that requested page size is limited"""
+        for _ in range(3):
+            sample_exam_sheet(owner=self.user)
+
+        with override_settings(EXAM_MAX_PAGE_SIZE=2):
+            res = self.client.get(EXAM_SHEETS_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_exam_task_list_for_sheet_pages(self):
+        """Test that tasks for sheet are paginated"""
+        exam_sheet = sample_exam_sheet(owner=self.user)
+        for number in range(3):
+            sample_exam_task(exam_sheet=exam_sheet, title=f'Task {number}')
+
+        url = exam_tasks_for_sheet(exam_sheet.id)
+        res = self.client.get(url, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
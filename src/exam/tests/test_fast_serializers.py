@@ -0,0 +1,115 @@
+from unittest import mock
+
+from django.db.models import Prefetch
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from exam.fast_serializers import ExamSheetValuesSerializer, \
+                                  ExamTaskValuesSerializer, ValuesSerializer
+from exam.models import ExamSheet, ExamTask
+from exam.serializers import ExamSheetSerializer, ExamTaskSerializer
+from exam.tests.utils import sample_user
+
+
+class ValuesSerializerParityTests(TestCase):
+    """Test that values serializers give the same output as serializers"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.student = sample_user(username='student')
+        exam_sheets = [
+            ExamSheet.objects.create(
+                owner=self.user,
+                student=self.student,
+                description='Zadanie żółte "1"',
+                grade='5+'
+            ),
+            ExamSheet.objects.create(
+                owner=self.user,
+                description='Archived',
+                is_archived=True
+            ),
+            # Sheet without tasks
+            ExamSheet.objects.create(owner=self.user, description='Empty'),
+        ]
+        ExamTask.objects.create(
+            exam_sheet=exam_sheets[0],
+            title='Task',
+            description='Line\nbreak',
+            answer='',
+            points=0
+        )
+        ExamTask.objects.create(exam_sheet=exam_sheets[1], title='Task')
+        ExamTask.objects.create(
+            exam_sheet=exam_sheets[0],
+            title='Task',
+            points=-3
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertSameJson(self, data, fast_data):
+        """Assert that rendered data are byte for byte equal"""
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(data), renderer.render(fast_data))
+
+    def test_exam_sheet_parity(self):
+        """Test that exam sheets are serialized the same way"""
+        queryset = ExamSheet.objects.order_by('id')
+        fast = ExamSheetValuesSerializer()
+
+        self.assertSameJson(
+            ExamSheetSerializer(queryset.prefetch_related(Prefetch(
+                'tasks', queryset=ExamTask.objects.order_by('id')
+            )), many=True).data,
+            fast.represent(fast.values(queryset))
+        )
+
+    def test_exam_task_parity(self):
+        """Test that exam tasks are serialized the same way"""
+        queryset = ExamTask.objects.order_by('id')
+        fast = ExamTaskValuesSerializer()
+
+        self.assertSameJson(
+            ExamTaskSerializer(queryset, many=True).data,
+            fast.represent(fast.values(queryset))
+        )
+
+    def test_related_ids_one_query(self):
+        """Test that task ids of all sheets are loaded with one query"""
+        fast = ExamSheetValuesSerializer()
+        rows = list(fast.values(ExamSheet.objects.all()))
+
+        with self.assertNumQueries(1):
+            fast.represent(rows)
+        with self.assertNumQueries(0):
+            fast.represent([])
+
+    @override_settings(EXAM_RESPONSE_CACHE=False)
+    def test_api_responses_parity(self):
+        """Test that list endpoints return the same content on both paths"""
+        exam_sheet = ExamSheet.objects.first()
+        urls = [
+            reverse('exam:examsheet-list'),
+            reverse('exam:examsheet-archive-list'),
+            reverse('exam:examsheet-nofilter'),
+            reverse('exam:examsheet-nofilter') + '?page_size=1',
+            reverse('exam:examsheet-nofilter') + '?stream=1',
+            reverse('exam:examsheet-nofilter') + '?format=ndjson',
+            reverse('exam:examtask-list'),
+            reverse('exam:examtask-sheet', args=[exam_sheet.id]),
+        ]
+
+        for url in urls:
+            with self.settings(EXAM_FAST_SERIALIZERS=False):
+                content = self.client.get(url).getvalue()
+            with mock.patch.object(
+                    ValuesSerializer, 'represent', autospec=True,
+                    side_effect=ValuesSerializer.represent) as represent:
+                # Streamed content is serialized while it's read
+                fast_content = self.client.get(url).getvalue()
+
+            self.assertTrue(represent.called, url)
+            self.assertEqual(content, fast_content, url)
@@ -0,0 +1,283 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from exam.grading import grade_sheets, load_batch, save_scores
+from exam.models import ExamSheet, ExamTask
+from exam.scoring import TaskRubric, check_rubric, is_correct, score_sheet
+from exam.tests.utils import sample_user
+
+SCALE = ((90, 'A'), (50, 'C'), (0, 'F'))
+
+
+def rubric_task(rubric, expected_answer, answer, tolerance=None,
+                max_points=1, task_id=1):
+    """Return scored fields of exam task"""
+    return TaskRubric(
+        task_id, rubric, expected_answer, tolerance, max_points, answer, None
+    )
+
+
+class ScoringTests(SimpleTestCase):
+    """Test comparing answers with rubrics"""
+
+    def test_exact(self):
+        """Test that exact rubric accepts only the same text"""
+        self.assertTrue(is_correct(rubric_task('exact', 'Paris', 'Paris')))
+        self.assertFalse(is_correct(rubric_task('exact', 'Paris', 'paris')))
+
+    def test_normalized(self):
+        """Test that case and whitespace are ignored by normalized rubric"""
+        self.assertTrue(is_correct(
+            rubric_task('normalized', 'New  York', ' new york\n')
+        ))
+        self.assertFalse(is_correct(
+            rubric_task('normalized', 'New York', 'Newyork')
+        ))
+
+    def test_regex(self):
+        """Test that whole answer has to match regex rubric"""
+        task = rubric_task('regex', r'colou?r', 'color')
+        self.assertTrue(is_correct(task))
+        self.assertFalse(is_correct(task._replace(answer='colors')))
+
+    def test_numeric(self):
+        """Test that numeric answer within tolerance is correct"""
+        task = rubric_task('numeric', '3.14', '3,1416', tolerance=0.01)
+        self.assertTrue(is_correct(task))
+        self.assertFalse(is_correct(task._replace(answer='3.2')))
+        self.assertFalse(is_correct(task._replace(answer='pi')))
+        self.assertFalse(is_correct(task._replace(tolerance=None)))
+
+    def test_missing_answer(self):
+        """Test that missing or empty answer is never correct"""
+        for answer in (None, ''):
+            self.assertFalse(is_correct(rubric_task('regex', '.*', answer)))
+
+    def test_check_rubric(self):
+        """Test that expected answer has to fit rubric"""
+        check_rubric(None, None)
+        check_rubric('numeric', '1,5')
+        for rubric, expected_answer in (
+                ('exact', ''), ('regex', '('), ('numeric', 'one'),
+                ('numeric', 'inf'), ('unknown', 'x')):
+            with self.assertRaises(ValueError):
+                check_rubric(rubric, expected_answer)
+
+    def test_sheet_graded(self):
+        """Test that grade is given by percent of points of sheet"""
+        tasks = [
+            rubric_task('exact', 'a', 'a', max_points=3, task_id=1),
+            rubric_task('exact', 'b', 'x', max_points=1, task_id=2),
+        ]
+
+        score = score_sheet(7, tasks, SCALE)
+
+        self.assertEqual(score.points, {1: 3, 2: 0})
+        self.assertEqual(score.grade, 'C')
+
+    def test_sheet_graded_by_hand(self):
+        """Test that sheet with task without rubric isn't graded"""
+        tasks = [
+            rubric_task('exact', 'a', 'a', task_id=1),
+            rubric_task(None, None, 'essay', task_id=2),
+        ]
+
+        score = score_sheet(7, tasks, SCALE)
+
+        self.assertEqual(score.points, {1: 1})
+        self.assertIsNone(score.grade)
+
+
+class GradeSheetsTests(TestCase):
+    """Test grading exam sheets in batches"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = sample_user()
+        self.exam_sheets = self.add_sheets(4)
+
+    def add_sheets(self, count):
+        """Create exam sheets with one right and one wrong answer"""
+        exam_sheets = ExamSheet.objects.bulk_create(
+            ExamSheet(owner=self.user, description=f'Sheet {number}')
+            for number in range(count)
+        )
+        for exam_sheet in exam_sheets:
+            ExamTask.objects.create(
+                exam_sheet=exam_sheet, title='Capital', answer='Paris',
+                rubric='normalized', expected_answer='paris', max_points=2
+            )
+            ExamTask.objects.create(
+                exam_sheet=exam_sheet, title='Sum', answer='5',
+                rubric='numeric', expected_answer='4'
+            )
+        return exam_sheets
+
+    def assertGraded(self):
+        """Assert that every sheet got points and grade"""
+        self.assertEqual(
+            set(ExamSheet.objects.values_list(
+                'grade', 'task_count', 'total_points'
+            )),
+            {('C', 2, 2)}
+        )
+        self.assertEqual(
+            set(ExamTask.objects.values_list('title', 'points')),
+            {('Capital', 2), ('Sum', 0)}
+        )
+
+    def test_sheets_graded(self):
+        """Test that points and grades are written"""
+        scores, changed_tasks = grade_sheets(
+            [exam_sheet.id for exam_sheet in self.exam_sheets],
+            workers=1, batch_size=3
+        )
+
+        self.assertEqual(len(scores), 4)
+        self.assertEqual(changed_tasks, 8)
+        self.assertGraded()
+
+    def test_unchanged_points_not_written(self):
+        """Test that grading again doesn't write the same points"""
+        sheet_ids = [exam_sheet.id for exam_sheet in self.exam_sheets]
+        grade_sheets(sheet_ids, workers=1)
+
+        scores, changed_tasks = grade_sheets(sheet_ids, workers=1)
+
+        self.assertEqual(changed_tasks, 0)
+
+    def test_process_pool(self):
+        """Test that batches scored by worker processes are written"""
+        grade_sheets(
+            [exam_sheet.id for exam_sheet in self.exam_sheets],
+            workers=2, batch_size=1
+        )
+
+        self.assertGraded()
+
+    def test_batches_streamed(self):
+        """Test that only batches being scored are loaded at once"""
+        self.add_sheets(6)
+        loaded, saved, in_flight = [], [], []
+
+        def load(sheet_ids):
+            loaded.append(sheet_ids)
+            in_flight.append(len(loaded) - len(saved))
+            return load_batch(sheet_ids)
+
+        def save(batch, scores):
+            saved.append(batch)
+            return save_scores(batch, scores)
+
+        with mock.patch('exam.grading.load_batch', load), \
+                mock.patch('exam.grading.save_scores', save):
+            grade_sheets(
+                ExamSheet.objects.values_list('id', flat=True),
+                workers=2, batch_size=1
+            )
+            self.assertEqual(max(in_flight), 4)
+            in_flight.clear()
+            grade_sheets(
+                ExamSheet.objects.values_list('id', flat=True),
+                workers=1, batch_size=1
+            )
+            self.assertEqual(max(in_flight), 1)
+
+        self.assertEqual(len(saved), 20)
+        self.assertGraded()
+
+
+class GradeApiTests(TestCase):
+    """Test grading exam sheet and writing rubrics through API"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.exam_sheet = ExamSheet.objects.create(
+            owner=self.user,
+            description='Test description',
+            grade='B'
+        )
+        self.task = ExamTask.objects.create(
+            exam_sheet=self.exam_sheet, title='Task', answer='42',
+            rubric='exact', expected_answer='42'
+        )
+
+    def grade_url(self):
+        """Return url grading exam sheet"""
+        return reverse('exam:examsheet-grade', args=[self.exam_sheet.id])
+
+    def test_sheet_graded(self):
+        """Test that owner gets points of tasks and grade of sheet"""
+        res = self.client.post(self.grade_url())
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'id': self.exam_sheet.id,
+            'grade': 'A',
+            'points': {str(self.task.id): 1},
+        })
+        self.exam_sheet.refresh_from_db()
+        self.assertEqual(self.exam_sheet.grade, 'A')
+
+    def test_grade_kept_without_rubrics(self):
+        """Test that grade typed by teacher stays if task has no rubric"""
+        ExamTask.objects.create(exam_sheet=self.exam_sheet, title='Essay')
+
+        res = self.client.post(self.grade_url())
+
+        self.assertEqual(res.data['grade'], 'B')
+        self.assertEqual(res.data['points'], {str(self.task.id): 1})
+
+    def test_only_owner_grades(self):
+        """Test that sheet of other teacher can't be graded"""
+        self.client.force_authenticate(sample_user('other'))
+
+        res = self.client.post(self.grade_url())
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.task.refresh_from_db()
+        self.assertIsNone(self.task.points)
+
+    def test_expected_answer_not_shown(self):
+        """Test that expected answer is written but never shown"""
+        res = self.client.patch(
+            reverse('exam:examtask-detail', args=[self.task.id]),
+            {'expected_answer': '43'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('expected_answer', res.data)
+        self.assertEqual(res.data['rubric'], 'exact')
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.expected_answer, '43')
+        res = self.client.get(reverse('exam:examtask-list'))
+        self.assertNotIn('expected_answer', res.data['results'][0])
+
+    def test_infinite_tolerance_rejected(self):
+        """Test that tolerance has to be finite number"""
+        for tolerance in ('nan', 'inf'):
+            res = self.client.patch(
+                reverse('exam:examtask-detail', args=[self.task.id]),
+                {'tolerance': tolerance}
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('tolerance', res.data)
+
+    def test_invalid_rubric_rejected(self):
+        """Test that expected answer has to fit rubric of task"""
+        res = self.client.patch(
+            reverse('exam:examtask-detail', args=[self.task.id]),
+            {'rubric': 'regex', 'expected_answer': '[0-'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('expected_answer', res.data)
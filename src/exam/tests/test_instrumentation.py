@@ -0,0 +1,214 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from exam.instrumentation import registry, server_timing
+from exam.models import ExamSheet, ExamTask
+from exam.tests.utils import basic_auth, sample_user
+
+EXAM_SHEETS_URL = reverse('exam:examsheet-list')
+METRICS_URL = reverse('exam:metrics')
+
+
+def timings(response):
+    """Return mapping of Server-Timing metric name to its parameters"""
+    metrics = {}
+    for part in response['Server-Timing'].split(', '):
+        name, *params = part.split(';')
+        metrics[name] = dict(param.split('=', 1) for param in params)
+    return metrics
+
+
+class ServerTimingTests(TestCase):
+    """Test timings of request sent in Server-Timing header"""
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.exam_sheet = ExamSheet.objects.create(
+            owner=self.user,
+            description='Test description'
+        )
+        ExamTask.objects.create(exam_sheet=self.exam_sheet, title='Task')
+
+    def test_server_timing_header(self):
+        """Test that header has every phase and number of queries"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(EXAM_SHEETS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        metrics = timings(res)
+        self.assertEqual(
+            list(metrics), ['db', 'serializer', 'auth', 'render', 'total']
+        )
+        self.assertEqual(
+            metrics['db']['desc'], f'"{len(queries)} queries"'
+        )
+        for params in metrics.values():
+            self.assertRegex(params['dur'], r'^\d+\.\d$')
+
+    @override_settings(EXAM_SERVER_TIMING=False)
+    def test_header_disabled(self):
+        """Test that header isn't sent if it's disabled"""
+        res = self.client.get(EXAM_SHEETS_URL)
+
+        self.assertFalse(res.has_header('Server-Timing'))
+        self.assertIn('ExamSheetViewSet.list', registry.exposition())
+
+    @override_settings(EXAM_INSTRUMENTATION=False)
+    def test_instrumentation_disabled(self):
+        """Test that nothing is measured if instrumentation is disabled"""
+        res = self.client.get(EXAM_SHEETS_URL)
+
+        self.assertFalse(res.has_header('Server-Timing'))
+        self.assertNotIn('ExamSheetViewSet', registry.exposition())
+
+    def test_request_logged(self):
+        """Test that one line with metrics is logged per request"""
+        with self.assertLogs('exam.instrumentation', 'INFO') as logs:
+            self.client.get(EXAM_SHEETS_URL)
+
+        self.assertEqual(len(logs.records), 1)
+        record = logs.records[0]
+        self.assertIn('action=ExamSheetViewSet.list', record.getMessage())
+        self.assertIn('status=200', record.getMessage())
+        self.assertEqual(record.metrics['action'], 'ExamSheetViewSet.list')
+        self.assertGreater(record.metrics['queries'], 0)
+
+    def test_server_timing_format(self):
+        """Test that durations are in milliseconds"""
+        values = {
+            'db': 0.0123, 'queries': 3, 'serializer': 0.001, 'auth': 0,
+            'render': 0.0005, 'total': 0.02,
+        }
+
+        self.assertEqual(
+            server_timing(values),
+            'db;dur=12.3;desc="3 queries", serializer;dur=1.0, '
+            'auth;dur=0.0, render;dur=0.5, total;dur=20.0'
+        )
+
+
+class MetricsRegistryTests(TestCase):
+    """Test request metrics collected by actions"""
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.exam_sheet = ExamSheet.objects.create(
+            owner=self.user,
+            description='Test description'
+        )
+        self.task = ExamTask.objects.create(
+            exam_sheet=self.exam_sheet, title='Task'
+        )
+
+    def test_requests_labeled_with_action(self):
+        """Test that requests are counted by viewset and action"""
+        self.client.get(EXAM_SHEETS_URL)
+        self.client.get(EXAM_SHEETS_URL)
+        self.client.patch(
+            reverse('exam:examtask-answer', args=[self.task.id]),
+            {'answer': 'Answer'}
+        )
+
+        exposition = registry.exposition()
+        self.assertIn(
+            'exam_request_duration_seconds_count'
+            '{action="ExamSheetViewSet.list"} 2',
+            exposition
+        )
+        self.assertIn(
+            'exam_request_duration_seconds_bucket'
+            '{action="ExamTaskViewSet.answer",le="+Inf"} 1',
+            exposition
+        )
+
+    def test_queries_counted(self):
+        """Test that database queries of request are added to totals"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse(
+                'exam:examsheet-detail', args=[self.exam_sheet.id]
+            ))
+
+        match = re.search(
+            r'^exam_request_queries_total'
+            r'\{action="ExamSheetViewSet.retrieve"\} (\d+)$',
+            registry.exposition(), re.MULTILINE
+        )
+        self.assertEqual(int(match.group(1)), len(queries))
+
+    async def test_async_action_labeled(self):
+        """Test that queries of async action run in threads are counted"""
+        res = await AsyncClient().get(reverse(
+            'exam:examsheet-detail', args=[self.exam_sheet.id]
+        ), headers=basic_auth())
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(timings(res)['db']['desc'], '"0 queries"')
+
+        match = re.search(
+            r'^exam_request_queries_total'
+            r'\{action="ExamSheetViewSet.retrieve"\} (\d+)$',
+            registry.exposition(), re.MULTILINE
+        )
+        self.assertGreater(int(match.group(1)), 0)
+
+    def test_unmatched_request(self):
+        """Test that request not handled by API view is still counted"""
+        self.client.get('/missing/')
+
+        self.assertIn('action="unmatched"', registry.exposition())
+
+
+class MetricsViewTests(TestCase):
+    """Test endpoint serving request metrics"""
+
+    def setUp(self):
+        registry.clear()
+        self.client = APIClient()
+
+    def test_login_required(self):
+        """Test that metrics aren't served to anonymous client"""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_admin_required(self):
+        """Test that metrics aren't served to regular user"""
+        self.client.force_authenticate(sample_user())
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics_served_to_admin(self):
+        """Test that admin gets metrics in Prometheus text format"""
+        self.client.force_authenticate(sample_user(is_staff=True))
+        self.client.get(EXAM_SHEETS_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        content = res.content.decode()
+        self.assertIn(
+            '# TYPE exam_request_duration_seconds histogram', content
+        )
+        self.assertIn(
+            'exam_request_duration_seconds_count'
+            '{action="ExamSheetViewSet.list"} 1',
+            content
+        )
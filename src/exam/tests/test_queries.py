@@ -0,0 +1,433 @@
+import logging
+from unittest import mock
+
+from django.db import connection
+from django.urls import reverse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APIClient
+
+from exam.instrumentation import slow_query_explainer
+from exam.models import ExamSheet, ExamTask
+from exam.tests.utils import SHEET_LOCK, QueryCountMixin, detail_url, \
+                             query_shape, sample_user
+from exam.views import ExamSheetViewSet
+
+EXAM_SHEETS_URL = reverse('exam:examsheet-list')
+ARCHIVED_EXAM_SHEETS_URL = reverse('exam:examsheet-archive-list')
+NO_FILTERING_EXAM_SHEETS_URL = reverse('exam:examsheet-nofilter')
+
+
+class ExamSheetQueryCountTests(QueryCountMixin, TestCase):
+    """Test that exam sheet endpoints don't issue query per row"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_sheets(self, count=3, is_archived=False):
+        """Return function adding exam sheets with few tasks each"""
+        def add_rows():
+            for _ in range(count):
+                exam_sheet = ExamSheet.objects.create(
+                    owner=self.user,
+                    description='Test description',
+                    is_archived=is_archived
+                )
+                for number in range(3):
+                    ExamTask.objects.create(
+                        exam_sheet=exam_sheet,
+                        title=f'Task {number}'
+                    )
+        return add_rows
+
+    def test_list_queries(self):
+        """Test that sheet list loads tasks in one query"""
+        # Sheets, their tasks and validators of list
+        self.assertConstantQueries(
+            lambda: self.client.get(EXAM_SHEETS_URL),
+            self.add_sheets(),
+            num=3
+        )
+
+    def test_archive_list_queries(self):
+        """Test that archived sheet list loads tasks in one query"""
+        self.assertConstantQueries(
+            lambda: self.client.get(ARCHIVED_EXAM_SHEETS_URL),
+            self.add_sheets(is_archived=True),
+            num=3
+        )
+
+    def test_not_filtered_list_queries(self):
+        """Test that unfiltered sheet list loads tasks in one query"""
+        self.assertConstantQueries(
+            lambda: self.client.get(NO_FILTERING_EXAM_SHEETS_URL),
+            self.add_sheets(),
+            num=2
+        )
+
+    def test_detail_queries(self):
+        """Test that nested tasks of sheet are loaded in one query"""
+        exam_sheet = ExamSheet.objects.create(
+            owner=self.user,
+            description='Test description'
+        )
+
+        def add_tasks():
+            for number in range(5):
+                ExamTask.objects.create(
+                    exam_sheet=exam_sheet,
+                    title=f'Task {number}'
+                )
+
+        self.assertConstantQueries(
+            lambda: self.client.get(detail_url(exam_sheet.id)),
+            add_tasks,
+            num=2
+        )
+
+
+def task_detail_url(exam_task_id):
+    """Return exam task detail url"""
+    return reverse('exam:examtask-detail', args=[exam_task_id])
+
+
+def task_answer_url(exam_task_id):
+    """Return url for answering exam task"""
+    return reverse('exam:examtask-answer', args=[exam_task_id])
+
+
+class ExamTaskPermissionQueryCountTests(TestCase):
+    """Test that permission checks don't load sheet or users again"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.student = sample_user(username='student')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.exam_sheet = ExamSheet.objects.create(
+            owner=self.user,
+            student=self.student,
+            description='Test description'
+        )
+        self.exam_task = ExamTask.objects.create(
+            exam_sheet=self.exam_sheet,
+            title='Task'
+        )
+
+    def test_retrieve_queries(self):
+        """Test that task is retrieved with one query"""
+        with self.assertNumQueries(1):
+            self.client.get(task_detail_url(self.exam_task.id))
+
+    def test_update_queries(self):
+        """Test that owner check uses sheet loaded with task"""
+        # Task with sheet, sheet from payload, update of task and
+        # touch of sheet
+        with self.assertNumQueries(4 + SHEET_LOCK):
+            res = self.client.patch(
+                task_detail_url(self.exam_task.id),
+                {'title': 'New title', 'exam_sheet': self.exam_sheet.id}
+            )
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_update_not_owner(self):
+        """Test that other user can't update task"""
+        self.client.force_authenticate(self.student)
+
+        res = self.client.patch(
+            task_detail_url(self.exam_task.id), {'title': 'New title'}
+        )
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_answer_queries(self):
+        """Test that student check uses sheet loaded with task"""
+        self.client.force_authenticate(self.student)
+
+        # Task with sheet, update of task and touch of sheet
+        with self.assertNumQueries(3 + SHEET_LOCK):
+            res = self.client.patch(
+                task_answer_url(self.exam_task.id), {'answer': 'Answer'}
+            )
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_answer_not_student(self):
+        """Test that other user can't answer task"""
+        self.client.force_authenticate(sample_user(username='testuser2'))
+
+        res = self.client.patch(
+            task_answer_url(self.exam_task.id), {'answer': 'Answer'}
+        )
+
+        self.assertEqual(res.status_code, 403)
+
+
+class ExamSheetTasksValidationTests(TestCase):
+    """Test validating tasks of exam sheet with one query"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        exam_sheet = ExamSheet.objects.create(
+            owner=self.user, description='Test description'
+        )
+        self.task_ids = [
+            ExamTask.objects.create(
+                exam_sheet=exam_sheet, title=f'Task {number}'
+            ).id
+            for number in range(3)
+        ]
+
+    def test_tasks_loaded_at_once(self):
+        """Test that any number of tasks is validated with one query"""
+        counts = []
+        for task_ids in (self.task_ids[:1], self.task_ids):
+            with CaptureQueriesContext(connection) as context:
+                res = self.client.post(EXAM_SHEETS_URL, {
+                    'description': 'New sheet', 'tasks': task_ids
+                })
+            self.assertEqual(res.status_code, 201)
+            self.assertCountEqual(res.data['tasks'], task_ids)
+            counts.append(len(context.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_missing_task(self):
+        """Test that unknown task is reported like by related field"""
+        res = self.client.post(EXAM_SHEETS_URL, {
+            'description': 'New sheet', 'tasks': [self.task_ids[0], 0]
+        }, format='json')
+
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(
+            res.data['tasks'], ['Invalid pk "0" - object does not exist.']
+        )
+
+    def test_invalid_task_id(self):
+        """Test that task id of wrong type is rejected"""
+        for task_id in ('abc', True, {'id': 1}):
+            res = self.client.post(EXAM_SHEETS_URL, {
+                'description': 'New sheet', 'tasks': [task_id]
+            }, format='json')
+
+            self.assertEqual(res.status_code, 400, task_id)
+            self.assertIn('Incorrect type', str(res.data['tasks'][0]))
+
+
+class QueryShapeTests(SimpleTestCase):
+    """Test telling apart queries that differ only in values"""
+
+    def test_values_replaced(self):
+        """Test that numbers, strings and value lists are replaced"""
+        self.assertEqual(
+            query_shape(
+                "SELECT * FROM exam_examtask WHERE id IN (1, 2, 3) AND "
+                "title = 'It''s 1' LIMIT 21"
+            ),
+            query_shape(
+                "SELECT * FROM exam_examtask\n WHERE id IN (4) AND "
+                "title = 'Other' LIMIT 1"
+            )
+        )
+
+    def test_identifiers_kept(self):
+        """Test that queries of different tables have different shapes"""
+        self.assertNotEqual(
+            query_shape('SELECT * FROM "exam_examtask" WHERE "id" = 1'),
+            query_shape('SELECT * FROM "exam_examsheet" WHERE "id" = 1')
+        )
+
+
+class ActionQueryBudgetTests(QueryCountMixin, TestCase):
+    """Test that every exam API action stays within its query budget"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.student = sample_user(username='student')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.exam_sheets = [
+            ExamSheet.objects.create(
+                owner=self.user,
+                student=self.student,
+                description=f'Test description {number}',
+                is_archived=archived
+            )
+            for number in range(3) for archived in (False, True)
+        ]
+        self.exam_sheet = self.exam_sheets[0]
+        self.tasks = [
+            ExamTask.objects.create(
+                exam_sheet=exam_sheet, title=f'Task {number}'
+            )
+            for exam_sheet in self.exam_sheets for number in range(3)
+        ]
+        self.exam_task = self.tasks[0]
+
+    def test_exam_sheet_reads(self):
+        """Test that reading exam sheets doesn't issue query per row"""
+        urls = (
+            EXAM_SHEETS_URL, ARCHIVED_EXAM_SHEETS_URL,
+            NO_FILTERING_EXAM_SHEETS_URL, detail_url(self.exam_sheet.id),
+            f'{NO_FILTERING_EXAM_SHEETS_URL}?stream=1',
+            reverse('exam:examsheet-events', args=[self.exam_sheet.id]),
+        )
+
+        # Stream of events is closed right after it starts
+        with self.assertQueryBudget(), \
+                override_settings(EXAM_EVENTS_TIMEOUT=0):
+            for url in urls:
+                res = self.client.get(url)
+                self.assertEqual(res.status_code, 200, url)
+                if res.streaming:
+                    b''.join(res.streaming_content)
+
+    def test_exam_sheet_writes(self):
+        """Test that writing exam sheets doesn't issue query per row"""
+        task_ids = [task.id for task in self.exam_sheet.tasks.all()]
+        self.exam_sheet.tasks.update(rubric='exact', expected_answer='Answer')
+
+        with self.assertQueryBudget():
+            responses = [
+                self.client.post(EXAM_SHEETS_URL, {
+                    'description': 'New sheet', 'tasks': task_ids[:2]
+                }),
+                self.client.patch(detail_url(self.exam_sheet.id), {
+                    'description': 'Changed', 'tasks': task_ids
+                }),
+                self.client.patch(
+                    reverse(
+                        'exam:examsheet-answers', args=[self.exam_sheet.id]
+                    ),
+                    {str(task_id): 'Answer' for task_id in task_ids},
+                    format='json'
+                ),
+                self.client.post(reverse(
+                    'exam:examsheet-grade', args=[self.exam_sheet.id]
+                )),
+                self.client.get(reverse(
+                    'exam:examsheet-archive', args=[self.exam_sheet.id]
+                )),
+                self.client.delete(detail_url(self.exam_sheets[2].id)),
+            ]
+
+        self.assertEqual(
+            [res.status_code for res in responses],
+            [201, 200, 200, 200, 200, 204]
+        )
+
+    def test_exam_task_actions(self):
+        """Test that exam task actions don't issue query per row"""
+        with self.assertQueryBudget():
+            responses = [
+                self.client.get(reverse('exam:examtask-list')),
+                self.client.get(task_detail_url(self.exam_task.id)),
+                self.client.get(
+                    reverse('exam:examtask-sheet', args=[self.exam_sheet.id])
+                ),
+                self.client.post(reverse('exam:examtask-list'), {
+                    'exam_sheet': self.exam_sheet.id, 'title': 'New task'
+                }),
+                self.client.patch(
+                    task_detail_url(self.exam_task.id), {'title': 'New title'}
+                ),
+                self.client.delete(task_detail_url(self.tasks[1].id)),
+            ]
+        self.client.force_authenticate(self.student)
+        with self.assertQueryBudget():
+            responses += [
+                self.client.get(task_answer_url(self.exam_task.id)),
+                self.client.patch(
+                    task_answer_url(self.exam_task.id), {'answer': 'Answer'}
+                ),
+            ]
+
+        self.assertEqual(
+            [res.status_code for res in responses],
+            [200, 200, 200, 201, 200, 204, 200, 200]
+        )
+
+    def test_bulk_actions(self):
+        """Test that bulk writes of many tasks don't issue query per row"""
+        bulk_url = reverse('exam:examtask-bulk')
+
+        with self.assertQueryBudget():
+            responses = [
+                self.client.post(bulk_url, [
+                    {'exam_sheet': exam_sheet.id, 'title': 'Bulk task'}
+                    for exam_sheet in self.exam_sheets
+                ], format='json'),
+                self.client.patch(bulk_url, [
+                    {'id': task.id, 'exam_sheet': self.exam_sheet.id}
+                    for task in self.tasks[3:9]
+                ], format='json'),
+                self.client.delete(
+                    bulk_url, [task.id for task in self.tasks[9:]],
+                    format='json'
+                ),
+            ]
+
+        self.assertEqual(
+            [res.status_code for res in responses], [201, 200, 204]
+        )
+
+    def test_n_plus_one_detected(self):
+        """Test that loading tasks per sheet fails the check"""
+        # Without prefetch tasks field of every sheet issues a query
+        with mock.patch.object(
+                ExamSheetViewSet, 'get_queryset',
+                lambda view: ExamSheet.objects.all()), \
+                override_settings(EXAM_FAST_SERIALIZERS=False):
+            with self.assertRaisesMessage(
+                    AssertionError, 'ExamSheetViewSet.not_filtered_list '
+                    'repeats queries (N+1)'):
+                with self.assertQueryBudget():
+                    self.client.get(NO_FILTERING_EXAM_SHEETS_URL)
+
+    def test_budget_exceeded(self):
+        """Test that request issuing more queries than budget fails"""
+        with mock.patch.dict(
+                self.query_budgets, {'ExamSheetViewSet.retrieve': 1}):
+            with self.assertRaisesMessage(
+                    AssertionError, 'ExamSheetViewSet.retrieve issued 2 '
+                    'queries, budget is 1'):
+                with self.assertQueryBudget():
+                    self.client.get(detail_url(self.exam_sheet.id))
+
+
+@override_settings(EXAM_SLOW_QUERY_THRESHOLD=0)
+class SlowQueryExplainTests(TestCase):
+    """Test logging plans of slow queries"""
+
+    def test_plan_logged(self):
+        """Test that slow SELECT is logged with its plan"""
+        with self.assertLogs('exam.instrumentation', 'WARNING') as logs, \
+                connection.execute_wrapper(slow_query_explainer):
+            ExamSheet.objects.filter(description='Test').count()
+
+        self.assertEqual(len(logs.records), 1)
+        message = logs.records[0].getMessage()
+        self.assertIn('Slow query', message)
+        self.assertIn('exam_examsheet', message)
+        self.assertGreater(len(message.splitlines()), 1)
+
+    def test_writes_not_explained(self):
+        """Test that only SELECT queries are explained"""
+        user = sample_user()
+
+        with self.assertNoLogs('exam.instrumentation', logging.WARNING), \
+                connection.execute_wrapper(slow_query_explainer):
+            ExamSheet.objects.create(owner=user, description='Test')
+
+    @override_settings(EXAM_SLOW_QUERY_THRESHOLD=60)
+    def test_fast_query_not_explained(self):
+        """Test that queries under threshold aren't logged"""
+        with self.assertNoLogs('exam.instrumentation', logging.WARNING), \
+                connection.execute_wrapper(slow_query_explainer):
+            ExamSheet.objects.count()
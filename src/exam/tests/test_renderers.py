@@ -0,0 +1,127 @@
+import datetime
+import io
+from decimal import Decimal
+
+from django.test import SimpleTestCase, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from exam.renderers import FastJSONParser, FastJSONRenderer, \
+                           OrjsonBackend, get_json_backend
+
+PAYLOAD = {
+    'id': 1,
+    'description': 'Zażółć "gęślą" jaźń\n\u2028\u2029 \U0001F600',
+    'grade': None,
+    'is_archived': False,
+    'points': Decimal('1.5'),
+    'updated_at': datetime.datetime(
+        2019, 1, 21, 0, 51, 12, 345678, tzinfo=datetime.timezone.utc
+    ),
+    'detail': gettext_lazy('Not found.'),
+    'tasks': [
+        {'id': number, 'answer': f'Answer {number}', 'points': -number}
+        for number in range(3)
+    ],
+    5: 'Integer key',
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test that JSON backend gives the same output as JSONRenderer"""
+
+    def test_backend_enabled(self):
+        """Test that orjson backend is used when it's installed"""
+        try:
+            import orjson  # noqa: F401
+        except ImportError:
+            self.assertIsNone(get_json_backend())
+        else:
+            self.assertIsInstance(get_json_backend(), OrjsonBackend)
+
+    def test_same_output(self):
+        """Test that output is byte for byte equal to JSONRenderer"""
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD),
+            JSONRenderer().render(PAYLOAD)
+        )
+
+    def test_same_output_without_backend(self):
+        """Test that json module is used if backend is disabled"""
+        with override_settings(EXAM_JSON_BACKEND=None):
+            self.assertIsNone(get_json_backend())
+            content = FastJSONRenderer().render(PAYLOAD)
+
+        self.assertEqual(content, JSONRenderer().render(PAYLOAD))
+
+    @override_settings(EXAM_JSON_BACKEND='exam.tests.missing.Backend')
+    def test_missing_backend_falls_back(self):
+        """Test that backend which can't be imported isn't used"""
+        self.assertIsNone(get_json_backend())
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD),
+            JSONRenderer().render(PAYLOAD)
+        )
+
+    def test_unsupported_value_falls_back(self):
+        """Test that values backend can't encode are encoded by json"""
+        data = {'big': 2 ** 70}
+
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_floats(self):
+        """Test that floats are formatted like by JSONRenderer"""
+        for number in (0.5, 1e-4, 1e-05, 1.5e-07, -2.5e-100, 1e16, 1e300):
+            data = {'tolerance': number, 'tasks': [{'tolerance': number}]}
+            self.assertEqual(
+                FastJSONRenderer().render(data),
+                JSONRenderer().render(data),
+                number
+            )
+
+    def test_indented_output(self):
+        """Test that indentation requested by client is kept"""
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD, media_type),
+            JSONRenderer().render(PAYLOAD, media_type)
+        )
+
+    def test_empty_response(self):
+        """Test that no data renders empty body"""
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """Test parsing request body with JSON backend"""
+
+    def parse(self, parser, content):
+        """Return content parsed by parser"""
+        return parser.parse(io.BytesIO(content), 'application/json', {})
+
+    def test_same_data(self):
+        """Test that parsed data is the same as of JSONParser"""
+        content = JSONRenderer().render(PAYLOAD)
+
+        self.assertEqual(
+            self.parse(FastJSONParser(), content),
+            self.parse(JSONParser(), content)
+        )
+
+    def test_invalid_json(self):
+        """Test that invalid JSON and NaN raise parse error"""
+        for content in (b'{"id": ', b'{"points": NaN}', b'\xff'):
+            with self.assertRaises(ParseError, msg=content):
+                self.parse(FastJSONParser(), content)
+
+    @override_settings(EXAM_JSON_BACKEND=None)
+    def test_parse_without_backend(self):
+        """Test that json module is used if backend is disabled"""
+        self.assertEqual(
+            self.parse(FastJSONParser(), b'{"id": 1}'), {'id': 1}
+        )
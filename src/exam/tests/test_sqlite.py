@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase, override_settings
+
+
+def sample_connection(path):
+    """Return connection wrapper of SQLite database in given file"""
+    return DatabaseWrapper({
+        'ENGINE': 'django.db.backends.sqlite3', 'NAME': path,
+        'OPTIONS': {}, 'AUTOCOMMIT': True, 'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': False, 'TIME_ZONE': None, 'TEST': {},
+    }, alias='test_sqlite')
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'SQLite only')
+class SqlitePragmaTests(TestCase):
+    """Test tuning pragmas of new SQLite connections"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'test.sqlite3')
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(EXAM_SQLITE_TUNING=True)
+    def test_pragmas_set_on_new_connection(self):
+        """Test that tuning pragmas are set when connection is opened"""
+        wrapper = sample_connection(self.path)
+        self.addCleanup(wrapper.close)
+
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -20000)
+
+    @override_settings(EXAM_SQLITE_TUNING=False)
+    def test_pragmas_not_set_by_default(self):
+        """Test that tuning is opt-in"""
+        wrapper = sample_connection(self.path)
+        self.addCleanup(wrapper.close)
+
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'delete')
+
+    def test_command_reports_pragmas(self):
+        """Test that command prints every tuned pragma"""
+        out = StringIO()
+
+        call_command('sqlite_pragmas', stdout=out)
+
+        for name in ('journal_mode', 'synchronous', 'busy_timeout',
+                     'mmap_size', 'cache_size'):
+            self.assertIn(f'{name} = ', out.getvalue())
@@ -0,0 +1,142 @@
+import base64
+import json
+
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from exam.models import ExamSheet, ExamTask
+from exam.serializers import ExamSheetSerializer
+from exam.tests.utils import sample_user
+
+ARCHIVED_EXAM_SHEETS_URL = reverse('exam:examsheet-archive-list')
+NO_FILTERING_EXAM_SHEETS_URL = reverse('exam:examsheet-nofilter')
+
+
+def streamed_content(res):
+    """Return joined chunks of streaming response"""
+    return b''.join(res.streaming_content).decode()
+
+
+@override_settings(EXAM_STREAM_CHUNK_SIZE=2)
+class StreamingListApiTests(TestCase):
+    """Test streaming whole lists of exam sheets"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        user2 = sample_user(username='testuser2')
+        for number in range(5):
+            exam_sheet = ExamSheet.objects.create(
+                owner=self.user if number % 2 else user2,
+                description=f'Sheet {number}',
+                is_archived=number > 2
+            )
+            ExamTask.objects.create(exam_sheet=exam_sheet, title='Task')
+
+    def expected(self, queryset):
+        """Return serialized exam sheets"""
+        return ExamSheetSerializer(queryset.order_by('id'), many=True).data
+
+    def test_stream_json_array(self):
+        """Test that stream param returns every sheet as JSON array"""
+        res = self.client.get(NO_FILTERING_EXAM_SHEETS_URL, {'stream': '1'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(
+            json.loads(streamed_content(res)),
+            self.expected(ExamSheet.objects.all())
+        )
+
+    def test_stream_matches_pages(self):
+        """Test that streamed list is the same as joined pages"""
+        paginated = self.client.get(
+            NO_FILTERING_EXAM_SHEETS_URL, {'page_size': 100}
+        )
+        streamed = self.client.get(
+            NO_FILTERING_EXAM_SHEETS_URL, {'stream': 'true'}
+        )
+
+        self.assertEqual(
+            json.loads(streamed_content(streamed)),
+            json.loads(paginated.content)['results']
+        )
+
+    def test_stream_queries(self):
+        """Test that tasks are loaded with one query per chunk"""
+        with self.assertNumQueries(4):
+            # Sheets and tasks of three chunks
+            streamed_content(self.client.get(
+                NO_FILTERING_EXAM_SHEETS_URL, {'stream': '1'}
+            ))
+
+    def test_stream_ndjson(self):
+        """Test that NDJSON is streamed one sheet per line"""
+        res = self.client.get(
+            NO_FILTERING_EXAM_SHEETS_URL,
+            HTTP_ACCEPT='application/x-ndjson'
+        )
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertIn('Accept', res['Vary'])
+        lines = streamed_content(res).splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            self.expected(ExamSheet.objects.all())
+        )
+
+    def test_stream_archived_ndjson(self):
+        """Test that archived list is filtered when streamed"""
+        res = self.client.get(ARCHIVED_EXAM_SHEETS_URL, {'format': 'ndjson'})
+
+        lines = streamed_content(res).splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            self.expected(
+                ExamSheet.objects.filter(owner=self.user, is_archived=True)
+            )
+        )
+
+    def test_empty_stream(self):
+        """Test that empty list is valid JSON"""
+        ExamSheet.objects.all().delete()
+
+        res = self.client.get(ARCHIVED_EXAM_SHEETS_URL, {'stream': '1'})
+
+        self.assertEqual(json.loads(streamed_content(res)), [])
+
+    def test_paginated_by_default(self):
+        """Test that list is paginated unless stream is requested"""
+        res = self.client.get(NO_FILTERING_EXAM_SHEETS_URL)
+
+        self.assertFalse(res.streaming)
+        self.assertEqual(len(res.data['results']), 5)
+
+    def test_representations_have_different_etags(self):
+        """Test that JSON and NDJSON versions of list aren't mixed up"""
+        json_res = self.client.get(ARCHIVED_EXAM_SHEETS_URL)
+
+        res = self.client.get(
+            ARCHIVED_EXAM_SHEETS_URL,
+            HTTP_ACCEPT='application/x-ndjson',
+            HTTP_IF_NONE_MATCH=json_res['ETag']
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    async def test_async_stream(self):
+        """Test that ASGI response is streamed by async iterator"""
+        credentials = base64.b64encode(b'testusername:testpassword123')
+
+        res = await AsyncClient().get(
+            NO_FILTERING_EXAM_SHEETS_URL, {'stream': '1'},
+            headers={'authorization': f'Basic {credentials.decode()}'}
+        )
+        chunks = [chunk async for chunk in res.streaming_content]
+
+        self.assertTrue(res.is_async)
+        self.assertEqual(len(json.loads(b''.join(chunks))), 5)
@@ -0,0 +1,174 @@
+import base64
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.signals import request_started
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+
+def sample_user(username='testusername', password='testpassword123',
+                **kwargs):
+    """Create and return sample user"""
+    return get_user_model().objects.create_user(
+        username=username,
+        password=password,
+        **kwargs
+    )
+
+
+def basic_auth(username='testusername', password='testpassword123'):
+    """Return Basic authorization header"""
+    credentials = base64.b64encode(f'{username}:{password}'.encode())
+    return {'authorization': f'Basic {credentials.decode()}'}
+
+
+def detail_url(exam_sheet_id):
+    """Return exam sheet detail url"""
+    return reverse('exam:examsheet-detail', args=[exam_sheet_id])
+
+
+def exam_tasks_for_sheet(exam_sheet_id):
+    """Url for retrieving list of tasks for exam sheet"""
+    return reverse('exam:examtask-sheet', args=[exam_sheet_id])
+
+
+# Query locking rows of sheets whose tasks changed, issued only by
+# databases supporting SELECT ... FOR UPDATE
+SHEET_LOCK = int(connection.features.has_select_for_update)
+
+# Highest number of queries of exam API actions (labeled like by request
+# instrumentation), with force_authenticate and empty response cache.
+# Requests checked by assertQueryBudget fail if they issue more
+QUERY_BUDGETS = {
+    'ExamSheetViewSet.list': 3,
+    'ExamSheetViewSet.create': 5 + SHEET_LOCK,
+    'ExamSheetViewSet.archive_list': 3,
+    'ExamSheetViewSet.not_filtered_list': 2,
+    'ExamSheetViewSet.retrieve': 2,
+    'ExamSheetViewSet.partial_update': 7 + SHEET_LOCK,
+    'ExamSheetViewSet.destroy': 5,
+    'ExamSheetViewSet.change_archive_status': 2,
+    'ExamSheetViewSet.answers': 4 + SHEET_LOCK,
+    'ExamSheetViewSet.grade': 5 + SHEET_LOCK,
+    'ExamSheetViewSet.events': 1,
+    'ExamTaskViewSet.list': 1,
+    'ExamTaskViewSet.create': 3 + SHEET_LOCK,
+    'ExamTaskViewSet.retrieve': 1,
+    'ExamTaskViewSet.partial_update': 3 + SHEET_LOCK,
+    'ExamTaskViewSet.destroy': 3 + SHEET_LOCK,
+    'ExamTaskViewSet.answer': 3 + SHEET_LOCK,
+    'ExamTaskViewSet.task_list_for_sheet': 1,
+    'ExamTaskViewSet.bulk': 4 + SHEET_LOCK,
+}
+
+# Transaction control isn't counted, it differs between databases
+TRANSACTION_STATEMENT = re.compile(
+    r'^\s*(SAVEPOINT|RELEASE|ROLLBACK|BEGIN|COMMIT)\b', re.IGNORECASE
+)
+
+
+def query_shape(sql):
+    """Return SQL with values replaced, equal for queries of same shape"""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'%s|\b\d+(?:\.\d+)?\b', '?', sql)
+    # Lists of values of any length, e.g. in IN clause
+    sql = re.sub(r'\(\s*\?(?:\s*,\s*\?)*\s*\)', '(...)', sql)
+    return ' '.join(sql.split())
+
+
+def request_action(path, method):
+    """Return label of view action handling request"""
+    match = resolve(path)
+    view = getattr(match.func, 'cls', None)
+    if view is None:
+        return match.view_name
+    method = method.lower()
+    actions = getattr(match.func, 'actions', None) or {}
+    action = actions.get('get' if method == 'head' else method, method)
+    return f'{view.__name__}.{action}'
+
+
+class QueryCountMixin:
+    """Assertions about number of queries issued by API calls"""
+    query_budgets = QUERY_BUDGETS
+
+    def assertConstantQueries(self, request, add_rows, num=None):
+        """Assert that request issues same number of queries for any size
+
+        Request is made after each of two calls of add_rows, so it's
+        compared against data sets of different size. If num is given,
+        query count also has to be equal to it.
+        """
+        counts = []
+        for _ in range(2):
+            add_rows()
+            with CaptureQueriesContext(connection) as context:
+                request()
+            counts.append(len(context.captured_queries))
+
+        self.assertEqual(
+            counts[0], counts[1],
+            'Query count grows with number of rows: '
+            f'{counts[0]} != {counts[1]}'
+        )
+        if num is not None:
+            self.assertEqual(counts[0], num)
+
+    @contextmanager
+    def assertQueryBudget(self, max_repeats=1):
+        """Assert that requests sent in block stay within query budgets
+
+        Queries of every request are checked separately. Request fails if
+        it issues the same query with different values more than
+        max_repeats times (N+1 pattern, so data set should have several
+        rows) or more queries than budget of its action. Block should
+        only send requests.
+        """
+        starts = []
+
+        def started(sender, environ=None, scope=None, **kwargs):
+            if environ is not None:
+                path, method = environ['PATH_INFO'], environ['REQUEST_METHOD']
+            else:
+                path, method = scope['path'], scope['method']
+            starts.append(
+                (request_action(path, method), len(context.captured_queries))
+            )
+
+        with CaptureQueriesContext(connection) as context:
+            request_started.connect(started, weak=False)
+            try:
+                yield
+            finally:
+                request_started.disconnect(started)
+
+        ends = [start for action, start in starts[1:]]
+        ends.append(len(context.captured_queries))
+        for (action, start), end in zip(starts, ends):
+            queries = [
+                query['sql'] for query in context.captured_queries[start:end]
+                if not TRANSACTION_STATEMENT.match(query['sql'])
+            ]
+            self.checkQueries(action, queries, max_repeats)
+
+    def checkQueries(self, action, queries, max_repeats):
+        """Fail if queries of action repeat or are over budget"""
+        repeated = [
+            f'  {count}x {shape}' for shape, count in
+            Counter(query_shape(sql) for sql in queries).items()
+            if count > max_repeats
+        ]
+        if repeated:
+            self.fail(
+                f'{action} repeats queries (N+1):\n' + '\n'.join(repeated)
+            )
+        budget = self.query_budgets.get(action)
+        if budget is not None and len(queries) > budget:
+            self.fail(
+                f'{action} issued {len(queries)} queries, budget is '
+                f'{budget}:\n' + '\n'.join(f'  {sql}' for sql in queries)
+            )
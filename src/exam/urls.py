@@ -10,5 +10,7 @@ router.register('exam-tasks', views.ExamTaskViewSet)
 app_name = 'exam'
 
 urlpatterns = [
+    path('token/', views.ObtainTokenView.as_view(), name='token'),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
     path('', include(router.urls))
 ]
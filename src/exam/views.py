@@ -1,50 +1,144 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Prefetch, Value
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import viewsets, status
-from rest_framework.authentication import BasicAuthentication
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from exam.models import ExamSheet, ExamTask
+from exam.async_views import AsyncReadMixin
+from exam.authentication import CachedBasicAuthentication, \
+                                SignedTokenAuthentication, make_token
+from exam.autosave import AnswerWriteBehindMixin
+from exam.bulk import BulkExamTaskMixin, pk_value, pk_values
+from exam.cache import SheetCacheMixin
+from exam.conditional import ConditionalGetMixin
+from exam.fast_serializers import ExamSheetValuesSerializer, \
+                                 ExamTaskValuesSerializer
+from exam.events import EventStreamRenderer, aevent_stream, event_stream, \
+                        publish_task_events
+from exam.grading import grade_sheets
+from exam.instrumentation import InstrumentedViewMixin, registry
+from exam.models import COUNTER_FIELDS, ExamSheet, ExamTask
+from exam.pagination import IdCursorPagination, PaginatedActionMixin
 from exam.serializers import ExamSheetSerializer, ExamSheetDetailSerializer, \
                             ExamSheetArchiveSerializer, ExamTaskSerializer, \
-                            ExamTaskStudentSerializer
+                            ExamTaskStudentSerializer, ExamSheetAnswersField, \
+                            counters_requested
 from exam.permissions import IsOwnerOrReadOnly, IsExamTaskOwnerOrReadOnly, \
-                            IsStudentOrOwnerOrReadOnly
+                            IsStudentOrOwnerOrReadOnly, IsSheetStudentOrOwner
+from exam.permissions import ExamTaskOwnerFilter
+from exam.signals import batched_sheet_changes
+from exam.streaming import STREAMING_RENDERER_CLASSES, StreamingListMixin
 
+# Exam sheet columns shown by serializers, tasks are loaded separately.
+# Modification time has to be loaded to be updated on save.
+SHEET_COLUMNS = tuple(
+    field for field in ExamSheetSerializer.Meta.fields if field != 'tasks'
+) + ('updated_at',)
 
-class ExamSheetViewSet(viewsets.ModelViewSet):
+
+class ObtainTokenView(InstrumentedViewMixin, APIView):
+    """Exchange Basic credentials for signed token"""
+    authentication_classes = (CachedBasicAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        """Return new token for authenticated user"""
+        token, expires = make_token(request.user)
+        return Response({'token': token, 'expires': expires})
+
+
+class MetricsView(APIView):
+    """Serve request metrics of this process to admin users"""
+    authentication_classes = (
+        CachedBasicAuthentication, SignedTokenAuthentication
+    )
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        """Return request metrics in Prometheus text format"""
+        return HttpResponse(
+            registry.exposition(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+
+
+class ExamSheetViewSet(AsyncReadMixin, InstrumentedViewMixin,
+                       AnswerWriteBehindMixin,
+                       ConditionalGetMixin, SheetCacheMixin,
+                       StreamingListMixin, PaginatedActionMixin,
+                       viewsets.ModelViewSet):
     """Manage exam sheets in database"""
     serializer_class = ExamSheetSerializer
     queryset = ExamSheet.objects.all()
-    authentication_classes = (BasicAuthentication,)
+    authentication_classes = (
+        CachedBasicAuthentication, SignedTokenAuthentication
+    )
     permission_classes = (IsAuthenticated, IsOwnerOrReadOnly)
+    pagination_class = IdCursorPagination
+    fast_serializer_class = ExamSheetValuesSerializer
+    async_actions = ('list', 'retrieve', 'events')
+
+    def get_base_queryset(self):
+        """Return queryset loading only what action's serializer shows"""
+        if self.action == 'change_archive_status':
+            # Serializer only with id and is_archived status, owner is
+            # checked by permissions
+            return self.queryset.only(
+                'id', 'is_archived', 'updated_at', 'owner'
+            )
+        elif self.action in ['answers', 'events']:
+            # Only needed for checking permissions
+            return self.queryset.only('id', 'owner', 'student')
+        elif self.action == 'grade':
+            # Grade is returned if sheet can't be graded automatically
+            return self.queryset.only('id', 'owner', 'grade')
+        queryset = self.queryset.only(*SHEET_COLUMNS)
+        if self.action == 'retrieve':
+            # Nested tasks are serialized with every field
+            return queryset.prefetch_related('tasks')
+        # Only ids of tasks are serialized
+        return queryset.prefetch_related(Prefetch(
+            'tasks',
+            queryset=ExamTask.objects.only('id', 'exam_sheet').order_by('id')
+        ))
 
     def get_queryset(self):
         """Return queryset depending on action"""
+        queryset = self.get_base_queryset()
         # Check if there is student query param
         # It's possible to extend query params
         student = self.request.query_params.get('student')
         if student:
-            self.queryset = self.queryset.filter(student=student)
-        if self.action in ['retrieve', 'not_filtered_list']:
+            queryset = queryset.filter(student=student)
+        if self.action in [
+                'retrieve', 'not_filtered_list', 'answers', 'events']:
             # Base queryset without filtering
-            return self.queryset
+            return queryset
         elif self.action == 'archive_list':
             # Queryet for archived exam sheet list
-            return self.queryset.filter(
+            return queryset.filter(
                 owner=self.request.user,
-                is_archived=1
+                is_archived=Value(True)
             )
         elif self.action == 'change_archive_status':
             # Queryset without filtering is_archive
             # for changing is_archive state
-            return self.queryset.filter(
+            return queryset.filter(
                 owner=self.request.user
             )
-        # Basic queryset without archived exam sheets
-        return self.queryset.filter(
+        # Basic queryset without archived exam sheets. Value is compared
+        # with '=' (plain boolean would be 'NOT is_archived'), so SQLite can
+        # use composite index
+        return queryset.filter(
             owner=self.request.user,
-            is_archived=0
+            is_archived=Value(False)
         )
 
     def get_serializer_class(self):
@@ -59,14 +153,84 @@ class ExamSheetViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         """Create a new exam sheet"""
-        serializer.save(owner=self.request.user)
+        self.save_sheet(serializer, owner=self.request.user)
+
+    def perform_update(self, serializer):
+        """Update exam sheet"""
+        self.save_sheet(serializer)
+
+    def save_sheet(self, serializer, **kwargs):
+        """Save exam sheet, sheets that its tasks are moved from change too"""
+        tasks = serializer.validated_data.get('tasks', ())
+        # Read before tasks are assigned to saved sheet
+        sheet_ids = {task.exam_sheet_id for task in tasks}
+        with transaction.atomic(), batched_sheet_changes() as changed:
+            exam_sheet = serializer.save(**kwargs)
+            if tasks:
+                # Tasks are moved by one UPDATE, without signals
+                changed.update(sheet_ids)
+                changed.add(exam_sheet.pk)
+        if tasks and counters_requested(self.request):
+            exam_sheet.refresh_from_db(fields=COUNTER_FIELDS)
+
+    def perform_destroy(self, instance):
+        """Delete exam sheet with its tasks"""
+        pk = instance.pk
+        with transaction.atomic(), batched_sheet_changes() as changed:
+            instance.delete()
+            # Deleted sheet isn't touched for each of its deleted tasks
+            changed.discard(pk)
+
+    def list(self, request):
+        """Get list of active sheets, 304 if it didn't change"""
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(
+            lambda: self.paginated_response(queryset),
+            self.queryset_etag(queryset)
+        )
+
+    def retrieve(self, request, pk=None):
+        """Get exam sheet details, cached until sheet or its tasks change"""
+        return self.conditional_response(
+            lambda: Response(self.cached_data(
+                pk, 'detail',
+                lambda: self.get_serializer(self.get_object()).data
+            )),
+            self.sheet_etag(pk)
+        )
+
+    async def alist(self, request):
+        """Async version of list"""
+        queryset = self.filter_queryset(self.get_queryset())
+        return await self.aconditional_response(
+            lambda: self.apaginated_response(queryset),
+            await self.aqueryset_etag(queryset)
+        )
+
+    async def aretrieve(self, request, pk=None):
+        """Async version of retrieve"""
+        async def build():
+            return self.get_serializer(await self.aget_object()).data
+
+        async def build_response():
+            return Response(await self.acached_data(pk, 'detail', build))
+
+        return await self.aconditional_response(
+            build_response, await self.asheet_etag(pk)
+        )
 
     # Cutom actions and views for exam sheets
-    @action(detail=False, url_path='archived')
+    @action(
+        detail=False, url_path='archived',
+        renderer_classes=STREAMING_RENDERER_CLASSES
+    )
     def archive_list(self, request):
-        """Get list of archived sheets"""
-        serializer = self.get_serializer(self.get_queryset(), many=True)
-        return Response(serializer.data)
+        """Get list of archived sheets, streamed if requested"""
+        queryset = self.get_queryset()
+        return self.conditional_response(
+            lambda: self.list_response(queryset),
+            self.queryset_etag(queryset)
+        )
 
     # Both versions of 'change_archive_status' work.
     # I'm not sure if using method 'GET' is acceptable.
@@ -125,29 +289,131 @@ class ExamSheetViewSet(viewsets.ModelViewSet):
     #         status=status.HTTP_400_BAD_REQUEST
     #     )
 
-    @action(detail=False, url_path='nofilter', url_name='nofilter')
+    @action(
+        detail=False, url_path='nofilter', url_name='nofilter',
+        renderer_classes=STREAMING_RENDERER_CLASSES
+    )
     def not_filtered_list(self, request):
-        """Get list of every sheet"""
-        serializer = self.get_serializer(self.get_queryset(), many=True)
-        return Response(serializer.data)
+        """Get list of every sheet, streamed if requested"""
+        return self.list_response(self.get_queryset())
+
+    @action(
+        detail=True, url_path='answers',
+        url_name='answers', methods=['patch'],
+        permission_classes=[IsAuthenticated, IsSheetStudentOrOwner]
+    )
+    def answers(self, request, pk=None):
+        """Save answers to many tasks of sheet, sent as {task id: answer}"""
+        exam_sheet = self.get_object()
+        try:
+            answers = ExamSheetAnswersField().run_validation(request.data)
+        except ValidationError as exc:
+            return Response(exc.detail, status=status.HTTP_400_BAD_REQUEST)
+
+        tasks = ExamTask.objects.filter(exam_sheet=exam_sheet).only(
+            'id', 'exam_sheet', 'answer', 'updated_at'
+        ).in_bulk(pk_values(answers))
+        errors = {
+            key: ['Exam task not found in exam sheet.']
+            for key in answers if pk_value(key) not in tasks
+        }
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        self.flush_answers(tasks)
+        now = timezone.now()
+        for key, answer in answers.items():
+            task = tasks[pk_value(key)]
+            task.answer = answer
+            task.updated_at = now
+        with transaction.atomic(), batched_sheet_changes() as changed:
+            ExamTask.objects.bulk_update(
+                tasks.values(), ['answer', 'updated_at']
+            )
+            changed.add(exam_sheet.id)
+            publish_task_events(
+                'answer_submitted', ((exam_sheet.id, pk) for pk in tasks)
+            )
+
+        return Response(
+            {str(task.id): task.answer for task in tasks.values()},
+            status=status.HTTP_200_OK
+        )
+
+    @action(
+        detail=True, url_path='grade', url_name='grade', methods=['post']
+    )
+    def grade(self, request, pk=None):
+        """Score answers to tasks with rubric, grade sheet if all have one"""
+        exam_sheet = self.get_object()
+        # Queued answers are scored too
+        self.answer_queue.flush()
+        # Scoring one sheet isn't worth a process pool
+        scores = grade_sheets([exam_sheet.id], workers=1)[0]
+        points, grade = {}, exam_sheet.grade
+        if scores:
+            points = scores[0].points
+            grade = scores[0].grade or grade
+        return Response({
+            'id': exam_sheet.id,
+            'grade': grade,
+            'points': {str(pk): value for pk, value in points.items()},
+        })
+
+    @action(
+        detail=True, url_path='events', url_name='events',
+        permission_classes=[IsAuthenticated, IsSheetStudentOrOwner],
+        renderer_classes=[EventStreamRenderer, JSONRenderer]
+    )
+    def events(self, request, pk=None):
+        """Stream changes of exam sheet as server-sent events"""
+        exam_sheet = self.get_object()
+        return self.event_stream_response(event_stream(exam_sheet.id))
 
+    async def aevents(self, request, pk=None):
+        """Async version of events, waiting client doesn't hold thread"""
+        exam_sheet = await self.aget_object()
+        if isinstance(request._request, ASGIRequest):
+            return self.event_stream_response(aevent_stream(exam_sheet.id))
+        # WSGI server would read whole async stream before sending it
+        return self.event_stream_response(event_stream(exam_sheet.id))
 
-class ExamTaskViewSet(viewsets.ModelViewSet):
+    def event_stream_response(self, stream):
+        """Return response sending events as soon as they are yielded"""
+        response = StreamingHttpResponse(
+            stream, content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Disable buffering of nginx proxy
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class ExamTaskViewSet(AsyncReadMixin, InstrumentedViewMixin,
+                      AnswerWriteBehindMixin,
+                      BulkExamTaskMixin, ConditionalGetMixin,
+                      SheetCacheMixin, PaginatedActionMixin,
+                      viewsets.ModelViewSet):
     """Manage exam sheets in database"""
     serializer_class = ExamTaskSerializer
     queryset = ExamTask.objects.all()
-    authentication_classes = (BasicAuthentication,)
+    authentication_classes = (
+        CachedBasicAuthentication, SignedTokenAuthentication
+    )
     permission_classes = (IsAuthenticated, IsExamTaskOwnerOrReadOnly)
+    pagination_class = IdCursorPagination
+    # Basic exam task list is limited to tasks of requesting user
+    filter_backends = (ExamTaskOwnerFilter,)
+    unfiltered_actions = ('task_list_for_sheet', 'retrieve', 'answer')
+    fast_serializer_class = ExamTaskValuesSerializer
+    async_actions = ('retrieve', 'task_list_for_sheet')
 
     def get_queryset(self):
         """Return queryset depending on action"""
-        # Queryset without filtering out by user
-        if self.action in ['task_list_for_sheet', 'retrieve', 'answer']:
-            return self.queryset
-        # Basic exam task list for requesting user
-        return self.queryset.filter(
-            exam_sheet__owner=self.request.user
-        )
+        if self.action in ['update', 'partial_update', 'destroy', 'answer']:
+            # Permissions compare owner and student of sheet with user
+            return self.queryset.select_related('exam_sheet')
+        return self.queryset
 
     def get_serializer_class(self):
         """Return appropriate serializer class for ExamTask viewset"""
@@ -157,14 +423,48 @@ class ExamTaskViewSet(viewsets.ModelViewSet):
         """Create a new exam sheet"""
         validated_data = serializer.validated_data
         exam_sheet = validated_data['exam_sheet']
-        if exam_sheet.owner == self.request.user:
+        if exam_sheet.owner_id == self.request.user.pk:
             serializer.save()
 
+    def perform_update(self, serializer):
+        """Update exam task, after answers queued for it are saved"""
+        self.flush_answers([serializer.instance.id])
+        serializer.save()
+
+    def list(self, request):
+        """Get list of tasks of sheets owned by user"""
+        return self.paginated_response(
+            self.filter_queryset(self.get_queryset())
+        )
+
     @action(detail=True, url_path='sheet', url_name='sheet')
     def task_list_for_sheet(self, request, pk=None):
         """Get list of all tasks for given sheet pk"""
         obj = self.get_queryset().filter(exam_sheet__pk=pk)
-        return Response(self.get_serializer(obj, many=True).data)
+        return self.conditional_response(
+            lambda: Response(self.cached_data(
+                pk, 'tasks', lambda: self.paginated_response(obj).data
+            )),
+            self.sheet_etag(pk)
+        )
+
+    async def aretrieve(self, request, pk=None):
+        """Async version of retrieve"""
+        return Response(self.get_serializer(await self.aget_object()).data)
+
+    async def atask_list_for_sheet(self, request, pk=None):
+        """Async version of task_list_for_sheet"""
+        obj = self.get_queryset().filter(exam_sheet__pk=pk)
+
+        async def build():
+            return (await self.apaginated_response(obj)).data
+
+        async def build_response():
+            return Response(await self.acached_data(pk, 'tasks', build))
+
+        return await self.aconditional_response(
+            build_response, await self.asheet_etag(pk)
+        )
 
     @action(
         detail=True, url_path='answer',
@@ -176,6 +476,18 @@ class ExamTaskViewSet(viewsets.ModelViewSet):
         obj = self.get_object()
         serializer = ExamTaskStudentSerializer(obj, data=request.data)
         if serializer.is_valid():
+            if (request.method == 'PATCH' and self.write_behind_enabled() and
+                    'answer' in serializer.validated_data):
+                # Answer is saved later by write-behind queue
+                obj.answer = serializer.validated_data['answer']
+                error_response = self.queue_answer(obj, obj.answer)
+                if error_response is not None:
+                    return error_response
+                return Response(
+                    ExamTaskStudentSerializer(obj).data,
+                    status=status.HTTP_202_ACCEPTED
+                )
+            self.flush_answers([obj.id])
             serializer.save()
             return Response(
                 serializer.data,
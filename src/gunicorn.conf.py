@@ -0,0 +1,67 @@
+"""
+Gunicorn config for project project.
+
+Start production server in src folder with:
+    gunicorn -c gunicorn.conf.py project.wsgi
+or, for ASGI app with async views served by uvicorn workers:
+    GUNICORN_WORKER_CLASS=uvicorn_worker.UvicornWorker \
+        gunicorn -c gunicorn.conf.py project.asgi:application
+
+Settings can be changed with GUNICORN_* environment variables.
+Graceful reload: 'kill -HUP <master pid>' starts new workers and lets old
+ones finish their requests. With preloaded app new code is loaded only by
+new master, started with 'kill -USR2 <master pid>' (old one is stopped
+with 'kill -QUIT <old master pid>' afterwards).
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Pre-forked processes, each serving requests with given number of threads
+workers = int(os.environ.get(
+    'GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1
+))
+threads = int(os.environ.get('GUNICORN_THREADS', 2))
+# Threads are ignored by async (uvicorn) workers
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+
+# Django app is loaded once by master, workers share its memory
+# copy-on-write
+preload_app = True
+
+# Worker handling request longer than timeout is killed and restarted
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+# Time given to workers to finish requests on reload or shutdown
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Workers are restarted after given number of requests (0 disables it)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-')
+
+
+def on_starting(server):
+    # Queued answers are visible only to process which queued them, so
+    # read-your-writes of write-behind holds only with one worker
+    from django.conf import settings
+    if (getattr(settings, 'EXAM_ANSWER_WRITE_BEHIND', False) and
+            server.cfg.workers > 1):
+        raise RuntimeError(
+            'EXAM_ANSWER_WRITE_BEHIND requires GUNICORN_WORKERS=1.'
+        )
+
+
+def pre_fork(server, worker):
+    # Workers must not share connections opened while app was preloaded
+    from django.db import connections
+    connections.close_all()
+
+
+def worker_exit(server, worker):
+    # Answers queued by write-behind are saved before worker exits
+    from exam.autosave import answer_queue
+    answer_queue.stop()
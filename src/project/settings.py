@@ -4,20 +4,22 @@ Django settings for project project.
 Generated by 'django-admin startproject' using Django 2.1.5.
 
 For more information on this file, see
-https://docs.djangoproject.com/en/2.1/topics/settings/
+https://docs.djangoproject.com/en/5.2/topics/settings/
 
 For the full list of settings and their values, see
-https://docs.djangoproject.com/en/2.1/ref/settings/
+https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
 # Quick-start development settings - unsuitable for production
-# See https://docs.djangoproject.com/en/2.1/howto/deployment/checklist/
+# See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = '=xytjv1+tzioqkko+ve^)l@dua4=s^bc#ugr7596v8-i$j##7d'
@@ -40,11 +42,13 @@ INSTALLED_APPS = [
 
     'rest_framework',
 
-    'exam',
+    'exam.apps.ExamConfig',
 ]
 
 MIDDLEWARE = [
+    'exam.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'exam.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -75,18 +79,54 @@ WSGI_APPLICATION = 'project.wsgi.application'
 
 
 # Database
-# https://docs.djangoproject.com/en/2.1/ref/settings/#databases
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+
+# Profile is selected by DB_PROFILE environment variable: 'sqlite'
+# (default) or 'postgresql'
+
+DB_PROFILE = os.environ.get('DB_PROFILE', 'sqlite')
+
+if DB_PROFILE == 'postgresql':
+    # Optional pool shared by threads of process, enabled by max size
+    DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 0))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'NAME': os.environ.get('DB_NAME', 'exam'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASS', ''),
+            # Connections are kept open between requests, pooled ones are
+            # returned to pool after every request instead
+            'CONN_MAX_AGE': int(os.environ.get(
+                'DB_CONN_MAX_AGE', 0 if DB_POOL_MAX_SIZE else 60
+            )),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+                    'max_size': DB_POOL_MAX_SIZE,
+                } if DB_POOL_MAX_SIZE else False,
+            },
+        }
     }
-}
+elif DB_PROFILE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        }
+    }
+else:
+    raise ImproperlyConfigured(f'Unknown DB_PROFILE: {DB_PROFILE}')
+
+# Primary keys of existing tables are 32-bit integers
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 
 
 # Password validation
-# https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
+# https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -105,7 +145,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 
 # Internationalization
-# https://docs.djangoproject.com/en/2.1/topics/i18n/
+# https://docs.djangoproject.com/en/5.2/topics/i18n/
 
 LANGUAGE_CODE = 'en-us'
 
@@ -113,12 +153,236 @@ TIME_ZONE = 'UTC'
 
 USE_I18N = True
 
-USE_L10N = True
-
 USE_TZ = True
 
 
 # Static files (CSS, JavaScript, Images)
-# https://docs.djangoproject.com/en/2.1/howto/static-files/
+# https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = '/static/'
+
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'exam.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'exam.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Backend encoding and decoding JSON of exam API, class with dumps and
+# loads methods. If it can't be imported (orjson isn't installed) or it's
+# None, json module is used, output is the same
+EXAM_JSON_BACKEND = 'exam.renderers.OrjsonBackend'
+
+
+# Exam API authentication
+# Verified Basic credentials are cached to skip password hashing
+
+EXAM_AUTH_CACHE_SIZE = 1024
+
+EXAM_AUTH_CACHE_TTL = 300
+
+# Lifetime in seconds of tokens issued by api/exam/token/
+EXAM_TOKEN_TTL = 3600
+
+
+# Exam API pagination
+# Default and maximum number of objects on page of list endpoints
+
+EXAM_PAGE_SIZE = 100
+
+EXAM_MAX_PAGE_SIZE = 1000
+
+# Number of exam sheets read from database at once when whole list is
+# streamed (nofilter and archived lists with NDJSON or stream=1)
+EXAM_STREAM_CHUNK_SIZE = 1000
+
+# Lists of exam sheets and tasks are serialized from values() rows, without
+# serializer fields (same output, several times less CPU time)
+EXAM_FAST_SERIALIZERS = True
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Backend is selected by CACHE_BACKEND environment variable: 'locmem'
+# (default), 'file' or 'redis' (requires redis package). Local memory cache
+# is separate for every process, so with more worker processes cached
+# responses and sheet versions (ETags) would be stale, use shared backend.
+# CACHE_LOCATION is folder of file cache or URL of Redis server
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+
+if CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get(
+                'CACHE_LOCATION', os.path.join(BASE_DIR, '.cache')
+            ),
+        }
+    }
+elif CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get(
+                'CACHE_LOCATION', 'redis://localhost:6379'
+            ),
+        }
+    }
+else:
+    raise ImproperlyConfigured(f'Unknown CACHE_BACKEND: {CACHE_BACKEND}')
+
+
+# Exam API response cache
+# Serialized exam sheets are stored under version of sheet, which changes
+# whenever sheet or any of its tasks is saved or deleted. Disabled with
+# EXAM_RESPONSE_CACHE=0 environment variable
+
+EXAM_RESPONSE_CACHE = os.environ.get('EXAM_RESPONSE_CACHE', '1') == '1'
+
+EXAM_CACHE_ALIAS = 'default'
+
+EXAM_CACHE_TIMEOUT = 600
+
+# Maximum number of exam tasks written with one request to bulk endpoint
+EXAM_BULK_MAX_ITEMS = 1000
+
+
+# Response compression
+# Responses larger than EXAM_COMPRESS_MIN_SIZE bytes are compressed with
+# brotli or gzip (EXAM_COMPRESS_LEVEL 1-9). Compressed payloads of response
+# cache are cached too
+
+EXAM_COMPRESS_MIN_SIZE = 1024
+
+EXAM_COMPRESS_LEVEL = 6
+
+
+# Exam answer write-behind
+# If enabled, answers sent to exam-tasks/<id>/answer are queued and saved
+# in batches by background thread of every process. Queued answers are
+# seen only by process which queued them, so it requires single worker
+# process (gunicorn refuses to start more of them)
+
+EXAM_ANSWER_WRITE_BEHIND = False
+
+EXAM_ANSWER_QUEUE_SIZE = 10000
+
+EXAM_ANSWER_FLUSH_BATCH = 500
+
+EXAM_ANSWER_FLUSH_INTERVAL = 1.0
+
+
+# SQLite connection tuning
+# Opt-in (DB_SQLITE_TUNING=1), pragmas are set on every new connection of
+# SQLite database. WAL journal lets readers work while answers are written
+
+EXAM_SQLITE_TUNING = os.environ.get('DB_SQLITE_TUNING') == '1'
+
+# Transactions take write lock when they begin, so concurrent writers wait
+# for busy_timeout instead of failing when read lock can't be upgraded
+if EXAM_SQLITE_TUNING and DB_PROFILE == 'sqlite':
+    DATABASES['default']['OPTIONS'] = {'transaction_mode': 'IMMEDIATE'}
+
+EXAM_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    # Milliseconds to wait for lock before 'database is locked' error
+    'busy_timeout': 5000,
+    'mmap_size': 128 * 1024 * 1024,
+    # Negative size is in KiB
+    'cache_size': -20000,
+}
+
+
+# Async read-only actions
+# Exam sheet list and details, task details and tasks of sheet are served
+# by async views, which don't hold a thread while waiting under ASGI.
+# Enabled with EXAM_ASYNC_VIEWS=1 environment variable when app is served
+# by ASGI server, under WSGI every async view would run its own event loop
+
+EXAM_ASYNC_VIEWS = os.environ.get('EXAM_ASYNC_VIEWS') == '1'
+
+
+# Exam sheet change events
+# Events are streamed by exam-sheets/<id>/events. In-process broker reaches
+# only clients connected to the process where change was made, with more
+# worker processes use 'exam.events.PostgresBroker' (LISTEN/NOTIFY), set
+# by EXAM_EVENT_BROKER environment variable
+
+EXAM_EVENT_BROKER = os.environ.get(
+    'EXAM_EVENT_BROKER', 'exam.events.InProcessBroker'
+)
+
+# Seconds between keepalive comments sent to idle clients
+EXAM_EVENTS_KEEPALIVE = 15
+
+# Seconds after which stream is closed, client reconnects
+EXAM_EVENTS_TIMEOUT = 300
+
+# Events waiting for slow client, then they are replaced by 'resync' event
+EXAM_EVENTS_QUEUE_SIZE = 100
+
+
+# Request instrumentation
+# Query count, database, serializer, authentication and rendering time of
+# every request are added to in-process histograms, served in Prometheus
+# format by api/exam/metrics/ (admin users only)
+EXAM_INSTRUMENTATION = True
+# Send request timings to client in Server-Timing header
+EXAM_SERVER_TIMING = True
+
+# In development mode (DEBUG) plan of every SELECT query slower than
+# EXAM_SLOW_QUERY_THRESHOLD seconds is logged with the query at WARNING
+# level by 'exam.instrumentation' logger
+EXAM_SLOW_QUERY_EXPLAIN = True
+EXAM_SLOW_QUERY_THRESHOLD = 0.1
+
+# One line per request is logged by 'exam.instrumentation' logger at INFO
+# level, enabled with LOG_REQUESTS=1
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'exam.instrumentation': {
+            'handlers': ['console'],
+            'level': 'INFO' if os.environ.get('LOG_REQUESTS') == '1'
+            else 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+
+# Automatic grading
+# Tasks with rubric get max_points for correct answer and 0 otherwise.
+# Sheets with rubric for every task get first grade of scale whose lowest
+# percent of points is reached
+EXAM_GRADE_SCALE = (
+    (90, 'A'), (75, 'B'), (60, 'C'), (50, 'D'), (0, 'F'),
+)
+
+# Sheets whose tasks are read, scored and written together
+EXAM_GRADING_BATCH_SIZE = 200
+
+# Batches are scored by pool of worker processes (one per CPU) when at
+# least this many sheets are graded at once
+EXAM_GRADING_POOL_MIN_SHEETS = 1000